@@ -1,17 +1,14 @@
 import streamlit as st
-import base64
+from xrdtools.assets import asset_path, background_css
+from xrdtools.profiling import session_profiler, debug_panel
 # Configurar a página inicial
 st.set_page_config(page_title='Paineira - XRD Tools Web App', 
-                   page_icon='Icons/Paineira-Logo.png', layout='wide')
+                   page_icon=asset_path('favicon'), layout='wide')
 
-# Função para usar imagens como plano de fundo
-def get_img_as_base64(file):
-    with open(file, 'rb') as f:
-        image = f.read()
-    return base64.b64encode(image).decode()
+profiler = session_profiler(st.session_state, st.query_params)
+profiler.begin('Home')
 
-img = get_img_as_base64('Icons/Paineira-Layout.png')
-st.logo('Icons/Paineira-Logo.png', link='https://lnls.cnpem.br/facilities/paineira-en/', icon_image='Icons/Paineira-Layout.png', size='large')
+st.logo(asset_path('logo-small'), link='https://lnls.cnpem.br/facilities/paineira-en/', icon_image=asset_path('icon'), size='large')
 # Caixa para o título (cor de fundo diferenciada)
 st.markdown(
     f"""
@@ -21,7 +18,7 @@ st.markdown(
     """, unsafe_allow_html=True
 )
 
-st.image('Icons/Paineira-Logo.png', use_container_width=True)
+st.image(asset_path('logo'), use_container_width=True)
 
 
 
@@ -30,8 +27,8 @@ with st.expander('About this app', expanded=True, icon=":material/help:"):
     st.markdown(r"""
             ### What is this app ?
             This page was desinged to be a web app for X-ray Diffraction (XRD) quick and useful tools. Here you'll find 
-            a X-ray attenuation calculator and a XRD data energy conversion. Currently, a X-ray footprint calculator, for 
-            reflection geometry XRD, is being developed as we look forward to put it online until the end of the semester. 
+            a X-ray attenuation calculator, a XRD data energy conversion and a X-ray footprint and spill-over calculator
+            for reflection geometry XRD.
             This app was developed with the day-to-day needs of the Paineira Beamline in mind, nevertheless, it might be usefull
             to any user with a research field related to XRD experiments.
             ### Paineira Beamline
@@ -47,7 +44,7 @@ with st.expander('About this app', expanded=True, icon=":material/help:"):
 
 
 
-# CSS customizado
+# CSS customizado (o fundo é servido como arquivo estático, ver xrdtools/assets.py)
 page_bg_img = f"""
 <style>
 html, body {{
@@ -56,7 +53,7 @@ html, body {{
     font-size: larger
 }}
 [data-testid="stAppViewContainer"] {{
-    background-image: url("data:image/png;base64,{img}");
+    background-image: {background_css('background')};
     background-size: cover;
 
 }}
@@ -79,4 +76,8 @@ html, body {{
 
 """
 
-st.markdown(page_bg_img, unsafe_allow_html=True)
\ No newline at end of file
+with profiler.stage('background CSS'):
+    st.markdown(page_bg_img, unsafe_allow_html=True)
+
+# Painel de depuração: tempo e memória de cada etapa desta sessão (ligado com ?profile=1)
+debug_panel(profiler)
@@ -0,0 +1,48 @@
+"""Compara o laço amostra a amostra de `calculate` com `batch_attenuation`.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_attenuation
+"""
+import time
+import numpy as np
+from xrdtools.attenuation import calculate, batch_attenuation
+from xrdtools.cache import CACHES
+
+FORMULAS = ['LaB6', 'Si', 'CeO2', 'Al2O3', 'YBa2Cu3O6.5', 'Fe2O3', 'CaCO3', 'NaCl', 'ZnO', 'TiO2'] * 5
+ENERGIES_KEV = np.linspace(8.0, 30.0, 12)
+CAPILLARIES = ['0.30 mm - Kapton', '0.50 mm - Kapton', '0.70 mm - Kapton', '1.00 mm - Quartzo']
+PACKING_FRACTION = 0.6
+
+
+def per_sample_loop():
+    results = np.zeros((len(FORMULAS), len(ENERGIES_KEV), len(CAPILLARIES)))
+    for i, formula in enumerate(FORMULAS):
+        for j, energy in enumerate(ENERGIES_KEV):
+            for k, capillary in enumerate(CAPILLARIES):
+                results[i, j, k] = calculate(formula, energy, 'Energy (keV)', capillary, PACKING_FRACTION)[4]
+    return results
+
+
+def batch():
+    return batch_attenuation(FORMULAS, ENERGIES_KEV*1000, CAPILLARIES, PACKING_FRACTION)['mu_R']
+
+
+def best_of(func, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        for cache in CACHES.values():
+            cache.clear()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+if __name__ == '__main__':
+    loop_time, loop_result = best_of(per_sample_loop)
+    batch_time, batch_result = best_of(batch)
+    n = loop_result.size
+    print(f'{n} combinações (fórmula x energia x capilar)')
+    print(f'laço por amostra: {loop_time*1e3:9.2f} ms')
+    print(f'batch vetorizado: {batch_time*1e3:9.2f} ms  ({loop_time/batch_time:.0f}x)')
+    print(f'maior desvio relativo em µR: {np.max(np.abs(batch_result/loop_result - 1)):.2e}')
@@ -0,0 +1,52 @@
+"""Tamanho do JSON enviado ao navegador e tempo de montagem/serialização da figura,
+com e sem redução de pontos.
+
+O tempo de desenho no navegador não é medido aqui; ele acompanha o número
+de pontos e o tamanho do JSON.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_decimation
+"""
+import time
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from xrdtools.conversions import calculate_new_2theta, scattering_vector, calculate_wavelength
+from xrdtools.decimate import decimate
+
+SIZES = [1_000, 100_000, 1_000_000]
+ENERGY = 25.5
+NEW_ENERGY = 20.0
+
+
+def synthetic_pattern(n_points, seed=0):
+    rng = np.random.default_rng(seed)
+    two_theta = np.linspace(2, 60, n_points)
+    intensity = 50 + rng.normal(0, 2, n_points)
+    for center in rng.uniform(5, 58, 40):
+        intensity += rng.uniform(100, 1000) * np.exp(-0.5 * ((two_theta - center) / 0.02)**2)
+    return two_theta, intensity
+
+
+def build_figure(two_theta, intensity, new_2theta, Q, reduce):
+    fig = make_subplots(rows=1, cols=2)
+    for x, col in ((two_theta, 1), (new_2theta, 1), (Q, 2)):
+        x, y = decimate(x, intensity) if reduce else (x, intensity)
+        fig.add_trace(go.Scatter(x=x, y=y), row=1, col=col)
+    return fig.to_json()
+
+
+if __name__ == '__main__':
+    wavelength = calculate_wavelength(ENERGY)
+    build_figure(*synthetic_pattern(10), *synthetic_pattern(10), reduce=False)  # aquecimento
+    print(f'{"pontos":>10} {"modo":>10} {"JSON (MB)":>10} {"tempo (ms)":>11}')
+    for n_points in SIZES:
+        two_theta, intensity = synthetic_pattern(n_points)
+        new_2theta = calculate_new_2theta(two_theta, ENERGY, NEW_ENERGY)
+        Q = scattering_vector(wavelength, two_theta)
+        for reduce in (False, True):
+            start = time.perf_counter()
+            payload = build_figure(two_theta, intensity, new_2theta, Q, reduce)
+            elapsed = time.perf_counter() - start
+            mode = 'reduzido' if reduce else 'completo'
+            print(f'{n_points:>10} {mode:>10} {len(payload)/1e6:>10.3f} {elapsed*1e3:>11.1f}')
@@ -0,0 +1,50 @@
+"""Vazão da leitura de fórmulas para listas grandes de amostras.
+
+Compara o regex antigo (que não soma elementos repetidos nem aceita grupos)
+com parse_formula sem cache (fórmulas simples, caminho rápido, e fórmulas
+com grupos/hidratos) e com o cache já preenchido.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_formula
+"""
+import re
+import time
+from xrdtools.cache import formula_cache
+from xrdtools.formula import parse_formula
+
+N_SAMPLES = 20_000
+FLAT = ['LaB6', 'Si', 'CeO2', 'Al2O3', 'YBa2Cu3O6.5', 'Fe2O3', 'CaCO3', 'Ca0.5Sr0.5TiO3']
+NESTED = ['Ca(OH)2', 'CuSO4·5H2O', 'K4[Fe(CN)6]·3H2O', 'Mg3(Si4O10)(OH)2', 'Na2{B4O5(OH)4}·8H2O']
+
+
+def old_get_elements(chemical_formula):
+    pattern = r'([A-Z][a-z]?)(\d*(\.\d+)?)'
+    matches = re.findall(pattern, chemical_formula)
+    elements = {}
+    for match in matches:
+        quantity = match[1]
+        elements[match[0]] = float(quantity) if quantity else 1.0
+    return elements
+
+
+def samples(formulas):
+    # sufixos distintos para que cada entrada seja uma fórmula nova para o cache
+    return [f'{formulas[i % len(formulas)]}Zr{i/1000:.3f}' for i in range(N_SAMPLES)]
+
+
+def rate(func, formulas, clear=True):
+    if clear:
+        formula_cache.clear()
+    start = time.perf_counter()
+    for formula in formulas:
+        func(formula)
+    return len(formulas) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    formula_cache.maxsize = 2*N_SAMPLES
+    flat, nested = samples(FLAT), samples(NESTED)
+    print(f'regex antigo (simples):        {rate(old_get_elements, flat):>12,.0f} fórmulas/s')
+    print(f'parse_formula simples:         {rate(parse_formula, flat):>12,.0f} fórmulas/s')
+    print(f'parse_formula grupos/hidratos: {rate(parse_formula, nested):>12,.0f} fórmulas/s')
+    print(f'parse_formula com cache:       {rate(parse_formula, nested, clear=False):>12,.0f} fórmulas/s')
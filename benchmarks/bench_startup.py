@@ -0,0 +1,46 @@
+"""Tempo de partida a frio da linha de comando comparado à importação das páginas.
+
+Cada caso roda num processo Python novo (melhor de REPEATS execuções). A
+referência é o conjunto de importações do topo das páginas Streamlit
+(streamlit, plotly, pandas, xraydb, scipy), sem contar a execução da página.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_startup
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import numpy as np
+
+REPEATS = 5
+PAGE_IMPORTS = 'import streamlit, plotly.graph_objects, plotly.subplots, pandas, xraydb, scipy.constants, numpy'
+
+
+def cold_start(args):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], stdout=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    two_theta = np.linspace(2, 60, 10_000)
+    with tempfile.NamedTemporaryFile('w', suffix='.xy', delete=False) as f:
+        np.savetxt(f, np.column_stack([two_theta, 100 + 10*np.sin(two_theta)]))
+    cases = [
+        ('python vazio', ['-c', 'pass']),
+        ('importações das páginas', ['-c', PAGE_IMPORTS]),
+        ('xrdtools dq', ['-m', 'xrdtools', 'dq', '10', '20', '--energy', '25.5']),
+        ('xrdtools attenuation', ['-m', 'xrdtools', 'attenuation', 'LaB6', 'CuSO4·5H2O',
+                                  '--energy', '20', '--diameter', '0.5']),
+        ('xrdtools convert', ['-m', 'xrdtools', 'convert', f.name, '--energy', '25.5', '--new-energy', '20']),
+    ]
+    try:
+        for label, args in cases:
+            print(f'{label:<26} {cold_start(args)*1e3:>8.0f} ms')
+    finally:
+        os.unlink(f.name)
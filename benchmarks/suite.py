@@ -0,0 +1,223 @@
+"""Suíte de benchmarks de todos os caminhos de cálculo do app, com histórico.
+
+Cada caso é medido como o melhor de REPEATS repetições (com tantas
+execuções por repetição quantas couberem em MIN_TIME). Os resultados vão
+para benchmarks/results/<rótulo>.json, com versões e máquina, e podem ser
+comparados com uma execução anterior para ver regressões entre versões.
+
+Casos:
+    - fórmula (get_elements), calculate e o laço dos gráficos da página de
+      atenuação, com caches limpos;
+    - calculate_new_2theta, scattering_vector, leitura e escrita de CSV em
+      difratogramas sintéticos de 1k, 100k e 10M pontos;
+    - tempo de execução e de reexecução de cada página com o AppTest do Streamlit.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.suite                       # grava results/<git describe>.json
+    python -m benchmarks.suite --sizes 1000 100000   # sem o caso de 10M pontos
+    python -m benchmarks.suite --compare benchmarks/results/v1.json --fail-on-regression
+"""
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+SIZES = [1_000, 100_000, 10_000_000]
+REPEATS = 5
+MIN_TIME = 0.2
+REGRESSION = 1.25
+FORMULAS = ['LaB6', 'YBa2Cu3O6.5', 'CuSO4·5H2O', 'K4[Fe(CN)6]·3H2O', 'Ca0.5Sr0.5TiO3']
+ENERGY = 25.5
+NEW_ENERGY = 20.0
+PAGES = ['Paineira.py', 'pages/X-ray_Attenuation_Calculator.py', 'pages/X-ray_Footprint.py',
+         'pages/Scattering_Vector_and_d_Calculator.py', 'pages/XRD_Pattern_Energy_Converter.py']
+
+
+def measure(func, setup=None, repeats=REPEATS):
+    """Melhor tempo (s) por chamada; `setup` roda antes de cada chamada, fora da medição."""
+    best = float('inf')
+    loops = 1
+    for _ in range(repeats):
+        total = 0.0
+        for _ in range(loops):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            func()
+            total += time.perf_counter() - start
+        best = min(best, total / loops)
+        if total < MIN_TIME:
+            loops = min(1000, max(loops, int(loops * MIN_TIME / max(total, 1e-9))))
+    return best
+
+
+def clear_caches():
+    from xrdtools.cache import CACHES
+    for cache in CACHES.values():
+        cache.clear()
+
+
+def synthetic_pattern(n_points, seed=0):
+    rng = np.random.default_rng(seed)
+    two_theta = np.linspace(2, 60, n_points)
+    intensity = 50 + rng.normal(0, 2, n_points)
+    for center in rng.uniform(5, 58, 40):
+        intensity += rng.uniform(100, 1000) * np.exp(-0.5 * ((two_theta - center) / 0.02)**2)
+    return two_theta, intensity
+
+
+def attenuation_figure(formula, energy, capillary, packing_fraction):
+    """Mesmo laço de gráficos da página de atenuação (µ/ρ e µR de cada elemento)."""
+    import plotly
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    from xrdtools.attenuation import calculate, element_curves, get_elements
+    density, packing_density, transmission, energy, mu_R, distance, total_mass = calculate(
+        formula, energy, 'Energy (keV)', capillary, packing_fraction)
+    energy_range, mass_fractions, mu_table = element_curves(formula)
+    mu_list = np.zeros(energy_range.shape)
+    cols = plotly.colors.DEFAULT_PLOTLY_COLORS
+    fig = make_subplots(rows=1, cols=2)
+    for i, (element, mass_percentage, mu_values) in enumerate(zip(get_elements(formula), mass_fractions, mu_table)):
+        mu_list += mu_values*mass_percentage
+        mu_R_values = mu_values*(distance/2)*packing_density*mass_percentage
+        fig.add_trace(go.Scatter(x=energy_range/1000, y=mu_values, line=dict(color=cols[i % len(cols)])), row=1, col=1)
+        fig.add_trace(go.Scatter(x=energy_range/1000, y=mu_R_values, line=dict(color=cols[i % len(cols)])), row=1, col=2)
+    fig.add_trace(go.Scatter(x=energy_range/1000, y=mu_list), row=1, col=1)
+    fig.add_trace(go.Scatter(x=energy_range/1000, y=mu_list*(distance/2)*packing_density), row=1, col=2)
+    return fig.to_json()
+
+
+def attenuation_cases():
+    from xrdtools.attenuation import calculate, get_elements
+    cases = {}
+    cases['get_elements (5 formulas, cold)'] = measure(lambda: [get_elements(f) for f in FORMULAS], clear_caches)
+    cases['get_elements (5 formulas, cached)'] = measure(lambda: [get_elements(f) for f in FORMULAS])
+    cases['calculate (5 formulas, cold)'] = measure(
+        lambda: [calculate(f, 20, 'Energy (keV)', '0.50 mm - Kapton', 0.6) for f in FORMULAS], clear_caches)
+    cases['attenuation plots (YBa2Cu3O6.5, cold)'] = measure(
+        lambda: attenuation_figure('YBa2Cu3O6.5', 20, '0.50 mm - Kapton', 0.6), clear_caches)
+    return cases
+
+
+def pattern_cases(sizes):
+    from xrdtools.conversions import calculate_new_2theta, scattering_vector, calculate_wavelength
+    from xrdtools.patterns import read_pattern
+    from xrdtools.export import export_pattern
+    wavelength = calculate_wavelength(ENERGY)
+    cases = {}
+    for n_points in sizes:
+        two_theta, intensity = synthetic_pattern(n_points)
+        repeats = REPEATS if n_points < 1_000_000 else 2
+        cases[f'calculate_new_2theta ({n_points})'] = measure(
+            lambda: calculate_new_2theta(two_theta, ENERGY, NEW_ENERGY), repeats=repeats)
+        cases[f'scattering_vector ({n_points})'] = measure(lambda: scattering_vector(wavelength, two_theta), repeats=repeats)
+        cases[f'CSV serialize ({n_points})'] = measure(
+            lambda: export_pattern(two_theta, intensity, 'csv'), repeats=repeats)
+        data = export_pattern(two_theta, intensity, 'xye')
+        cases[f'XYE parse ({n_points})'] = measure(lambda: read_pattern(io.BytesIO(data)), repeats=repeats)
+        del data
+    return cases
+
+
+def page_cases():
+    """Primeira execução e reexecução de cada página (AppTest, no mesmo processo)."""
+    from streamlit.testing.v1 import AppTest
+    from xrdtools.conversions import calculate_new_2theta, scattering_vector, calculate_wavelength
+    two_theta, intensity = synthetic_pattern(100_000)
+    wavelength = calculate_wavelength(ENERGY)
+    pattern = (two_theta, intensity, calculate_new_2theta(two_theta, ENERGY, NEW_ENERGY),
+               scattering_vector(wavelength, two_theta), ENERGY, NEW_ENERGY, wavelength)
+    cases = {}
+    for page in PAGES:
+        def new_app():
+            app = AppTest.from_file(page, default_timeout=120)
+            if 'Converter' in page:
+                app.session_state['chart_generated'] = True
+                app.session_state['pattern'] = pattern
+            return app
+        app = new_app()
+        start = time.perf_counter()
+        app.run()
+        cases[f'page run ({page})'] = time.perf_counter() - start
+        cases[f'page rerun ({page})'] = measure(app.run, repeats=3)
+        if app.exception:
+            raise RuntimeError(f'{page} raised: {app.exception[0].value}')
+    return cases
+
+
+def environment():
+    import numpy, pandas, streamlit
+    try:
+        revision = subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                                  cwd=os.path.dirname(__file__)).stdout.strip()
+    except OSError:
+        revision = ''
+    return {
+        'revision': revision or 'unknown',
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'streamlit': streamlit.__version__,
+        'machine': f'{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)',
+    }
+
+
+def compare(current, previous, threshold=REGRESSION):
+    """Imprime a razão novo/antigo de cada caso; retorna os casos mais lentos que `threshold`."""
+    regressions = []
+    print(f'\n{"case":<60} {"before":>10} {"now":>10} {"ratio":>7}')
+    for name, now in current.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        ratio = now / before
+        flag = '  <-- slower' if ratio > threshold else ''
+        print(f'{name:<60} {before*1e3:>8.2f}ms {now*1e3:>8.2f}ms {ratio:>7.2f}{flag}')
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every computational path of the app.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='synthetic pattern sizes')
+    parser.add_argument('--no-pages', action='store_true', help='skip the AppTest page timings')
+    parser.add_argument('--label', help='results file name (default: git describe)')
+    parser.add_argument('--compare', help='previous results .json to compare against')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help=f'exit with status 1 if a case is more than {REGRESSION}x slower than --compare')
+    args = parser.parse_args(argv)
+
+    info = environment()
+    cases = {}
+    for group in (attenuation_cases, lambda: pattern_cases(args.sizes), None if args.no_pages else page_cases):
+        if group is None:
+            continue
+        for name, seconds in group().items():
+            cases[name] = seconds
+            print(f'{name:<60} {seconds*1e3:>10.3f} ms')
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f'{args.label or info["revision"]}.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'environment': info, 'seconds': cases}, f, indent=1, ensure_ascii=False)
+    print(f'\nresults written to {path}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)['seconds']
+        regressions = compare(cases, previous)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,18 @@
 import streamlit as st
 import numpy as np
 import plotly.graph_objects as go
-import re
-import scipy.constants
-import math, plotly
-from plotly.subplots import make_subplots
-import base64
+from xrdtools.assets import asset_path
+from xrdtools.profiling import session_profiler, debug_panel
+from xrdtools.conversions import calculate_wavelength, calculate_energy, scattering_vector, calculate_d, convert_reflections
+from xrdtools.patterns import read_values
+from xrdtools.reflections import reflections, CENTERING_NAMES
+import pandas as pd
 
-st.set_page_config(page_title="2θ, d-spacing and Q converter", page_icon='Icons/Paineira-Logo.png', layout="wide")
-st.logo('Icons/Paineira-Logo.png', link='https://lnls.cnpem.br/facilities/paineira-en/', icon_image='Icons/Paineira-Layout.png', size='large')
+st.set_page_config(page_title="2θ, d-spacing and Q converter", page_icon=asset_path('favicon'), layout="wide")
+
+profiler = session_profiler(st.session_state, st.query_params)
+profiler.begin('d and Q converter')
+st.logo(asset_path('logo-small'), link='https://lnls.cnpem.br/facilities/paineira-en/', icon_image=asset_path('icon'), size='large')
 st.markdown(
     """
     <div style="background-color: #FF4B4B; border-radius: 5px; padding: 2px; margin-bottom: 20px;">
@@ -17,63 +21,153 @@ st.markdown(
     """, unsafe_allow_html=True
 )
 
-def get_img_as_base64(file):
-    with open(file, "rb") as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
+mode = st.radio('Mode', ['Single value', 'List of values', 'Reflections from a unit cell'], horizontal=True)
+
+if mode == 'Single value':
+    two_theta = st.number_input('2θ (degrees)', min_value=0.0, max_value=180.0, value=10.0, step=0.0001, format='%.4f')
+    energy_or_wavelength = st.radio('Select the energy or wavelength of the Uploaded XRD pattern', ['Energy (keV)', 'Wavelength (Å)'])
 
-img = get_img_as_base64('Icons/Paineira_layout_2.png')
+    if energy_or_wavelength == 'Energy (keV)':
+        energy = st.number_input('Energy (keV)', min_value=1.0, max_value=30.0, value=25.5000, step=0.0001, format='%.2f')
+        wavelength = calculate_wavelength(energy)
+        Q = scattering_vector(wavelength, two_theta)
+        d = calculate_d(wavelength, two_theta)
+        st.markdown(
+                f"""
+                <div style="background-color: #333; border: 2px solid rgb(255,75,75); border-radius: 8px; padding: 10px; margin-top: 10px; margin-bottom: 10px;">
+                    <p style="color: white; margin: 0;">Wavelength: {wavelength:.6f} Å,  Energy: {energy:.4f} keV</p>
+                    <p style="color: white; margin: 0;">Q: {Q:.4f} Å⁻¹,  d: {d:.4f} Å</p>
+                </div>
+                """, unsafe_allow_html=True
+            )
 
-# Constantes
-h = scipy.constants.physical_constants['Planck constant in eV/Hz'][0]
-c = scipy.constants.c
+    else:
+        wavelength = st.number_input('Wavelength (Å)', min_value=0.1, max_value=3.0, value=0.486213, step=0.00001, format='%.6f')
+        Q = scattering_vector(wavelength, two_theta)
+        d = calculate_d(wavelength, two_theta)
+        energy = calculate_energy(wavelength)
+        st.markdown(
+                f"""
+                <div style="background-color: #333; border: 2px solid rgb(255,75,75); border-radius: 8px; padding: 10px; margin-top: 10px; margin-bottom: 10px;">
+                    <p style="color: white; margin: 0;">Wavelength: {wavelength:.6f} Å,  Energy: {energy:.4f} keV</p>
+                    <p style="color: white; margin: 0;">Q: {Q:.4f} Å⁻¹,  d: {d:.4f} Å</p>
+                </div>
+                """, unsafe_allow_html=True
+            )
 
+elif mode == 'List of values':
+    QUANTITIES = {'2θ (degrees)': '2theta', 'd-spacing (Å)': 'd', 'Q (Å⁻¹)': 'Q'}
+    MAX_VALUES = 1_000_000
+    quantity_label = st.selectbox('Convert from', list(QUANTITIES))
+    quantity = QUANTITIES[quantity_label]
+    source = st.radio('Values', ['Paste a list', 'Upload a file', 'Range'], horizontal=True)
 
-def calculate_wavelength(energy):
-    """Calcula o comprimento de onda (Å) a partir da energia (keV)."""
-    return h * c / (energy * 1e3) * 1e10
+    values = None
+    try:
+        if source == 'Range':
+            col1, col2, col3 = st.columns(3)
+            start_value = col1.number_input('Start', min_value=0.0, value=5.0, step=0.1, format='%.4f')
+            stop_value = col2.number_input('Stop', min_value=0.0, value=60.0, step=0.1, format='%.4f')
+            step_value = col3.number_input('Step', min_value=0.0001, value=0.01, step=0.01, format='%.4f')
+            if stop_value <= start_value:
+                raise ValueError('the stop must be larger than the start')
+            if (stop_value - start_value) / step_value > MAX_VALUES:
+                raise ValueError(f'the range has more than {MAX_VALUES:,} values; increase the step')
+            values = np.arange(start_value, stop_value + step_value/2, step_value)
+        else:
+            column = st.number_input('Column', min_value=1, value=1, step=1,
+                                     help='Column of the list holding the values (ex.: the d column of a reflection list).')
+            if source == 'Paste a list':
+                text = st.text_area('Values (one per line; header and comment lines are ignored)', '10\n12.5\n20')
+                data = text if text.strip() else None
+            else:
+                uploaded = st.file_uploader('Upload a list of values or reflections', type=['txt', 'csv', 'dat', 'xy', 'hkl'])
+                data = uploaded.getvalue() if uploaded is not None else None
+            if data is not None:
+                with profiler.stage('values parsing'):
+                    values = read_values(data, column - 1)
+    except ValueError as error:
+        st.error(f'Invalid values: {error}')
 
-def calculate_energy(wavelength):
-    """Calcula a energia (keV) a partir do comprimento de onda (Å)."""
-    return h * c / (wavelength * 1e-10) * 1e-3
+    beam = st.radio('Select energies or wavelengths', ['Energy (keV)', 'Wavelength (Å)'], horizontal=True)
+    default_beam = '25.5' if beam == 'Energy (keV)' else '0.486213'
+    beam_text = st.text_input(f'{beam}, comma separated', default_beam)
+    try:
+        beam_values = np.array([float(value) for value in beam_text.replace(';', ',').split(',') if value.strip()])
+        if not len(beam_values) or np.any(beam_values <= 0):
+            raise ValueError
+    except ValueError:
+        beam_values = None
+        st.error(f'Invalid {beam}: use positive numbers separated by commas (ex.: 20, 25.5).')
 
-def scattering_vector(wavelength, two_theta):
-    """Calcula o vetor de espalhamento Q."""
-    return (4 * np.pi / wavelength) * np.sin(np.deg2rad(two_theta / 2))
+    if values is not None and beam_values is not None:
+        if beam == 'Energy (keV)':
+            energies, wavelengths = beam_values, calculate_wavelength(beam_values)
+        else:
+            energies, wavelengths = calculate_energy(beam_values), beam_values
+        if quantity == '2theta':
+            st.caption(f'The 2θ values are taken as measured at {energies[0]:.4f} keV ({wavelengths[0]:.6f} Å).')
+        with profiler.stage('conversion'):
+            d, Q, two_theta_table = convert_reflections(values, quantity, wavelengths)
 
-def calculate_d(wavelenght, two_theta):
-    """Calcula o espaçamento inter-planar"""
-    return (wavelenght / (2 * np.sin(np.deg2rad(two_theta / 2))))
+            table = pd.DataFrame({'d (Å)': d, 'Q (Å⁻¹)': Q})
+            for energy, wavelength, column_values in zip(energies, wavelengths, two_theta_table):
+                table[f'2θ at {energy:.4f} keV / {wavelength:.6f} Å (degrees)'] = column_values
+        unreachable = int(np.isnan(two_theta_table).any(axis=0).sum())
+        if unreachable:
+            st.info(f'{unreachable} value(s) have no 2θ (λ > 2d) at some of the energies and are left empty.')
+        with profiler.stage('table and CSV'):
+            st.dataframe(table, use_container_width=True)
+            st.download_button('Download table (CSV)', table.to_csv(index=False).encode('utf-8'),
+                               file_name='converted_values.csv', mime='text/csv')
 
+else:
+    st.markdown('Unit cell (Å and degrees)')
+    col1, col2, col3 = st.columns(3)
+    a = col1.number_input('a', min_value=0.1, value=4.1569, step=0.0001, format='%.4f')
+    b = col2.number_input('b', min_value=0.1, value=4.1569, step=0.0001, format='%.4f')
+    c = col3.number_input('c', min_value=0.1, value=4.1569, step=0.0001, format='%.4f')
+    alpha = col1.number_input('α', min_value=1.0, max_value=179.0, value=90.0, step=0.01, format='%.2f')
+    beta = col2.number_input('β', min_value=1.0, max_value=179.0, value=90.0, step=0.01, format='%.2f')
+    gamma = col3.number_input('γ', min_value=1.0, max_value=179.0, value=90.0, step=0.01, format='%.2f')
+    centering = st.selectbox('Lattice centering (extinction rule)', list(CENTERING_NAMES),
+                             format_func=CENTERING_NAMES.get)
+    col1, col2, col3 = st.columns(3)
+    energy = col1.number_input('Energy (keV)', min_value=1.0, max_value=100.0, value=25.5, step=0.0001, format='%.4f')
+    two_theta_min = col2.number_input('2θ min (degrees)', min_value=0.0, max_value=180.0, value=2.0, step=0.5, format='%.2f')
+    two_theta_max = col3.number_input('2θ max (degrees)', min_value=0.0, max_value=180.0, value=40.0, step=0.5, format='%.2f')
 
-two_theta = st.number_input('2θ (degrees)', min_value=0.0, max_value=180.0, value=10.0, step=0.0001, format='%.4f')
-energy_or_wavelength = st.radio('Select the energy or wavelength of the Uploaded XRD pattern', ['Energy (keV)', 'Wavelength (Å)'])
+    try:
+        if two_theta_max <= two_theta_min:
+            raise ValueError('2θ max must be larger than 2θ min')
+        with profiler.stage('reflections'):
+            peaks = reflections((a, b, c, alpha, beta, gamma), energy, two_theta_min, two_theta_max, centering)
+    except ValueError as error:
+        peaks = None
+        st.error(f'Could not generate the reflections: {error}')
 
-if energy_or_wavelength == 'Energy (keV)':
-    energy = st.number_input('Energy (keV)', min_value=1.0, max_value=30.0, value=25.5000, step=0.0001, format='%.2f')
-    wavelength = calculate_wavelength(energy)
-    Q = scattering_vector(wavelength, two_theta)
-    d = calculate_d(wavelength, two_theta)
-    st.markdown(
-            f"""
-            <div style="background-color: #333; border: 2px solid rgb(255,75,75); border-radius: 8px; padding: 10px; margin-top: 10px; margin-bottom: 10px;">
-                <p style="color: white; margin: 0;">Wavelength: {wavelength:.6f} Å,  Energy: {energy:.4f} keV</p>
-                <p style="color: white; margin: 0;">Q: {Q:.4f} Å⁻¹,  d: {d:.4f} Å</p>
-            </div>
-            """, unsafe_allow_html=True
-        )
+    if peaks is not None:
+        table = pd.DataFrame({
+            'h': peaks['h'], 'k': peaks['k'], 'l': peaks['l'],
+            'd (Å)': peaks['d'], 'Q (Å⁻¹)': peaks['Q'], '2θ (degrees)': peaks['two_theta'],
+            'Multiplicity': peaks['multiplicity'],
+        })
+        st.markdown(f'{len(table)} reflections between {two_theta_min:.2f}° and {two_theta_max:.2f}° at {energy:.4f} keV '
+                    f'({calculate_wavelength(energy):.6f} Å).')
+        with profiler.stage('plotly figure'):
+            sticks_x = np.repeat(peaks['two_theta'], 3)
+            sticks_y = np.column_stack([np.zeros(len(table)), peaks['multiplicity'], np.full(len(table), np.nan)]).ravel()
+            labels = [f"({h} {k} {l})" for h, k, l in zip(peaks['h'], peaks['k'], peaks['l'])]
+            fig = go.Figure(go.Scatter(x=sticks_x, y=sticks_y, mode='lines', line=dict(color='rgb(255,75,75)'),
+                                       text=np.repeat(labels, 3), hovertemplate='%{text}<br>2θ: %{x:.4f}°<extra></extra>'))
+            fig.update_layout(xaxis_title='2θ (degrees)', yaxis_title='Multiplicity', height=350,
+                              xaxis_range=[two_theta_min, two_theta_max], margin=dict(t=20))
+        with profiler.stage('plotly serialization'):
+            st.plotly_chart(fig, use_container_width=True)
+        with profiler.stage('table and CSV'):
+            st.dataframe(table, use_container_width=True)
+            st.download_button('Download reflection list (CSV)', table.to_csv(index=False).encode('utf-8'),
+                               file_name='reflections.csv', mime='text/csv')
 
-else:
-    wavelength = st.number_input('Wavelength (Å)', min_value=0.1, max_value=3.0, value=0.486213, step=0.00001, format='%.6f')
-    Q = scattering_vector(wavelength, two_theta)
-    d = calculate_d(wavelength, two_theta)
-    energy = calculate_energy(wavelength)
-    st.markdown(
-            f"""
-            <div style="background-color: #333; border: 2px solid rgb(255,75,75); border-radius: 8px; padding: 10px; margin-top: 10px; margin-bottom: 10px;">
-                <p style="color: white; margin: 0;">Wavelength: {wavelength:.6f} Å,  Energy: {energy:.4f} keV</p>
-                <p style="color: white; margin: 0;">Q: {Q:.4f} Å⁻¹,  d: {d:.4f} Å</p>
-            </div>
-            """, unsafe_allow_html=True
-        )
-    
\ No newline at end of file
+# Painel de depuração: tempo e memória de cada etapa desta sessão (ligado com ?profile=1)
+debug_panel(profiler)
@@ -1,15 +1,24 @@
 import streamlit as st
-import xraydb as xr
 import numpy as np
 import plotly.graph_objects as go
 import re
-import scipy.constants
-import math, plotly
+import plotly
+import pandas as pd
 from plotly.subplots import make_subplots
-import base64
+from xrdtools.attenuation import get_elements, calculate, element_curves, scan_energy_windows
+from xrdtools.container import CAPILLARIES, capillary_transmission
+from xrdtools.mixture import mixture_attenuation, solve_fraction
+from xrdtools.conversions import calculate_energy
+from xrdtools.dilution import DILUENTS, recommend
+from xrdtools.atlas import search, lookup, mu_r_curve, energy_grid
+from xrdtools.assets import asset_path, background_css
+from xrdtools.profiling import session_profiler, debug_panel
 
-st.set_page_config(page_title="X-ray Attenuation Calculator", page_icon='Icons/Paineira-Logo.png', layout="wide")
-st.logo('Icons/Paineira-Logo.png', link='https://lnls.cnpem.br/facilities/paineira-en/', icon_image='Icons/Paineira-Layout.png', size='large')
+st.set_page_config(page_title="X-ray Attenuation Calculator", page_icon=asset_path('favicon'), layout="wide")
+
+profiler = session_profiler(st.session_state, st.query_params)
+profiler.begin('Attenuation')
+st.logo(asset_path('logo-small'), link='https://lnls.cnpem.br/facilities/paineira-en/', icon_image=asset_path('icon'), size='large')
 st.markdown(
     """
     <div style="background-color: #FF4B4B; border-radius: 5px; padding: 2px; margin-bottom: 20px;">
@@ -32,6 +41,10 @@ with st.expander('How it works'):
             The transmission is calculated using the exponential attenuation formula:
             $$\text{Transmission (\%)} = 100 \times e^{-(\frac{\mu}{\rho}) \ \rho \ 2r}$$,
             where μ is the total mass attenuation coefficient, ρ is the sample's density, and r is the capillary radius.
+            This is the transmission of the ray through the centre of the capillary. The beam-averaged value also shown accounts for the
+            capillary wall (quartz or Kapton, with the inner and outer diameters of the catalogue) and averages
+            $e^{-\mu_{s} L_{s}(y) - \mu_{w} L_{w}(y)}$ over the beam profile, where $L_{s}(y)$ and $L_{w}(y)$ are the chords through the sample
+            and the wall of the ray at a distance $y$ from the capillary axis.
             ## Graphs        
             In the previous section we discussed how to calculate transmission of the X-ray beam given the sample's composition.
             The graphs above show the Mass Attenuation Coeficient (left) and the $\mu R$ (right) value of each element (multiplied by its mass percentage) as a function of energy.
@@ -39,67 +52,16 @@ with st.expander('How it works'):
             The black dotted line in the right graph represents a $\mu R$ value of 5, whihch gives a transmission of approximately 0.005%. Samples with this kind of attenuation have no sensible X-ray Diffraction signal.
             The blue dotted line represents a $\mu R$ value of 1, which gives a transmission of approximately 13.5%.
             The optimal $\mu R$ value for X-ray Diffraction experiments lies between those two dotted lines.
+            ## Dilution and mixtures
+            The diluent percentage is a fraction of the powder volume, and the packing fraction applies to the whole powder (sample and diluent).
+            For a mixture of phases with mass fractions $w_{i}$ and densities $\rho_{i}$, the powder density is
+            $\rho = 1 / \sum_{i} (w_{i} / \rho_{i})$ and
+            $$\mu R = p \ \rho \ R \sum_{i} (\frac{\mu}{\rho})_{i} \times w_{i}$$,
+            where $p$ is the packing fraction. The mixture section below accepts any number of phases, by mass or volume fraction.
             """)
 
 
-def get_img_as_base64(file):
-    with open(file, "rb") as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
-
-img = get_img_as_base64('Icons/Paineira_layout_2.png')
-
-# Constantes
-h = scipy.constants.physical_constants['Planck constant in eV/Hz'][0]
-c = scipy.constants.c
-mu = scipy.constants.m_u * (1e3)
-
-def get_elements(chemical_formula):
-    pattern = r'([A-Z][a-z]?)(\d*(\.\d+)?)'
-    matches = re.findall(pattern, chemical_formula)
-    elements = {}
-    for match in matches:
-        element = match[0]
-        quantity = match[1]
-        quantity = float(quantity) if quantity else 1.0
-        elements[element] = quantity
-    return elements
-
-    
-def calculate(chemical_formula, energy_or_wavelength, type_energy, capillary_diameter, packing_fraction, dilution=False, pct=0, diluent='graphite carbon'):
-    elements = get_elements(chemical_formula)
-    if type_energy == 'Energy (keV)':
-        energy = float(energy_or_wavelength) * 1000
-    else:
-        wavelength = float(energy_or_wavelength)
-        energy = (h*c)/(wavelength*(1e-10))
-    distance = float(capillary_diameter.split(sep=' ')[0])*0.1
-    
-    total_mass = sum([elements[element] * xr.atomic_mass(element) for element in elements])
-    
-
-    total_volume = sum([elements[element] * (1e-23) for element in elements])
-
-    density = (total_mass * mu) / total_volume
-    packing_density = density * packing_fraction
-
-    m_u_t = sum(
-        ((elements[element] * xr.atomic_mass(element)) / total_mass) * xr.mu_elam(element, energy)
-        for element in elements
-    ) * packing_density
-    if dilution:
-        diluent_mu = xr.material_mu(diluent, energy)
-        m_u_t = (1-pct/100)*m_u_t + (pct/100)*diluent_mu
-        #print(f'{diluent} mu: {diluent_mu}')
-    
-    transmission = math.exp(-distance * m_u_t) * 100
-    mu_R = m_u_t * (distance / 2)
-
-    return density, packing_density, transmission, energy, mu_R, distance, total_mass
-
-def test_chemical_element(chemical_formula):
-    elements = get_elements(chemical_formula)
-
+# CSS customizado (o fundo é servido como arquivo estático, ver xrdtools/assets.py)
 page_bg_img = f"""
 <style>
 html, body {{
@@ -108,7 +70,7 @@ html, body {{
     font-size: larger
 }}
 [data-testid="stAppViewContainer"] {{
-    background-image: url("data:image/png;base64,{img}");
+    background-image: {background_css('background-2')};
     background-size: cover;
 
 }}
@@ -129,45 +91,25 @@ html, body {{
 </style>
 """
 
-st.markdown(page_bg_img, unsafe_allow_html=True)
+with profiler.stage('background CSS'):
+    st.markdown(page_bg_img, unsafe_allow_html=True)
 
 
 # Entradas do Usuário com Validação
-chemical_formula = st.text_input("Enter the sample's chemical formula. Be aware that capitalization is required (ex: YBa2Cu3O6.5)")
-if chemical_formula and not re.match(r"^([A-Z][a-z]?\d*\.?\d*)+$", chemical_formula):
-    st.error("Invalid chemical Formula. Capitalization is required (ex: YBa2Cu3O6.5).")
+chemical_formula = st.text_input("Enter the sample's chemical formula. Be aware that capitalization is required (ex: YBa2Cu3O6.5, Ca(OH)2, CuSO4·5H2O)")
+if chemical_formula:
+    with profiler.stage('formula parsing'):
+        try:
+            get_elements(chemical_formula)
+        except ValueError as e:
+            st.error(f"Invalid chemical Formula: {e}. Capitalization is required (ex: YBa2Cu3O6.5).")
 
 energy_or_wavelength = st.text_input("Enter the X-ray energy in keV or the wavelength in Å")
 if energy_or_wavelength and not re.match(r"^-?\d+(\.\d+)?$", energy_or_wavelength):
     st.error("Enter the X-ray energy in keV or the wavelength in Å.")
 
 type_energy = st.selectbox("Select the type of entry", options=["Wavelength (Å)", "Energy (keV)"])
-capillary_diameter = st.selectbox("Capillary Diameter (mm)", [
-                "1.00 mm - Kapton",
-                "0.30 mm - Kapton",
-                "0.50 mm - Kapton",
-                "0.70 mm - Kapton",
-                "1.12 mm - Kapton",
-                "1.37 mm - Kapton",
-                "1.57 mm - Kapton",
-                "0.20 mm - Quartzo",
-                "0.30 mm - Quartzo",
-                "0.50 mm - Quartzo",
-                "0.70 mm - Quartzo",
-                "1.00 mm - Quartzo",
-                "1.20 mm - Quartzo",
-                "1.50 mm - Quartzo",
-                "0.80 mm (ID) X 0.92 mm (OD) - Quartzo",
-                "0.80 mm (ID) X 1.00 mm (OD) - Quartzo",
-                "0.86 mm (ID) X 0.92 mm (OD) - Quartzo",
-                "0.90 mm (ID) X 1.00 mm (OD) - Quartzo",
-                "1.00 mm (ID) X 1.12 mm (OD) - Quartzo",
-                "1.00 mm (ID) X 1.20 mm (OD) - Quartzo",
-                "1.06 mm (ID) X 1.12 mm (OD) - Quartzo",
-                "1.10 mm (ID) X 1.20 mm (OD) - Quartzo",
-                "1.50 mm (ID) X 1.80 mm (OD) - Quartzo",
-                "2.00 mm (ID) X 2.40 mm (OD) - Quartzo"
-])
+capillary_diameter = st.selectbox("Capillary Diameter (mm)", list(CAPILLARIES))
 packing_fraction = st.text_input("Enter the Packing Fraction. This value represents the decrease in the sample's density when filling the capillary. It should be a value between 0 and 1, and it is often 0.6.")
 if packing_fraction and not re.match(r"^0(\.\d+)?|1$", packing_fraction):
     st.error("It must be a value between 0 and 1.")
@@ -176,14 +118,13 @@ col1, col2 = st.columns(2)
 with col1:
     diluent = st.radio("Select the diluent:", ["No Dilution", "Carbon", "Silica"], captions=['', '(Graphite carbon)', '(SiO2)'])    
 with col2:
-    pct = st.slider("Percentage of Carbon/Silica", 0, 100, 0)
+    pct = st.slider("Volume percentage of Carbon/Silica", 0, 100, 0)
 
 # Executar Cálculo ao Clicar no Botão
 if st.button("Calculate"):
     if chemical_formula and energy_or_wavelength and packing_fraction:
-        elements = get_elements(chemical_formula)
         try:
-            test_chemical_element(chemical_formula)
+            elements = get_elements(chemical_formula)
             if diluent == 'Carbon':
                 dilution = True
                 diluent = 'graphite carbon'
@@ -193,46 +134,55 @@ if st.button("Calculate"):
             else:
                 dilution = False
                 diluent = None
-            density, packing_density, transmission, energy, mu_R, distance, total_mass = calculate(
-            chemical_formula, energy_or_wavelength, type_energy, capillary_diameter, float(packing_fraction), dilution, pct, diluent
-            )
+            with profiler.stage('attenuation (µ/ρ table)'):
+                density, packing_density, transmission, energy, mu_R, distance, total_mass = calculate(
+                chemical_formula, energy_or_wavelength, type_energy, capillary_diameter, float(packing_fraction), dilution, pct, diluent
+                )
             st.write(f"Density: {density:.4f} g/cm³")
             st.write(f"Packed Density: {packing_density:.4f} g/cm³")
-            st.write(f"µR: {mu_R:.4f}")
+            st.write(f"µR: {mu_R:.4f} (sample diameter {10*distance:.3f} mm)")
             st.write(f"Transmission: {transmission:.2f} %")
             st.write(f"Energy: {energy*(1e-3):.4f} keV")
+            with profiler.stage('capillary transmission'):
+                container = capillary_transmission([chemical_formula], [energy], [capillary_diameter], float(packing_fraction),
+                                                   pct if dilution else 0, diluent)
+            inner, outer, wall = container['geometry'][0]
+            st.write(f"Transmission averaged over the beam, sample + {wall} wall ({inner:.3f} mm ID, {outer:.3f} mm OD): "
+                     f"{container['total_transmission'][0, 0, 0]:.2f} % (sample only: {container['sample_transmission'][0, 0, 0]:.2f} %, "
+                     f"empty capillary: {container['wall_transmission'][0, 0, 0]:.2f} %)")
 
             # Gráficos
 
-            energy_range = np.arange(5000, 30000, 10)
-            mu_list = np.zeros(energy_range.shape)
-            cols = plotly.colors.DEFAULT_PLOTLY_COLORS
-            fig = make_subplots(rows=1, cols=2, subplot_titles=('Mass Attenuation Coefficient - µ/ρ', 'µR (Attenuation Coefficient x Capillary Radius)'))
-            i=0
-            for element in elements:
-                mu_values = xr.mu_elam(element, energy_range)
-                mass_percentage = ((elements[element] * xr.atomic_mass(element)) / total_mass)
-                mu_list += mu_values*mass_percentage
-                mu_R_values = xr.mu_elam(element, energy_range)*(distance/2)*(packing_density)*mass_percentage
-                fig.add_trace(go.Scatter(x=energy_range/1000, y=mu_values, line=dict(width=2, color=cols[i]), name=element, showlegend=False), row=1,col=1)
-                fig.add_trace(go.Scatter(x=energy_range/1000, y=mu_R_values, line=dict(width=2, color=cols[i]), name=element), row=1, col=2)
-                i+=1
-
-            fig.add_trace(go.Scatter(x=energy_range/1000, y=mu_list, line=dict(width=2, color=cols[i+1]), name="µ Total - Sample", showlegend=False), row=1,col=1)
-            fig.add_trace(go.Scatter(x=energy_range/1000, y=(mu_list*(distance/2)*packing_density), line=dict(width=2, color=cols[i+1]), name="Sample (Without Dilution)"), row=1, col=2)
+            with profiler.stage('element curves (µ/ρ table)'):
+                energy_range, mass_fractions, mu_table = element_curves(chemical_formula)
+            with profiler.stage('plotly figure'):
+                mu_list = np.zeros(energy_range.shape)
+                cols = plotly.colors.DEFAULT_PLOTLY_COLORS
+                fig = make_subplots(rows=1, cols=2, subplot_titles=('Mass Attenuation Coefficient - µ/ρ', 'µR (Attenuation Coefficient x Capillary Radius)'))
+                i=0
+                for element, mass_percentage, mu_values in zip(elements, mass_fractions, mu_table):
+                    mu_list += mu_values*mass_percentage
+                    mu_R_values = mu_values*(distance/2)*(packing_density)*mass_percentage
+                    fig.add_trace(go.Scatter(x=energy_range/1000, y=mu_values, line=dict(width=2, color=cols[i]), name=element, showlegend=False), row=1,col=1)
+                    fig.add_trace(go.Scatter(x=energy_range/1000, y=mu_R_values, line=dict(width=2, color=cols[i]), name=element), row=1, col=2)
+                    i+=1
+
+                fig.add_trace(go.Scatter(x=energy_range/1000, y=mu_list, line=dict(width=2, color=cols[i+1]), name="µ Total - Sample", showlegend=False), row=1,col=1)
+                fig.add_trace(go.Scatter(x=energy_range/1000, y=(mu_list*(distance/2)*packing_density), line=dict(width=2, color=cols[i+1]), name="Sample (Without Dilution)"), row=1, col=2)
             
-            fig.add_scatter(x=[energy/1000], y=[mu_R],row=1, col=2, marker=dict(color='Red', size=12, opacity=0.5), name='Calculated µR', showlegend=True)
-            fig.add_vline(x=energy/1000, line_dash="dash", line_color ='red', name=f'{energy*(1e-3):.4f} keV',row =1, col=2, showlegend=True)
-            fig.add_hline(y=5, line_dash="dash", line_color ='black', name='µR = 5',row =1, col=2, showlegend=True)
-            fig.add_hline(y=1, line_dash="dash", line_color ='blue', name='µR = 1',row=1, col=2, showlegend=True)
+                fig.add_scatter(x=[energy/1000], y=[mu_R],row=1, col=2, marker=dict(color='Red', size=12, opacity=0.5), name='Calculated µR', showlegend=True)
+                fig.add_vline(x=energy/1000, line_dash="dash", line_color ='red', name=f'{energy*(1e-3):.4f} keV',row =1, col=2, showlegend=True)
+                fig.add_hline(y=5, line_dash="dash", line_color ='black', name='µR = 5',row =1, col=2, showlegend=True)
+                fig.add_hline(y=1, line_dash="dash", line_color ='blue', name='µR = 1',row=1, col=2, showlegend=True)
                     
-            fig.update_annotations(font=dict(size=25, color='black'))
-            fig.update_xaxes(title_font_color='black', title_text="Energy (keV)", type="log", gridcolor='Black', tickfont=dict(color='black'), tickcolor='black', row=1, col=1)
-            fig.update_xaxes(title_font_color='black', title_text="Energy (keV)", type="log", gridcolor='Black', tickfont=dict(color='black'), tickcolor='black', row=1, col=2)
-            fig.update_yaxes(title_font_color='black', title_text=r"µ/ρ (cm²/g)", type="log", gridcolor='Black', tickfont=dict(color='black'), tickcolor='black', row=1, col=1)
-            fig.update_yaxes(title_font_color='black', title_text=r"µR", type="log", gridcolor='Black', tickfont=dict(color='black'), tickcolor='black', row=1, col=2)
-            fig.update_layout(legend=dict(title_font_family="Serif", font=dict(size=23)), plot_bgcolor='rgba(248, 249, 250, 0.9)', paper_bgcolor='rgba(248, 249, 250, 0.9)')
-            st.plotly_chart(fig)
+                fig.update_annotations(font=dict(size=25, color='black'))
+                fig.update_xaxes(title_font_color='black', title_text="Energy (keV)", type="log", gridcolor='Black', tickfont=dict(color='black'), tickcolor='black', row=1, col=1)
+                fig.update_xaxes(title_font_color='black', title_text="Energy (keV)", type="log", gridcolor='Black', tickfont=dict(color='black'), tickcolor='black', row=1, col=2)
+                fig.update_yaxes(title_font_color='black', title_text=r"µ/ρ (cm²/g)", type="log", gridcolor='Black', tickfont=dict(color='black'), tickcolor='black', row=1, col=1)
+                fig.update_yaxes(title_font_color='black', title_text=r"µR", type="log", gridcolor='Black', tickfont=dict(color='black'), tickcolor='black', row=1, col=2)
+                fig.update_layout(legend=dict(title_font_family="Serif", font=dict(size=23)), plot_bgcolor='rgba(248, 249, 250, 0.9)', paper_bgcolor='rgba(248, 249, 250, 0.9)')
+            with profiler.stage('plotly serialization'):
+                st.plotly_chart(fig)
 
             # Explicação dos Gráficos
             
@@ -242,3 +192,184 @@ if st.button("Calculate"):
         st.warning("Please, fill all the field correctly.")
     
         
+
+# Varredura de energia: janelas em que µR fica na faixa desejada
+with st.expander('Energy scan: find the energies that give a target µR'):
+    st.markdown(r"""
+            Uses the formula, capillary, packing fraction and diluent chosen above. The scan returns the energy windows where
+            $\mu R$ lies between the two limits, leaving out a margin around the absorption edges of the sample (and diluent) elements,
+            and the energy inside those windows where $\mu R$ is closest to the geometric mean of the limits.
+            """)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        mu_r_limits = st.slider("µR range", 0.1, 10.0, (1.0, 5.0), step=0.1)
+    with col2:
+        scan_range = st.slider("Energy range (keV)", 5.0, 30.0, (5.0, 30.0), step=0.5)
+    with col3:
+        edge_margin = st.number_input("Margin around absorption edges (keV)", 0.0, 5.0, 0.2, step=0.05)
+    if st.button("Scan energies"):
+        if chemical_formula and packing_fraction:
+            try:
+                scan_diluent = DILUENTS.get(diluent)
+                with profiler.stage('energy scan'):
+                    scan = scan_energy_windows(
+                        chemical_formula, capillary_diameter, float(packing_fraction), mu_r_limits[0], mu_r_limits[1],
+                        scan_range[0]*1000, scan_range[1]*1000, edge_margin*1000, pct if scan_diluent else 0, scan_diluent
+                    )[0]
+                if scan['windows']:
+                    for start, end in scan['windows']:
+                        st.write(f"{start*(1e-3):.3f} keV – {end*(1e-3):.3f} keV")
+                    st.write(f"Suggested energy: {scan['best_energy']*(1e-3):.3f} keV (µR = {scan['best_mu_R']:.3f})")
+                else:
+                    st.warning("No energy in this range gives a µR inside the chosen limits.")
+            except ValueError:
+                st.error("Invalid chemical element")
+        else:
+            st.warning("Please, fill the chemical formula and the packing fraction.")
+
+# Solver inverso: todos os capilares e diluições de uma vez, em vez de tentar um por um
+with st.expander('Recommend a capillary and dilution for a target µR'):
+    st.markdown(r"""
+            Uses the formula, energy and packing fraction chosen above and evaluates every capillary of the catalogue, without diluent
+            and with 1 to 99 % (volume) of carbon or silica. Of the options with $\mu R$ inside the band, the table keeps those that are not
+            beaten on both the amount of sample in the beam (mg per mm of capillary) and the diluent percentage: going down the table,
+            each option holds more sample at the cost of more diluent. More sample pushes $\mu R$ to the upper limit of the band,
+            so narrow the band to stay closer to a given $\mu R$.
+            """)
+    recommend_limits = st.slider("µR band", 0.1, 10.0, (1.0, 5.0), step=0.1, key='recommend_limits')
+    if st.button("Find capillary and dilution"):
+        if chemical_formula and energy_or_wavelength and packing_fraction:
+            try:
+                energy = float(energy_or_wavelength) * 1000 if type_energy == 'Energy (keV)' else calculate_energy(float(energy_or_wavelength)) * 1000
+                with profiler.stage('capillary and dilution solver'):
+                    options, grid = recommend(chemical_formula, energy, float(packing_fraction), *recommend_limits)
+                if options:
+                    st.dataframe(pd.DataFrame({
+                        'Capillary': [option['capillary'] for option in options],
+                        'Diluent': [option['diluent'] or 'No dilution' for option in options],
+                        'Diluent % (volume)': [option['pct'] for option in options],
+                        'µR': [option['mu_R'] for option in options],
+                        'Transmission (%)': [option['transmission'] for option in options],
+                        'Sample (mg/mm)': [option['sample_mass'] for option in options],
+                    }), use_container_width=True, hide_index=True)
+                    st.caption(f"{np.count_nonzero((grid['mu_R'] >= recommend_limits[0]) & (grid['mu_R'] <= recommend_limits[1]))} "
+                               f"of {grid['mu_R'].size} combinations at {energy*(1e-3):.4f} keV are inside the band.")
+                else:
+                    st.warning("No capillary and dilution of the catalogue gives a µR inside this band at this energy.")
+            except ValueError:
+                st.error("Invalid chemical element")
+        else:
+            st.warning("Please, fill the chemical formula, the energy and the packing fraction.")
+
+# Misturas de várias fases, cada uma com fórmula (ou material do xraydb) e densidade
+with st.expander('Mixtures: several phases by mass or volume fraction'):
+    st.markdown(r"""
+            Each phase is a chemical formula or an xraydb material name (*silica*, *graphite carbon*, *kapton*, ...). Leave the density
+            empty to use the material density or, for formulas, the estimate of the calculator. Uses the energy, capillary and packing
+            fraction chosen above; the fractions are normalised.
+            """)
+    phases_table = st.data_editor(
+        pd.DataFrame({'Phase': [chemical_formula or 'CeO2', 'silica'], 'Density (g/cm³)': [np.nan, np.nan], 'Fraction': [0.7, 0.3]}),
+        num_rows='dynamic', use_container_width=True, key='mixture_phases')
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        basis = st.radio("Fractions by", ['volume', 'mass'])
+    with col2:
+        target_mu_r = st.number_input("Target µR", 0.1, 10.0, 2.0, step=0.1)
+    phases_table = phases_table.dropna(subset=['Phase', 'Fraction'])
+    phases_table = phases_table[phases_table['Phase'].str.strip() != '']
+    with col3:
+        vary = st.selectbox("Phase whose fraction gives the target µR", range(len(phases_table)),
+                            format_func=lambda i: phases_table['Phase'].iloc[i])
+    if st.button("Calculate mixture"):
+        if energy_or_wavelength and packing_fraction and len(phases_table):
+            try:
+                energy = float(energy_or_wavelength) * 1000 if type_energy == 'Energy (keV)' else calculate_energy(float(energy_or_wavelength)) * 1000
+                phases = list(phases_table['Phase'].str.strip())
+                densities = list(phases_table['Density (g/cm³)'])
+                fractions = phases_table['Fraction'].to_numpy(dtype=float)
+                mixture_energies = np.append(np.arange(5000, 30000, 10), energy)
+                with profiler.stage('mixture attenuation'):
+                    mixture = mixture_attenuation(phases, fractions, mixture_energies, [capillary_diameter],
+                                                  float(packing_fraction), densities, basis)
+                    solved = solve_fraction(phases, fractions, vary, target_mu_r, [energy], capillary_diameter,
+                                            float(packing_fraction), densities, basis) if len(phases) > 1 else None
+                st.dataframe(pd.DataFrame({
+                    'Phase': phases,
+                    'Density (g/cm³)': mixture['phase_density'],
+                    'Mass %': 100*mixture['mass_fraction'][0],
+                    'Volume %': 100*mixture['volume_fraction'][0],
+                }), use_container_width=True, hide_index=True)
+                st.write(f"Mixture density: {mixture['density'][0]:.4f} g/cm³, packed density: {mixture['packing_density'][0]:.4f} g/cm³")
+                st.write(f"µR: {mixture['mu_R'][0, -1, 0]:.4f}, transmission: {mixture['transmission'][0, -1, 0]:.2f} % "
+                         f"at {energy*(1e-3):.4f} keV")
+                if solved is not None:
+                    if solved['reached'][0]:
+                        st.write(f"µR = {target_mu_r:g} with {100*solved['fraction'][0]:.2f} % ({basis}) of {phases[vary]}, "
+                                 f"keeping the proportions of the other phases.")
+                    else:
+                        st.warning(f"No fraction of {phases[vary]} gives µR = {target_mu_r:g}; the closest is "
+                                   f"{100*solved['fraction'][0]:.0f} % (µR = {solved['mu_R'][0]:.3f}).")
+                with profiler.stage('mixture figure'):
+                    mixture_fig = go.Figure()
+                    mixture_fig.add_trace(go.Scatter(x=mixture_energies[:-1]*(1e-3), y=mixture['mu_R'][0, :-1, 0], name='Mixture',
+                                                     line=dict(width=2, color='blue')))
+                    mixture_fig.add_vline(x=energy*(1e-3), line=dict(color='red', width=1, dash='dash'))
+                    mixture_fig.add_hline(y=5, line=dict(color='black', width=1, dash='dash'))
+                    mixture_fig.add_hline(y=1, line=dict(color='blue', width=1, dash='dash'))
+                    mixture_fig.update_xaxes(title_text='Energy (keV)')
+                    mixture_fig.update_yaxes(title_text='µR', type='log')
+                    mixture_fig.update_layout(height=450, plot_bgcolor='rgba(248, 249, 250, 0.9)', paper_bgcolor='rgba(248, 249, 250, 0.9)',
+                                              margin=dict(l=20, r=20, t=30, b=20))
+                with profiler.stage('mixture serialization'):
+                    st.plotly_chart(mixture_fig, use_container_width=True)
+            except ValueError as e:
+                st.error(f"Invalid mixture: {e}")
+        else:
+            st.warning("Please, fill the energy, the packing fraction and at least one phase.")
+
+# Atlas: curvas pré-calculadas de padrões e diluentes comuns, sem consultar o xraydb
+with st.expander('Material atlas: precomputed standards and diluents'):
+    st.markdown(r"""
+            Attenuation of common standards and diluents (LaB$_6$, Si, CeO$_2$, Al$_2$O$_3$, silica, graphite, ...) read from a
+            precomputed table, for the capillary and packing fraction chosen above. Search by name, formula or alias
+            (for example *ceria*, *corundum* or *NIST 660*). The estimated density is the same as in the calculator;
+            the reference density is the crystal (or bulk) density of the material.
+            """)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        atlas_query = st.text_input("Search material", "LaB6")
+    with profiler.stage('atlas search'):
+        matches = [name for name, _ in search(atlas_query)]
+    if matches:
+        with col1:
+            atlas_material = st.selectbox("Material", matches)
+        with col2:
+            atlas_energy = st.number_input("Energy (keV)", 5.0, 30.0, 20.0, step=0.1, format="%.3f", key='atlas_energy')
+        with col3:
+            reference_density = st.checkbox("Use the reference density")
+        try:
+            atlas_packing = float(packing_fraction) if packing_fraction else 1.0
+            with profiler.stage('atlas lookup'):
+                entry = lookup(atlas_material, atlas_energy*1000, capillary_diameter, atlas_packing, reference_density)
+                curve = mu_r_curve(atlas_material, capillary_diameter, atlas_packing, reference_density)
+            st.write(f"{entry['formula']}: density {entry['density']:.3f} g/cm³, packing density {entry['packing_density']:.3f} g/cm³, "
+                     f"µ/ρ = {entry['mu_rho']:.3f} cm²/g, µR = {entry['mu_R']:.3f}, transmission {entry['transmission']:.2f} %")
+            with profiler.stage('atlas figure'):
+                atlas_fig = go.Figure()
+                atlas_fig.add_trace(go.Scatter(x=energy_grid()*(1e-3), y=curve, name=atlas_material, line=dict(width=2, color='blue')))
+                atlas_fig.add_vline(x=atlas_energy, line=dict(color='black', width=1, dash='dash'))
+                atlas_fig.update_xaxes(title_text='Energy (keV)')
+                atlas_fig.update_yaxes(title_text='µR', type='log')
+                atlas_fig.update_layout(title=f'µR of {atlas_material} ({capillary_diameter}, packing {atlas_packing:g})', height=450,
+                                        plot_bgcolor='rgba(248, 249, 250, 0.9)', paper_bgcolor='rgba(248, 249, 250, 0.9)',
+                                        margin=dict(l=20, r=20, t=50, b=20))
+            with profiler.stage('atlas serialization'):
+                st.plotly_chart(atlas_fig, use_container_width=True)
+        except ValueError as e:
+            st.error(f"Atlas lookup failed: {e}")
+    else:
+        st.warning("No material of the atlas matches this search.")
+
+# Painel de depuração: tempo e memória de cada etapa desta sessão (ligado com ?profile=1)
+debug_panel(profiler)
@@ -1,24 +1,44 @@
 import streamlit as st
-import base64
-import matplotlib.pyplot as plt
 import numpy as np
-st.set_page_config(page_title="X-ray Footprint", page_icon='Icons/Paineira-Logo.png', layout="wide")
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from xrdtools.assets import asset_path, background_css
+from xrdtools.decimate import decimate
+from xrdtools.export import export_pattern
+from xrdtools.footprint import footprint, correct_spillover
+from xrdtools.patterns import read_pattern_cached
+from xrdtools.profiling import session_profiler, debug_panel
+st.set_page_config(page_title="X-ray Footprint", page_icon=asset_path('favicon'), layout="wide")
 
+profiler = session_profiler(st.session_state, st.query_params)
+profiler.begin('Footprint')
+st.logo(asset_path('logo-small'), link='https://lnls.cnpem.br/facilities/paineira-en/', icon_image=asset_path('icon'), size='large')
+st.markdown(
+    """
+    <div style="background-color: #FF4B4B; border-radius: 5px; padding: 2px; margin-bottom: 20px;">
+        <h1 style="color: Black; text-align: center;"> X-ray Footprint (reflection geometry)</h1>
+    </div>
+    """, unsafe_allow_html=True
+)
+with st.expander('How it works'):
+    st.markdown(r"""
+            In reflection geometry the beam of height $h$ reaches the flat sample at the incidence angle $\omega$ and spreads over
+            a length $h/\sin\omega$ of its surface. At low angles this footprint is longer than the sample, $L$, and part of the beam
+            misses it (spill-over). The fraction of the beam that hits the sample is
+            $$f = \min\left(1, \frac{L \sin\omega}{h}\right) \min\left(1, \frac{W}{w}\right)$$
+            for a uniform (slit-defined) beam of width $w$ on a sample of width $W$, and
+            $f = \mathrm{erf}\left(\frac{L \sin\omega}{2\sqrt{2}\sigma_h}\right) \mathrm{erf}\left(\frac{W}{2\sqrt{2}\sigma_w}\right)$
+            for a Gaussian beam, with $h$ and $w$ taken as the FWHM. In a $\theta/2\theta$ scan $\omega = 2\theta/2$;
+            with a fixed incidence angle the footprint is the same for the whole scan.
+            For a thick sample in $\theta/2\theta$ the diffracting volume does not change once the whole beam is on the sample,
+            so the spill-over correction divides the measured intensity by $f$.
+            """)
 
-st.title('Work in progress...')
-# Função para usar imagens como plano de fundo
-def get_img_as_base64(file):
-    with open(file, 'rb') as f:
-        image = f.read()
-    return base64.b64encode(image).decode()
-
-img = get_img_as_base64('Icons/Paineira-Layout.png')
-
-# CSS customizado
+# CSS customizado (o fundo é servido como arquivo estático, ver xrdtools/assets.py)
 page_bg_img = f"""
 <style>
 [data-testid="stAppViewContainer"] {{
-    background-image: url("data:image/png;base64,{img}");
+    background-image: {background_css('background')};
     background-size: cover;
 
 }}
@@ -31,36 +51,122 @@ page_bg_img = f"""
 </style>
 """
 
-st.markdown(page_bg_img, unsafe_allow_html=True)
-
-
-# Sidebar controls
-angle = st.sidebar.slider("Angle (degrees)", 0, 360, 0)
-size = st.sidebar.slider("Size", 50, 200, 100)
-angle_input = st.sidebar.number_input("Enter angle:", 0, 360, 0)
-size_input = st.sidebar.number_input("Enter size:", 50, 200, 100)
-
-# Sync sliders with input boxes
-if angle != angle_input:
-    angle = angle_input
-if size != size_input:
-    size = size_input
-
-# Plotting
-fig, ax = plt.subplots()
-ax.set_xlim(-150, 150)
-ax.set_ylim(-150, 150)
-ax.set_axis_off()
-
-# Create rotated rectangle
-theta = np.radians(angle)
-half_size = size / 2
-corners = np.array([[-half_size, -half_size], [half_size, -half_size], 
-                    [half_size, half_size], [-half_size, half_size]])
-rotation_matrix = np.array([[np.cos(theta), -np.sin(theta)], 
-                            [np.sin(theta), np.cos(theta)]])
-rotated_corners = np.dot(corners, rotation_matrix)
-poly = plt.Polygon(rotated_corners, closed=True, fill=None, edgecolor='blue', linewidth=3)
-ax.add_patch(poly)
-ax.set_aspect('equal')
-st.pyplot(fig)
\ No newline at end of file
+with profiler.stage('background CSS'):
+    st.markdown(page_bg_img, unsafe_allow_html=True)
+
+
+def footprint_sketch(beam_length, beam_width, sample_length, sample_width, two_theta):
+    """Vista de cima da amostra e da área iluminada: só duas formas, sem redesenhar dados."""
+    half = 0.6*max(sample_length, sample_width, min(beam_length, 3*sample_length), beam_width)
+    # em ω = 0 o feixe não tem fim; basta que passe das bordas do desenho
+    beam_length = min(beam_length, 4*half)
+    fig = go.Figure()
+    fig.add_shape(type='rect', x0=-sample_length/2, x1=sample_length/2, y0=-sample_width/2, y1=sample_width/2,
+                  line=dict(color='black', width=2), fillcolor='rgba(200, 200, 200, 0.6)')
+    fig.add_shape(type='rect', x0=-beam_length/2, x1=beam_length/2, y0=-beam_width/2, y1=beam_width/2,
+                  line=dict(color='rgb(255,75,75)', width=2), fillcolor='rgba(255, 75, 75, 0.35)')
+    fig.update_xaxes(range=[-half, half], title_text='Along the beam (mm)', zeroline=False)
+    fig.update_yaxes(range=[-half, half], title_text='Across the beam (mm)', zeroline=False, scaleanchor='x')
+    fig.update_layout(title=f'Footprint at 2θ = {two_theta:.2f}° (grey: sample, red: beam)', height=450,
+                      plot_bgcolor='rgba(248, 249, 250, 0.9)', paper_bgcolor='rgba(248, 249, 250, 0.9)',
+                      margin=dict(l=20, r=20, t=50, b=20))
+    return fig
+
+
+# Geometria do feixe e da amostra
+col1, col2, col3, col4 = st.columns(4)
+beam_height = col1.number_input('Beam height (mm)', min_value=0.001, value=0.5, step=0.05, format='%.3f')
+beam_width = col2.number_input('Beam width (mm)', min_value=0.001, value=10.0, step=0.5, format='%.3f')
+sample_length = col3.number_input('Sample length along the beam (mm)', min_value=0.1, value=20.0, step=1.0, format='%.2f')
+sample_width = col4.number_input('Sample width (mm)', min_value=0.1, value=20.0, step=1.0, format='%.2f')
+col1, col2, col3 = st.columns(3)
+profile_label = col1.radio('Beam profile', ['Uniform (slits)', 'Gaussian (sizes are FWHM)'])
+profile = 'uniform' if profile_label.startswith('Uniform') else 'gaussian'
+scan = col2.radio('Scan', ['θ/2θ (symmetric)', 'Fixed incidence angle'])
+omega = None
+if scan == 'Fixed incidence angle':
+    omega = col2.number_input('Incidence angle ω (degrees)', min_value=0.01, max_value=90.0, value=1.0, step=0.1, format='%.2f')
+scan_range = col3.slider('2θ range (degrees)', 0.0, 160.0, (2.0, 120.0), step=0.5)
+scan_step = col3.number_input('2θ step (degrees)', min_value=0.001, value=0.02, step=0.01, format='%.3f')
+
+with profiler.stage('footprint'):
+    scan_2theta = np.arange(scan_range[0], scan_range[1] + scan_step/2, scan_step)
+    result = footprint(scan_2theta, beam_height, beam_width, sample_length, sample_width, omega, profile)
+
+whole_beam = 'The whole beam' if profile == 'uniform' else '99 % of the beam height'
+if np.isnan(result['full_beam_omega']):
+    st.warning('The sample is shorter or narrower than the beam: part of the beam misses it at every angle.')
+elif omega is None:
+    st.write(f"{whole_beam} is on the sample for 2θ above {2*result['full_beam_omega']:.3f}° "
+             f"(ω above {result['full_beam_omega']:.3f}°).")
+else:
+    on_sample = f'{whole_beam.lower()} is' if omega >= result['full_beam_omega'] else f"{100*result['fraction'][0]:.1f} % of the beam is"
+    st.write(f"At ω = {omega:.2f}° the footprint is {result['length'][0]:.3f} mm long and {on_sample} on the sample.")
+
+sketch_2theta = st.slider('2θ shown in the sketch (degrees)', 0.0, 160.0, 20.0, step=0.1)
+with profiler.stage('plotly figure'):
+    fig = make_subplots(specs=[[{'secondary_y': True}]])
+    fig.add_trace(go.Scatter(x=scan_2theta, y=result['illuminated_length'], name='Illuminated length (mm)',
+                             line=dict(width=2, color='blue')), secondary_y=False)
+    fig.add_trace(go.Scatter(x=scan_2theta, y=100*result['fraction'], name='Beam on the sample (%)',
+                             line=dict(width=2, color='rgb(255,75,75)')), secondary_y=True)
+    fig.update_xaxes(title_text='2θ (degrees)')
+    fig.update_yaxes(title_text='Illuminated length (mm)', type='log', secondary_y=False)
+    fig.update_yaxes(title_text='Beam on the sample (%)', range=[0, 105], secondary_y=True)
+    fig.update_layout(height=450, plot_bgcolor='rgba(248, 249, 250, 0.9)', paper_bgcolor='rgba(248, 249, 250, 0.9)',
+                      legend=dict(orientation='h', y=1.12), margin=dict(l=20, r=20, t=50, b=20))
+    sketch = footprint(sketch_2theta, beam_height, beam_width, sample_length, sample_width, omega, profile)
+    sketch_fig = footprint_sketch(float(sketch['length']), beam_width, sample_length, sample_width, sketch_2theta)
+with profiler.stage('plotly serialization'):
+    col1, col2 = st.columns([3, 2])
+    col1.plotly_chart(fig, use_container_width=True)
+    col2.plotly_chart(sketch_fig, use_container_width=True)
+
+# Correção de spill-over de um difratograma medido em reflexão
+st.markdown('#### Spill-over correction of a measured pattern')
+input_pattern = st.file_uploader('Upload a pattern measured in reflection geometry (2θ, intensity)',
+                                 type=['txt', 'csv', 'xy', 'xye', 'dat'])
+if input_pattern is not None:
+    try:
+        with profiler.stage('pattern parsing'):
+            upload_id, digest = st.session_state.get('footprint_upload_hash', (None, None))
+            digest = digest if upload_id == input_pattern.file_id else None
+            digest, two_theta, intensity = read_pattern_cached(input_pattern, digest)
+            st.session_state.footprint_upload_hash = (input_pattern.file_id, digest)
+        with profiler.stage('spill-over correction'):
+            corrected = correct_spillover(two_theta, intensity, beam_height, beam_width, sample_length, sample_width,
+                                          omega, profile)
+        n_dropped = int(np.isnan(corrected).sum())
+        if n_dropped:
+            st.info(f'{n_dropped} points with less than 0.1 % of the beam on the sample were left out of the corrected pattern.')
+        with profiler.stage('pattern figure'):
+            pattern_fig = go.Figure()
+            x, y = decimate(two_theta, intensity)
+            pattern_fig.add_trace(go.Scatter(x=x, y=y, name='Measured', line=dict(width=2, color='blue')))
+            x, y = decimate(two_theta, corrected)
+            pattern_fig.add_trace(go.Scatter(x=x, y=y, name='Spill-over corrected', line=dict(width=2, color='red')))
+            pattern_fig.update_xaxes(title_text='2θ (degrees)')
+            pattern_fig.update_yaxes(title_text='Intensity (a.u.)')
+            pattern_fig.update_layout(height=450, plot_bgcolor='rgba(248, 249, 250, 0.9)',
+                                      paper_bgcolor='rgba(248, 249, 250, 0.9)', margin=dict(l=20, r=20, t=30, b=20))
+        with profiler.stage('pattern serialization'):
+            st.plotly_chart(pattern_fig, use_container_width=True)
+        # O arquivo preparado fica no session_state (o clique no download_button reexecuta a página)
+        # e só é descartado quando muda o difratograma ou a geometria
+        download_inputs = (st.session_state.footprint_upload_hash, beam_height, beam_width, sample_length, sample_width,
+                           omega, profile)
+        if st.session_state.get('footprint_download', (None,))[0] != download_inputs:
+            st.session_state.pop('footprint_download', None)
+        if st.button('Prepare the corrected pattern for download'):
+            with profiler.stage('export'):
+                kept = np.isfinite(corrected)
+                st.session_state.footprint_download = (download_inputs,
+                                                       export_pattern(two_theta[kept], corrected[kept], 'csv'))
+        if 'footprint_download' in st.session_state:
+            st.download_button('Download corrected pattern (CSV)', st.session_state.footprint_download[1],
+                               file_name='Spillover_Corrected.csv', mime='text/csv')
+    except ValueError as e:
+        st.error(f'Error processing the file: {e}.')
+
+# Painel de depuração: tempo e memória de cada etapa desta sessão (ligado com ?profile=1)
+debug_panel(profiler)
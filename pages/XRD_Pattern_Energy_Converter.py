@@ -1,19 +1,29 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-import base64, scipy.constants
 from plotly.subplots import make_subplots
-from io import StringIO
-
-# Constantes físicas
-h = scipy.constants.physical_constants['Planck constant in eV/Hz'][0]
-c = scipy.constants.c
+from xrdtools.cache import CACHES, cache_stats
+from xrdtools.assets import asset_path, background_css
+from xrdtools.conversions import calculate_wavelength, calculate_energy, scattering_vector, calculate_new_2theta, two_theta_from_q
+from xrdtools.decimate import decimate, minmax_rows
+from xrdtools.patterns import convert_pattern_cached
+from xrdtools.batch import convert_many, write_zip, write_npz, series_matrix
+from xrdtools.export import EXPORT_FORMATS, export_pattern
+from xrdtools.resample import resample
+from xrdtools.absorption import MU_R_MAX, correct_absorption
+from xrdtools.attenuation import batch_attenuation
+from xrdtools.container import CAPILLARIES
+from xrdtools.profiling import session_profiler, debug_panel
+from xrdtools.jobs import job_queue, session_jobs, JobQueueFull, QUEUED, FAILED, CANCELLED, FINISHED
+from io import BytesIO
 
 # Configurar a página inicial
 st.set_page_config(page_title='XRD - Energy Converter and Scattering Vector', 
-                   page_icon='Icons/Paineira-Logo.png', layout='wide')
-st.logo('Icons/Paineira-Logo.png', link='https://lnls.cnpem.br/facilities/paineira-en/', icon_image='Icons/Paineira-Layout.png', size='large')
+                   page_icon=asset_path('favicon'), layout='wide')
+
+profiler = session_profiler(st.session_state, st.query_params)
+profiler.begin('Energy converter')
+st.logo(asset_path('logo-small'), link='https://lnls.cnpem.br/facilities/paineira-en/', icon_image=asset_path('icon'), size='large')
 # Caixa para o título (cor de fundo diferenciada)
 st.markdown(
     """
@@ -37,7 +47,7 @@ with st.expander('How it works', expanded=True):
     - This tool is particularly useful for researchers who need to analyze how changes in X-ray energy affect the diffraction pattern, facilitating comparisons and insights into material properties.
 
     #### Important Note:
-    For the tool to recognize the dataset correctly, the file uploaded must have .txt or .csv extension. The tool will recognize the 2$\\theta$ values as the first column and the Intensity values as the second column. The columns can be seperated by either comma (',') or tab ('\\t'). Please ensure your data follows this format before uploading.
+    For the tool to recognize the dataset correctly, the file uploaded must have .txt or .csv extension. The tool will recognize the 2$\\theta$ values as the first column and the Intensity values as the second column. The columns can be seperated by comma (','), tab ('\\t') or spaces, and lines starting with '#' are ignored. Please ensure your data follows this format before uploading.
 
 
 
@@ -68,15 +78,7 @@ with st.expander('How it works', expanded=True):
     """, unsafe_allow_html=True
 )
 
-# Função para usar imagens como plano de fundo
-def get_img_as_base64(file):
-    with open(file, 'rb') as f:
-        image = f.read()
-    return base64.b64encode(image).decode()
-
-img = get_img_as_base64('Icons/Paineira-Layout.png')
-
-# CSS customizado
+# CSS customizado (o fundo é servido como arquivo estático, ver xrdtools/assets.py)
 page_bg_image = f"""
 <style>
 @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@400;700&display=swap');
@@ -89,7 +91,7 @@ html, body {{
 }}
 
 [data-testid="stAppViewContainer"] {{
-    background-image: url("data:image/png;base64,{img}");
+    background-image: {background_css('background')};
 }}
 
 [data-testid="stMarkdownContainer"] {{
@@ -152,27 +154,12 @@ div[data-testid="stDownloadButton"] > button:hover {{
 
 </style>
 """
-st.markdown(page_bg_image, unsafe_allow_html=True)
-
-# Funções auxiliares para os cálculos
-def calculate_wavelength(energy):
-    """Calcula o comprimento de onda (Å) a partir da energia (keV)."""
-    return h * c / (energy * 1e3) * 1e10
+with profiler.stage('background CSS'):
+    st.markdown(page_bg_image, unsafe_allow_html=True)
 
-def calculate_energy(wavelength):
-    """Calcula a energia (keV) a partir do comprimento de onda (Å)."""
-    return h * c / (wavelength * 1e-10) * 1e-3
-
-def calculate_new_2theta(two_theta, original_energy, new_energy):
-    """Calcula o novo ângulo 2θ para uma nova energia."""
-    return 2 * np.rad2deg(np.arcsin((original_energy / new_energy) * np.sin(np.deg2rad(two_theta / 2))))
-
-def scattering_vector(wavelength, two_theta):
-    """Calcula o vetor de espalhamento Q."""
-    return (4 * np.pi / wavelength) * np.sin(np.deg2rad(two_theta / 2))
-
-def generate_plots(two_theta, intensity, new_2theta, Q):
-    """Gera os gráficos com destaque suave."""
+# Funções auxiliares para os gráficos
+def generate_plots(two_theta, intensity, new_2theta, Q, energy, new_energy, x_range=None, q_range=None):
+    """Gera os gráficos com destaque suave, reduzindo os pontos à janela visível."""
     fig = make_subplots(
         rows=1, 
         cols=2, 
@@ -181,11 +168,14 @@ def generate_plots(two_theta, intensity, new_2theta, Q):
     )
     
     # Gráfico 1: Difratograma com nova energia
-    fig.add_trace(go.Scatter(x=two_theta, y=intensity, line=dict(width=2, color='blue'), name=f'Original Energy {energy} keV'), row=1, col=1)
-    fig.add_trace(go.Scatter(x=new_2theta, y=intensity, line=dict(width=2, color='red'), name=f'New Energy {new_energy} keV'), row=1, col=1)
+    x, y = decimate(two_theta, intensity, x_range=x_range)
+    fig.add_trace(go.Scatter(x=x, y=y, line=dict(width=2, color='blue'), name=f'Original Energy {energy} keV'), row=1, col=1)
+    x, y = decimate(new_2theta, intensity, x_range=x_range)
+    fig.add_trace(go.Scatter(x=x, y=y, line=dict(width=2, color='red'), name=f'New Energy {new_energy} keV'), row=1, col=1)
     
     # Gráfico 2: Vetor de espalhamento
-    fig.add_trace(go.Scatter(x=Q, y=intensity, line=dict(width=2, color='purple'), name=f'Scattering Vector{energy} keV'), row=1, col=2)
+    x, y = decimate(Q, intensity, x_range=q_range)
+    fig.add_trace(go.Scatter(x=x, y=y, line=dict(width=2, color='purple'), name=f'Scattering Vector{energy} keV'), row=1, col=2)
 
     
 
@@ -223,13 +213,133 @@ def generate_plots(two_theta, intensity, new_2theta, Q):
         ]
     )
     
-    fig.update_xaxes(title_text='2θ (degree)', row=1, col=1)
+    fig.update_xaxes(title_text='2θ (degree)', range=x_range, row=1, col=1)
     fig.update_yaxes(title_text='Intensity (a.u.)', row=1, col=1)
-    fig.update_xaxes(title_text='Scattering Vector (Å⁻¹)', row=1, col=2)
+    fig.update_xaxes(title_text='Scattering Vector (Å⁻¹)', range=q_range, row=1, col=2)
     fig.update_yaxes(title_text='Intensity (a.u.)', row=1, col=2)
     
     return fig
 
+SERIES_AXES = {'Q (Å⁻¹)': 'Q', '2θ at the new energy (degree)': 'new_2theta', 'Original 2θ (degree)': 'two_theta'}
+# total de pontos enviados ao navegador por gráfico da série, repartido entre os padrões
+SERIES_POINTS = 200_000
+
+def generate_series_plot(x, matrix, names, view, x_label, offset=1.0):
+    """Sobreposição, cascata ou mapa de calor de uma série que divide o mesmo eixo x.
+
+    As curvas usam WebGL (Scattergl) e já chegam reduzidas por minmax_rows,
+    até SERIES_POINTS pontos no total, de modo que centenas de padrões
+    continuam interativos no navegador.
+    """
+    x, matrix = minmax_rows(x, matrix, max(500, SERIES_POINTS // len(names)))
+    fig = go.Figure()
+    if view == 'Heatmap':
+        # as colunas do mapa ficam na posição média dos pontos escolhidos (cada uma dentro da sua faixa)
+        fig.add_trace(go.Heatmap(x=x.mean(axis=0), y=np.arange(len(names)), z=matrix, colorscale='Viridis',
+                                 hovertemplate='Pattern %{y}<br>x: %{x:.4f}<br>I: %{z:.4g}<extra></extra>'))
+        fig.update_yaxes(title_text='Pattern index')
+    else:
+        step = offset * np.nanmax(matrix) if view == 'Waterfall' else 0.0
+        for row, name in enumerate(names):
+            fig.add_trace(go.Scattergl(x=x[row], y=matrix[row] + row*step, mode='lines', name=name, line=dict(width=1)))
+        fig.update_yaxes(title_text='Intensity (a.u.)' + (' + offset' if step else ''))
+        fig.update_layout(showlegend=len(names) <= 20)
+    fig.update_xaxes(title_text=x_label)
+    fig.update_layout(
+        font=dict(color='black'),
+        legend=dict(font=dict(color='black')),
+        plot_bgcolor='rgba(248, 249, 250, 0.9)',
+        paper_bgcolor='rgba(248, 249, 250, 0.9)',
+        margin=dict(l=20, r=20, t=40, b=20),
+        height=600,
+    )
+    return fig
+
+def correction_mu_r(mu_r, sample, energies):
+    """µR da correção em cada energia (keV): o valor digitado, ou o da amostra (fórmula, capilar, empacotamento) em cada uma."""
+    if sample is None:
+        return np.full(len(energies), mu_r)
+    formula, capillary, packing = sample
+    return batch_attenuation([formula], 1000*np.asarray(energies, dtype=float), [capillary], packing)['mu_R'][0, :, 0]
+
+def absorption_correctable(mu_r_values, energies, what):
+    """Se todos os µR cabem na tabela da correção; senão avisa que `what` fica sem correção."""
+    worst = int(np.argmax(mu_r_values))
+    if mu_r_values[worst] <= MU_R_MAX:
+        return True
+    st.warning(f'µR = {mu_r_values[worst]:.3f} at {energies[worst]:.4f} keV is above {MU_R_MAX:g}, too absorbing to be '
+               f'corrected: the {what} is shown without absorption correction.')
+    return False
+
+# Conversões em segundo plano (xrdtools/jobs.py): leitura e conversão rodam numa thread
+# de trabalho e a página só acompanha o progresso, sem travar a sessão
+JOB_POLL_SECONDS = 0.5
+# conversões rápidas terminam dentro desta espera e aparecem na mesma execução
+JOB_WAIT_SECONDS = 0.3
+BUSY_MESSAGE = 'The server is busy with other conversions; please try again in a moment.'
+jobs = session_jobs(st.session_state)
+
+def pattern_job(job, data, energy, new_energy, digest):
+    """Lê e converte um difratograma enviado (fora da thread do script)."""
+    job.report(0, 1, 'reading the pattern')
+    return convert_pattern_cached(BytesIO(data), energy, new_energy, digest)
+
+def batch_job(job, sources, energy, new_energy, npz):
+    """Converte a série e grava o arquivo para download (fora da thread do script)."""
+    results = convert_many(sources, energy, new_energy,
+                           progress=lambda done, total: job.report(done, 2*total, f'converted {done}/{total} patterns'))
+    output = BytesIO()
+    if npz:
+        job.report(len(results), 2*len(results), 'writing the archive')
+        write_npz(results, output)
+    else:
+        write_zip(results, output, new_energy,
+                  progress=lambda done, total: job.report(total + done, 2*total, f'archived {done}/{total} patterns'))
+    return results, output.getvalue()
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(key, label):
+    """Progresso e cancelamento do trabalho; quando ele termina, reexecuta a página inteira para recolhê-lo."""
+    job = job_queue.get(jobs[key]['id']) if key in jobs else None
+    if job is None or job.status in FINISHED:
+        st.rerun()
+    if job.status == QUEUED:
+        text = f'{label}: waiting for a free worker...'
+    else:
+        text = f'{label}: {job.message or "running"} ({job.seconds:.0f} s)'
+    st.progress(job.progress or 0.0, text=text)
+    if st.button('Cancel', key=f'cancel_{key}'):
+        job.cancel()
+
+def collect_job(key, label, what):
+    """(trabalho, pedido) do trabalho `key` da sessão, se terminou bem; senão None.
+
+    Na primeira consulta espera até JOB_WAIT_SECONDS; enquanto o trabalho
+    roda, mostra o progresso num fragmento. Falhas e cancelamentos viram
+    mensagens, e o trabalho terminado é esquecido pela fila.
+    """
+    entry = jobs.get(key)
+    if entry is None:
+        return None
+    job = job_queue.get(entry['id'])
+    if job is None:
+        del jobs[key]
+        st.warning(f'The {label.lower()} expired before it was collected; please run it again.')
+        return None
+    if not job.wait(0 if entry.get('waited') else JOB_WAIT_SECONDS):
+        entry['waited'] = True
+        job_progress(key, label)
+        return None
+    del jobs[key]
+    job_queue.discard(job.id)
+    if job.status == FAILED:
+        st.error(f'Error processing the {what}: {job.error}.')
+    elif job.status == CANCELLED:
+        st.info(f'{label} cancelled.')
+    else:
+        return job, entry
+    return None
+
 # --- Persistência do gráfico usando session_state ---
 if "chart_generated" not in st.session_state:
     st.session_state.chart_generated = False
@@ -287,59 +397,227 @@ input_XRD = st.file_uploader('Upload the XRD pattern', type=['txt', 'csv'])
 
 # Botão para converter e gerar os gráficos
 if st.button('Convert and plot both graphs (2θ x Intensity and Scattering Vector x Intensity)'):
-    if input_XRD is not None:
+    if input_XRD is not None and new_energy is None:
+        st.error('Please enter the new energy or wavelength.')
+    elif input_XRD is not None:
+        # o arquivo só é relido se o conteúdo mudar; trocar a nova energia só refaz o arcsin.
+        # O hash de cada envio é guardado na sessão para não ser recalculado a cada clique.
+        upload_id, digest = st.session_state.get('upload_hash', (None, None))
+        digest = digest if upload_id == input_XRD.file_id else None
+        if 'pattern' in jobs:
+            job_queue.discard(jobs.pop('pattern')['id'])
         try:
-            bytes_file = input_XRD.getvalue()
-            bytes_file = bytes_file.decode()
-
-            if "\t" in bytes_file:
-                input_df = pd.read_csv(input_XRD, sep='\t', comment="#")
-            else:
-                input_df = pd.read_csv(input_XRD, sep=',', comment="#")
-            #print(input_df)
-            two_theta = input_df.iloc[:, 0]
-            intensity = input_df.iloc[:, 1]
-
-            new_2theta = calculate_new_2theta(two_theta, energy, new_energy)
-            
-            Q = scattering_vector(wavelength, two_theta)
-       
-
-            fig = generate_plots(two_theta, intensity, new_2theta, Q)
-            st.session_state.chart_generated = True
-            st.session_state.fig = fig
-
-
-            st.session_state.new_diffractogram = pd.DataFrame({'2theta (degree)': new_2theta, 'Intensity': intensity}).to_csv(index=False)
-
-            st.session_state.scattering_data = pd.DataFrame({'Scattering Vector (Å⁻¹)': Q, 'Intensity': intensity}).to_csv(index=False)
-
-
-        except Exception as e:
-            st.error(f'Error processing the file: {e}.')
+            job = job_queue.submit(pattern_job, input_XRD.getvalue(), energy, new_energy, digest, name=input_XRD.name)
+            jobs['pattern'] = {'id': job.id, 'file_id': input_XRD.file_id, 'energies': (energy, new_energy, wavelength)}
+        except JobQueueFull:
+            st.warning(BUSY_MESSAGE)
     else:
         st.error('Please upload a valid XRD pattern file.')
 
+with profiler.stage('pattern job'):
+    collected = collect_job('pattern', 'Pattern conversion', 'file')
+if collected is not None:
+    job, request = collected
+    digest, two_theta, intensity, new_2theta, Q = job.result
+    st.session_state.upload_hash = (request['file_id'], digest)
+    st.session_state.chart_generated = True
+    st.session_state.pattern = (two_theta, intensity, new_2theta, Q) + request['energies']
+    # os arquivos preparados do difratograma anterior saem da sessão assim que ele é substituído
+    st.session_state.pop('download_files', None)
+
+# Correção de absorção do cilindro, aplicada ao difratograma e à série em lote
+with st.expander('Absorption correction (cylindrical sample)'):
+    st.markdown(r'''
+        Divides the intensity by the Debye-Scherrer transmission factor $A(\theta, \mu R)$ of a cylindrical sample,
+        interpolated from a precomputed table ($\mu R$ up to 10). $\mu R$ can be entered or computed from the sample
+        as in the X-ray attenuation calculator, at the energy of each corrected pattern.
+        ''')
+    correction = st.radio('µR of the sample', ['No correction', 'Enter µR', 'Compute µR from the sample'], horizontal=True)
+    mu_r = None
+    sample = None
+    if correction == 'Enter µR':
+        mu_r = st.number_input('µR', min_value=0.0, max_value=MU_R_MAX, value=1.0, step=0.1, format='%.3f')
+    elif correction == 'Compute µR from the sample':
+        col1, col2, col3 = st.columns(3)
+        sample_formula = col1.text_input('Chemical formula of the sample')
+        sample_capillary = col2.selectbox('Capillary', list(CAPILLARIES))
+        sample_packing = col3.number_input('Packing fraction', min_value=0.01, max_value=1.0, value=0.6, step=0.05)
+        if sample_formula:
+            # µR na energia do difratograma mostrado (a dos campos acima, se ainda não há um);
+            # a série em lote usa a energia de cada padrão
+            shown_energy = st.session_state.pattern[4] if st.session_state.chart_generated else energy
+            try:
+                sample_mu_r = correction_mu_r(None, (sample_formula, sample_capillary, sample_packing), [shown_energy])[0]
+                st.write(f'µR at {shown_energy:.4f} keV: {sample_mu_r:.4f}')
+                sample = (sample_formula, sample_capillary, sample_packing)
+            except ValueError as e:
+                st.error(f'Invalid chemical formula: {e}.')
+absorption = mu_r is not None or sample is not None
+
 # Exibir gráficos e botões de download
 if st.session_state.chart_generated:
+    # O gráfico é refeito a cada interação só com os pontos da janela escolhida
+    two_theta, intensity, new_2theta, Q, plot_energy, plot_new_energy, plot_wavelength = st.session_state.pattern
+    if absorption:
+        with profiler.stage('absorption correction'):
+            pattern_mu_r = correction_mu_r(mu_r, sample, [plot_energy])
+            if absorption_correctable(pattern_mu_r, [plot_energy], 'pattern'):
+                intensity = correct_absorption(two_theta, intensity, pattern_mu_r[0])
+    angles = np.concatenate([two_theta, new_2theta])
+    angles = angles[np.isfinite(angles)]
+    x_range = st.slider('2θ range shown (degree)', float(angles.min()), float(angles.max()),
+                        (float(angles.min()), float(angles.max())), step=0.01)
+    q_range = tuple(float(q) for q in scattering_vector(plot_wavelength, np.array(x_range)))
+    with profiler.stage('plotly figure'):
+        fig = generate_plots(two_theta, intensity, new_2theta, Q, plot_energy, plot_new_energy, x_range, q_range)
     # Container simplificado sem borda
-    st.plotly_chart(st.session_state.fig, use_container_width=True)
+    with profiler.stage('plotly serialization'):
+        st.plotly_chart(fig, use_container_width=True)
     
-    # Botões de download
+    # Botões de download: os arquivos só são gerados quando pedidos, a partir dos arrays
     col_left, col_center, col_right = st.columns([1,2,1])
     with col_center:
+        export_format = st.selectbox('Download format', list(EXPORT_FORMATS))
+        float32 = st.checkbox('Single precision (float32)')
+        extension, mime = EXPORT_FORMATS[export_format]
+        plot_new_wavelength = calculate_wavelength(plot_new_energy)
+        uniform = st.checkbox('Resample onto a uniform grid',
+                              help='Rebins the pattern onto uniform steps, conserving the integrated intensity; '
+                                   'the error column carries the propagated uncertainties.')
+        if uniform:
+            col1, col2 = st.columns(2)
+            two_theta_step = col1.number_input('2θ step (degree)', min_value=0.0001, value=0.005, step=0.001, format='%.4f')
+            q_step = col2.number_input('Q step (Å⁻¹)', min_value=0.00001, value=0.001, step=0.0005, format='%.5f')
+        # Os arquivos preparados ficam no session_state (o clique num download_button reexecuta a página)
+        # e são descartados quando muda o difratograma, a correção ou uma opção de exportação; até lá
+        # ocupam a memória da sessão, o preço de o download continuar disponível
+        download_inputs = (st.session_state.get('upload_hash'), plot_energy, plot_new_energy, mu_r, sample,
+                           export_format, float32, uniform, (two_theta_step, q_step) if uniform else None)
+        if st.session_state.get('download_files', (None,))[0] != download_inputs:
+            st.session_state.pop('download_files', None)
+        if st.button('Prepare files for download'):
+            try:
+                with profiler.stage('export'):
+                    if uniform:
+                        x_new, i_new, e_new, n_masked = resample(new_2theta, intensity, two_theta_step)
+                        x_q, i_q, e_q, _ = resample(Q, intensity, q_step)
+                        kept_new, kept_q = np.isfinite(i_new), np.isfinite(i_q)
+                        new_data = (x_new[kept_new], i_new[kept_new], e_new[kept_new])
+                        q_data = (x_q[kept_q], i_q[kept_q], e_q[kept_q])
+                        if n_masked:
+                            st.info(f'{n_masked} points with no 2θ at {plot_new_energy:.4f} keV were left out of the resampled pattern.')
+                    else:
+                        new_data = (new_2theta, intensity, None)
+                        q_data = (Q, intensity, None)
+                    new_file = export_pattern(new_data[0], new_data[1], extension, '2theta (degree)', float32, new_data[2])
+                    q_file = export_pattern(q_data[0], q_data[1], extension, 'Scattering Vector (Å⁻¹)', float32, q_data[2])
+                st.session_state.download_files = (download_inputs, new_file, q_file)
+            except ValueError as e:
+                st.error(f'Error preparing the files: {e}.')
+        if 'download_files' in st.session_state:
+            _, new_file, q_file = st.session_state.download_files
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button(
+                    label="Download New Diffractogram",
+                    data=new_file,
+                    file_name=f'New_Diffractogram_{plot_new_energy:.4f}keV_{plot_new_wavelength:.5f}Å.{extension}',
+                    mime=mime
+                )
+            with col2:
+                st.download_button(
+                    label="Download Scattering Vector Data",
+                    data=q_file,
+                    file_name=f'Scattering_Vector_{plot_new_energy:.4f}keV_{plot_new_wavelength:.5f}Å.{extension}',
+                    mime=mime
+                )
+
+# Conversão em lote (séries em temperatura/tempo)
+with st.expander('Batch conversion (several patterns or a .zip archive)'):
+    batch_files = st.file_uploader('Upload the XRD patterns', type=['txt', 'csv', 'xy', 'xye', 'dat', 'zip'], accept_multiple_files=True)
+    batch_format = st.radio('Output format', ['ZIP with one CSV per pattern', 'Stacked arrays (.npz)'], horizontal=True)
+    if st.button('Convert all patterns'):
+        if not batch_files:
+            st.error('Please upload at least one XRD pattern file.')
+        elif new_energy is None:
+            st.error('Please enter the new energy or wavelength.')
+        else:
+            if 'batch' in jobs:
+                job_queue.discard(jobs.pop('batch')['id'])
+            npz = batch_format == 'Stacked arrays (.npz)'
+            try:
+                job = job_queue.submit(batch_job, [(f.name, f.getvalue()) for f in batch_files], energy, new_energy, npz,
+                                       name='batch conversion')
+                jobs['batch'] = {'id': job.id, 'energies': (energy, new_energy), 'npz': npz}
+            except JobQueueFull:
+                st.warning(BUSY_MESSAGE)
+    with profiler.stage('batch job'):
+        collected = collect_job('batch', 'Batch conversion', 'files')
+    if collected is not None:
+        job, request = collected
+        results, data = job.result
+        batch_new_energy = request['energies'][1]
+        st.session_state.batch_results = results
+        st.session_state.batch_energies = request['energies']
+        if request['npz']:
+            st.session_state.batch_output = (data, f'Converted_Patterns_{batch_new_energy:.4f}keV.npz', 'application/octet-stream')
+        else:
+            st.session_state.batch_output = (data, f'Converted_Patterns_{batch_new_energy:.4f}keV.zip', 'application/zip')
+        st.success(f'{len(results)} patterns converted in {job.seconds:.1f} s.')
+    if 'batch_output' in st.session_state:
+        data, file_name, mime = st.session_state.batch_output
+        st.download_button(label='Download Converted Patterns', data=data, file_name=file_name, mime=mime)
+
+    # Comparação da série: uma única matriz (padrões x eixo comum) alimenta as três vistas
+    if 'batch_results' in st.session_state:
+        results = st.session_state.batch_results
         col1, col2 = st.columns(2)
-        with col1:
-            st.download_button(
-                label="Download New Diffractogram",
-                data=st.session_state.new_diffractogram,
-                file_name=f'New_Diffractogram_{new_energy:.4f}keV_{new_wavelength:.5f}Å.csv',
-                mime='text/csv'
-            )
-        with col2:
-            st.download_button(
-                label="Download Scattering Vector Data",
-                data=st.session_state.scattering_data,
-                file_name=f'Scattering_Vector_{new_energy:.4f}keV_{new_wavelength:.5f}Å.csv',
-                mime='text/csv'
-            )
\ No newline at end of file
+        view = col1.radio('Series view', ['Overlay', 'Waterfall', 'Heatmap'], horizontal=True)
+        axis_label = col2.radio('x axis', list(SERIES_AXES), horizontal=True)
+        normalize = st.checkbox('Normalize each pattern to its maximum')
+        offset = 1.0
+        if view == 'Waterfall':
+            offset = st.slider('Offset between patterns (fraction of the maximum intensity)', 0.0, 2.0, 0.2, step=0.05)
+        try:
+            series_axis = SERIES_AXES[axis_label]
+            with profiler.stage('series matrix'):
+                x, matrix = series_matrix(results, series_axis)
+            if absorption:
+                # 2θ original de cada coluna do eixo comum e o µR de cada padrão na sua energia,
+                # e a série inteira corrigida de uma vez
+                batch_energy, batch_new_energy = st.session_state.batch_energies
+                if series_axis == 'Q':
+                    series_two_theta = two_theta_from_q(calculate_wavelength(batch_energy), x)
+                elif series_axis == 'new_2theta':
+                    series_two_theta = calculate_new_2theta(x, batch_new_energy, batch_energy)
+                else:
+                    series_two_theta = x
+                with profiler.stage('series absorption correction'):
+                    series_energies = np.full(len(results), batch_energy)
+                    series_mu_r = correction_mu_r(mu_r, sample, series_energies)
+                    if absorption_correctable(series_mu_r, series_energies, 'series'):
+                        matrix = correct_absorption(series_two_theta, matrix, series_mu_r[:, None])
+            if normalize:
+                matrix = matrix / np.nanmax(matrix, axis=1, keepdims=True)
+            names = [result[0] for result in results]
+            with profiler.stage('series figure'):
+                series_fig = generate_series_plot(x, matrix, names, view, axis_label, offset)
+            with profiler.stage('series serialization'):
+                st.plotly_chart(series_fig, use_container_width=True)
+        except ValueError as e:
+            st.error(f'Could not compare the patterns: {e}.')
+
+# Painel de depuração: uso dos caches compartilhados pelo processo; limpar os caches afeta
+# todas as sessões, então só aparece com a instrumentação ligada (?profile=1)
+if profiler.enabled:
+    with st.expander('Debug: cache and job statistics'):
+        st.dataframe(cache_stats(), use_container_width=True, hide_index=True)
+        st.caption('Background conversion jobs of this process')
+        st.dataframe([job_queue.stats()], use_container_width=True, hide_index=True)
+        if st.button('Clear all caches'):
+            for cache in CACHES.values():
+                cache.clear()
+            st.rerun()
+
+# Painel de depuração: tempo e memória de cada etapa desta sessão (ligado com ?profile=1)
+debug_panel(profiler)
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from xrdtools.absorption import MU_R_MAX, TOLERANCE, absorption_factor, check_table, correct_absorption, transmission_factor
+
+
+def test_transmission_factor_by_direct_integration():
+    # A(θ=0, µR=1) do cilindro, por integração direta com o dobro de nós
+    assert np.isclose(transmission_factor([0.0], [1.0], 192)[0, 0], 0.1964, atol=1e-4)
+    assert np.allclose(transmission_factor([0.0, 30.0, 90.0], [0.0]), 1.0)
+
+
+def test_table_matches_direct_integration():
+    assert np.isclose(absorption_factor(0.0, 1.0), 0.1964, atol=1e-4)
+    assert check_table(n_points=200) < TOLERANCE
+
+
+def test_series_correction_with_one_mu_r_per_pattern():
+    two_theta = np.linspace(5, 120, 50)
+    intensity = np.ones((2, 50))
+    corrected = correct_absorption(two_theta, intensity, np.array([[0.5], [2.0]]))
+    assert np.allclose(corrected[0], 1 / absorption_factor(two_theta, 0.5))
+    assert np.allclose(corrected[1], 1 / absorption_factor(two_theta, 2.0))
+    with pytest.raises(ValueError):
+        correct_absorption(two_theta, intensity, MU_R_MAX + 1)
@@ -0,0 +1,13 @@
+import pytest
+from xrdtools.assets import background_css
+
+
+def test_background_css_is_a_single_value():
+    css = background_css('background')
+    assert css.startswith('image-set(') and ';' not in css
+    assert 'background.webp?v=' in css and 'background.png?v=' in css
+
+
+def test_background_css_rejects_unknown_assets():
+    with pytest.raises(ValueError):
+        background_css('background"); color: red; x("')
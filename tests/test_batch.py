@@ -0,0 +1,37 @@
+import io
+import threading
+import zipfile
+from xrdtools.batch import convert_many, unique_stems, write_zip
+
+PATTERN = b'10 100\n20 200\n30 150\n'
+
+
+def test_unique_stems():
+    assert unique_stems(['a.xy', 'b.xy']) == ['a', 'b']
+    assert unique_stems(['p.csv', 'p.xy']) == ['p_csv', 'p_xy']
+    assert unique_stems(['p.xy', 'p.xy', 'q.dat']) == ['p_xy', 'p_xy_2', 'q']
+
+
+def test_zip_keeps_patterns_with_the_same_stem():
+    results = convert_many([('p.csv', PATTERN), ('p.xy', PATTERN), ('p.xy', PATTERN)], 25.5, 20, max_workers=1)
+    buffer = io.BytesIO()
+    write_zip(results, buffer, 20, max_workers=1)
+    names = zipfile.ZipFile(buffer).namelist()
+    assert len(names) == len(set(names)) == 6
+
+
+def test_process_pool_from_a_worker_thread():
+    # como na fila de trabalhos: o pool é criado fora da thread principal
+    sources = [(f'{i}.xy', PATTERN) for i in range(4)] + [('0.csv', PATTERN)]
+    outcome = {}
+
+    def work():
+        results = convert_many(sources, 25.5, 20, max_workers=2)
+        buffer = io.BytesIO()
+        write_zip(results, buffer, 20, max_workers=2)
+        outcome['names'] = zipfile.ZipFile(buffer).namelist()
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    thread.join(60)
+    assert len(set(outcome['names'])) == 10
@@ -0,0 +1,18 @@
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_cli(*args, stdin=''):
+    return subprocess.run([sys.executable, '-m', 'xrdtools', *args], input=stdin, capture_output=True, text=True,
+                          cwd=ROOT, check=True).stdout
+
+
+def test_dq_reads_a_csv_with_header_from_stdin():
+    output = run_cli('dq', '--wavelength', '0.4862', stdin='2theta (degree),Intensity\n10,100\n12.5,200\n')
+    lines = output.splitlines()
+    assert lines[0] == '2theta (degree),Q (1/Å),d (Å)'
+    assert [line.split(',')[0] for line in lines[1:]] == ['10.000000', '12.500000']
+    assert run_cli('dq', '10', '12.5', '--wavelength', '0.4862') == output
@@ -0,0 +1,21 @@
+import numpy as np
+from xrdtools.atlas import lookup
+from xrdtools.attenuation import batch_attenuation, calculate, capillary_distance
+from xrdtools.container import capillary_transmission
+
+
+def test_catalogue_labels_use_the_inner_diameter():
+    assert np.isclose(capillary_distance('0.20 mm - Quartzo'), 0.018)
+    assert np.isclose(capillary_distance('0.50 mm - Kapton'), 0.05)
+    assert np.isclose(capillary_distance('0.80 mm (ID) X 1.00 mm (OD) - Quartzo'), 0.08)
+    assert np.isclose(capillary_distance('0.5'), 0.05)
+
+
+def test_mu_r_agrees_across_calculators():
+    label = '0.20 mm - Quartzo'
+    single = calculate('CeO2', 20, 'Energy (keV)', label, 0.6)[4]
+    batch = batch_attenuation(['CeO2'], [20000], [label], 0.6)['mu_R'][0, 0, 0]
+    container = capillary_transmission(['CeO2'], [20000], [label], 0.6)['mu_R'][0, 0, 0]
+    atlas = lookup('CeO2', 20000, label, 0.6)['mu_R']
+    assert np.isclose(single, batch) and np.isclose(single, container)
+    assert np.isclose(single, atlas, rtol=1e-3)
@@ -0,0 +1,16 @@
+import numpy as np
+from xrdtools.decimate import minmax_rows
+
+
+def test_minmax_rows_keeps_the_true_positions_of_the_extremes():
+    x = np.arange(100, dtype=float)
+    curves = np.zeros((2, 100))
+    curves[0, 7], curves[0, 3] = 5.0, -5.0
+    curves[1, 2], curves[1, 8] = 4.0, -4.0
+    curves[1, 50:] = np.nan
+    x_out, reduced = minmax_rows(x, curves, max_points=20)
+    assert x_out.shape == reduced.shape == (2, 20)
+    assert list(x_out[0, :2]) == [3.0, 7.0] and list(reduced[0, :2]) == [-5.0, 5.0]
+    assert list(x_out[1, :2]) == [2.0, 8.0] and list(reduced[1, :2]) == [4.0, -4.0]
+    assert np.all(np.diff(x_out, axis=1) >= 0)
+    assert np.isnan(reduced[1, 10:]).all()
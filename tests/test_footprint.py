@@ -0,0 +1,16 @@
+import numpy as np
+from xrdtools.footprint import footprint
+
+
+def test_full_beam_angle():
+    result = footprint(np.array([2.0, 20.0]), 0.5, 10, 20, 20)
+    assert np.isclose(result['full_beam_omega'], np.degrees(np.arcsin(0.5 / 20)))
+    assert np.isclose(result['fraction'][1], 1.0)
+
+
+def test_beam_wider_than_the_sample():
+    two_theta = np.linspace(1, 120, 500)
+    for profile in ('uniform', 'gaussian'):
+        result = footprint(two_theta, 0.5, 30, 20, 20, profile=profile)
+        assert np.isnan(result['full_beam_omega'])
+        assert result['fraction'].max() < 0.99
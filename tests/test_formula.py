@@ -0,0 +1,16 @@
+import pytest
+from xrdtools.formula import parse_formula
+
+
+def test_zero_hydrate_coefficient():
+    assert parse_formula('CuSO4·0H2O') == parse_formula('CuSO4') == {'Cu': 1.0, 'S': 1.0, 'O': 4.0}
+
+
+def test_hydrate_coefficient():
+    assert parse_formula('CuSO4·5H2O') == {'Cu': 1.0, 'S': 1.0, 'O': 9.0, 'H': 10.0}
+
+
+def test_zero_group_count():
+    assert parse_formula('CaCO3(H2O)0') == {'Ca': 1.0, 'C': 1.0, 'O': 3.0}
+    with pytest.raises(ValueError, match='empty'):
+        parse_formula('(H2O)0')
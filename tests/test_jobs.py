@@ -0,0 +1,61 @@
+import time
+import threading
+import pytest
+from xrdtools.jobs import CANCELLED, DONE, FAILED, RUNNING, JobQueue, JobQueueFull
+
+
+def blocking(job, event):
+    event.wait(10)
+    return 'ok'
+
+
+def test_queue_full_and_cancel_while_queued():
+    release = threading.Event()
+    ran = []
+    jobs = JobQueue(max_workers=1, max_queued=2)
+    first = jobs.submit(blocking, release)
+    while first.status != RUNNING:
+        time.sleep(0.01)
+    queued = jobs.submit(lambda job: ran.append(job.id))
+    jobs.submit(blocking, release)
+    with pytest.raises(JobQueueFull):
+        jobs.submit(blocking, release)
+    queued.cancel()
+    assert queued.status == CANCELLED
+    release.set()
+    assert first.wait(10) and first.status == DONE and first.result == 'ok'
+    time.sleep(0.1)
+    assert ran == []
+
+
+def test_cooperative_cancel_through_report():
+    started = threading.Event()
+
+    def work(job):
+        for i in range(1000):
+            started.set()
+            time.sleep(0.01)
+            job.report(i, 1000)
+
+    job = JobQueue(max_workers=1).submit(work)
+    started.wait(10)
+    job.cancel()
+    assert job.wait(10) and job.status == CANCELLED
+    assert job.done < 999
+
+
+def test_failed_job_keeps_the_error():
+    def fail(job):
+        raise ValueError('bad pattern')
+
+    job = JobQueue(max_workers=1).submit(fail)
+    assert job.wait(10) and job.status == FAILED
+    assert isinstance(job.error, ValueError) and job.result is None
+
+
+def test_finished_jobs_expire():
+    jobs = JobQueue(max_workers=1, ttl=0.05)
+    job = jobs.submit(lambda job: 1)
+    assert job.wait(10) and jobs.get(job.id) is job
+    time.sleep(0.1)
+    assert jobs.get(job.id) is None
@@ -0,0 +1,38 @@
+import numpy as np
+from xrdtools.mixture import mass_fractions, mixture_attenuation, phase_curves, solve_fraction, volume_fractions
+
+PHASES = ['CeO2', 'SiO2']
+DENSITIES = [7.215, 2.2]
+ENERGIES = [15000, 20000, 25500]
+
+
+def test_mass_blend():
+    w = np.array([0.3, 0.7])
+    curves = phase_curves(PHASES, ENERGIES, DENSITIES)
+    result = mixture_attenuation(PHASES, w, ENERGIES, [0.5], 0.6, DENSITIES)
+    mu_rho = w[0]*curves['mu_rho'][0] + w[1]*curves['mu_rho'][1]
+    density = 1 / (w[0]/DENSITIES[0] + w[1]/DENSITIES[1])
+    assert np.allclose(result['mu_rho'][0], mu_rho)
+    assert np.isclose(result['density'][0], density)
+    assert np.allclose(result['mu_R'][0, :, 0], mu_rho*density*0.6*0.05/2)
+
+
+def test_volume_mass_round_trip():
+    volume = np.array([[0.25, 0.75], [0.6, 0.4]])
+    mass = mass_fractions(volume, np.array(DENSITIES), 'volume')
+    assert np.allclose(mass.sum(axis=1), 1)
+    assert np.allclose(volume_fractions(mass, np.array(DENSITIES)), volume)
+    by_volume = mixture_attenuation(PHASES, volume, ENERGIES, [0.5], densities=DENSITIES, basis='volume')
+    by_mass = mixture_attenuation(PHASES, mass, ENERGIES, [0.5], densities=DENSITIES, basis='mass')
+    assert np.allclose(by_volume['mu_R'], by_mass['mu_R'])
+
+
+def test_solve_fraction():
+    solved = solve_fraction(PHASES, [1, 1], 1, 2.0, [20000], 0.5, 0.6, DENSITIES)
+    assert solved['reached'][0] and np.isclose(solved['mu_R'][0], 2.0)
+    check = mixture_attenuation(PHASES, [1 - solved['fraction'][0], solved['fraction'][0]], [20000], [0.5], 0.6,
+                                DENSITIES, basis='volume')
+    assert np.isclose(check['mu_R'][0, 0, 0], 2.0, rtol=1e-3)
+    # nem só CeO2 chega a µR = 100 num capilar de 0,5 mm
+    unreachable = solve_fraction(PHASES, [1, 1], 1, 100.0, [20000], 0.5, 0.6, DENSITIES)
+    assert not unreachable['reached'][0] and np.isclose(unreachable['fraction'][0], 0.0)
@@ -0,0 +1 @@
+"""Ferramentas de XRD da linha Paineira, utilizáveis sem o Streamlit."""
@@ -0,0 +1,3 @@
+from xrdtools.cli import main
+
+main()
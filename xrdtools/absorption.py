@@ -0,0 +1,127 @@
+"""Correção de absorção de Debye-Scherrer para amostras cilíndricas.
+
+O fator de transmissão A(θ, µR) é a média de exp(-µ(l_entrada + l_saída))
+sobre a seção do cilindro, para o feixe incidente e o difratado a 2θ
+(ambos perpendiculares ao eixo). A intensidade medida é A·I, então a
+correção divide por A.
+
+A integral sobre o disco é cara (milhares de pontos por ângulo), então A
+fica numa tabela pré-calculada em xrdtools/data, numa grade uniforme de
+µR x θ, e é interpolada bilinearmente em log A: um difratograma de 100 mil
+pontos, ou uma série inteira, é corrigido numa única operação vetorizada.
+O erro relativo da interpolação fica abaixo de TOLERANCE.
+
+Para regenerar e verificar a tabela:
+    python -m xrdtools.absorption
+"""
+import os
+import functools
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+TABLE_FILE = os.path.join(DATA_DIR, 'absorption_cylinder.npy')
+MU_R_MAX = 10.0
+MU_R_STEP = 0.05
+THETA_STEP = 0.25
+QUADRATURE_NODES = 96
+TOLERANCE = 1e-3
+
+
+def _disk_nodes(n_nodes=QUADRATURE_NODES):
+    """Pontos (x, y) e pesos (somando 1) de Gauss-Legendre no disco unitário.
+
+    y = sin α e x = u·cos α, com α e u em nós de Gauss-Legendre, de modo que
+    a raiz das cordas nas bordas vira uma função suave.
+    """
+    nodes, weights = np.polynomial.legendre.leggauss(n_nodes)
+    alpha, w_alpha = nodes*np.pi/2, weights*np.pi/2
+    half_width = np.cos(alpha)
+    x = nodes[None, :] * half_width[:, None]
+    y = np.broadcast_to(np.sin(alpha)[:, None], x.shape)
+    w = w_alpha[:, None] * weights[None, :] * half_width[:, None]**2
+    return x.ravel(), y.ravel(), (w / w.sum()).ravel()
+
+
+def path_lengths(theta, n_nodes=QUADRATURE_NODES):
+    """Caminho total (entrada + saída, em unidades de R) de cada ponto do disco, para cada θ (graus).
+
+    Retorna (caminhos de forma (n_θ, n_pontos), pesos).
+    """
+    x, y, w = _disk_nodes(n_nodes)
+    two_theta = np.deg2rad(2*np.atleast_1d(np.asarray(theta, dtype=float)))[:, None]
+    path_in = x + np.sqrt(1 - y*y)
+    projection = x*np.cos(two_theta) + y*np.sin(two_theta)
+    path_out = -projection + np.sqrt(projection**2 + 1 - x*x - y*y)
+    return path_in + path_out, w
+
+
+def transmission_factor(theta, mu_r, n_nodes=QUADRATURE_NODES):
+    """A(θ, µR) por integração direta; forma (n_µR, n_θ). Usada para gerar e verificar a tabela."""
+    paths, w = path_lengths(theta, n_nodes)
+    mu_r = np.atleast_1d(np.asarray(mu_r, dtype=float))
+    return np.stack([np.exp(-m*paths) @ w for m in mu_r])
+
+
+def table_grid():
+    """Grades uniformes de µR e θ (graus) da tabela."""
+    mu_r = np.arange(0, MU_R_MAX + MU_R_STEP/2, MU_R_STEP)
+    theta = np.arange(0, 90 + THETA_STEP/2, THETA_STEP)
+    return mu_r, theta
+
+
+@functools.lru_cache(maxsize=1)
+def load_table():
+    """log A na grade (µR, θ) de table_grid."""
+    return np.load(TABLE_FILE)
+
+
+def absorption_factor(two_theta, mu_r):
+    """A(θ, µR) interpolado da tabela; two_theta em graus, mu_r escalar ou array compatível (ex.: (n, 1) para séries)."""
+    mu_r = np.asarray(mu_r, dtype=float)
+    if np.any(mu_r < 0) or np.any(mu_r > MU_R_MAX):
+        raise ValueError(f'µR must be between 0 and {MU_R_MAX:g}')
+    log_a = load_table()
+    theta = np.clip(np.abs(np.asarray(two_theta, dtype=float)) / 2, 0, 90)
+    u = mu_r / MU_R_STEP
+    v = theta / THETA_STEP
+    i = np.minimum(u.astype(int), log_a.shape[0] - 2)
+    j = np.minimum(np.nan_to_num(v).astype(int), log_a.shape[1] - 2)
+    du, dv = u - i, v - j
+    value = ((1 - du)*(1 - dv)*log_a[i, j] + du*(1 - dv)*log_a[i + 1, j]
+             + (1 - du)*dv*log_a[i, j + 1] + du*dv*log_a[i + 1, j + 1])
+    return np.exp(value)
+
+
+def correct_absorption(two_theta, intensity, mu_r):
+    """Intensidade corrigida I/A(θ, µR)."""
+    return np.asarray(intensity, dtype=float) / absorption_factor(two_theta, mu_r)
+
+
+def build_table():
+    """Calcula log A na grade e grava em xrdtools/data (float32, que sobra para a tolerância)."""
+    mu_r, theta = table_grid()
+    paths, w = path_lengths(theta)
+    log_a = np.empty((len(mu_r), len(theta)))
+    for row, m in enumerate(mu_r):
+        log_a[row] = np.log(np.exp(-m*paths) @ w)
+    os.makedirs(DATA_DIR, exist_ok=True)
+    np.save(TABLE_FILE, log_a.astype(np.float32))
+    load_table.cache_clear()
+
+
+def check_table(n_points=2000, seed=0):
+    """Maior erro relativo da interpolação contra a integração direta (com o dobro de nós) em pontos aleatórios."""
+    rng = np.random.default_rng(seed)
+    theta = rng.uniform(0, 90, n_points)
+    mu_r = rng.uniform(0, MU_R_MAX, n_points)
+    paths, w = path_lengths(theta, 2*QUADRATURE_NODES)
+    reference = np.exp(-mu_r[:, None]*paths) @ w
+    return np.max(np.abs(absorption_factor(2*theta, mu_r) / reference - 1))
+
+
+if __name__ == '__main__':
+    build_table()
+    worst = check_table()
+    print(f'maior erro relativo da tabela: {worst:.2e} (tolerância {TOLERANCE:.0e})')
+    if worst > TOLERANCE:
+        raise SystemExit(1)
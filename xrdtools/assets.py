@@ -0,0 +1,110 @@
+"""Imagens do app servidas como arquivos estáticos, em vez de base64 a cada execução.
+
+As imagens de Icons/ são reduzidas por `build_assets` para variantes WebP e
+PNG em static/, que o Streamlit serve em app/static/ (server.enableStaticServing
+em .streamlit/config.toml). As páginas referenciam o fundo por URL no CSS,
+com ?v=<hash do conteúdo>: com esse parâmetro o servidor manda o arquivo
+com cache de longa duração, então o navegador baixa cada imagem uma só vez
+e cada reexecução envia só a URL. Logo, ícone e favicon usam as variantes
+PNG pequenas por caminho, porque st.logo, st.image e page_icon não aceitam
+URLs relativas.
+
+Para regenerar as variantes e o manifesto (static/assets.json):
+    python -m xrdtools.assets
+"""
+import os
+import re
+import json
+import hashlib
+from xrdtools.cache import assets_cache
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ICONS_DIR = os.path.join(ROOT_DIR, 'Icons')
+STATIC_DIR = os.path.join(ROOT_DIR, 'static')
+MANIFEST_FILE = os.path.join(STATIC_DIR, 'assets.json')
+STATIC_URL = 'app/static'
+PALETTE_COLORS = 256
+# URLs que podem ir para o CSS sem escape: app/static/<arquivo>?v=<hash>
+SAFE_URL = re.compile(rf'{STATIC_URL}/[\w.-]+\?v=[0-9a-f]+')
+
+# nome -> (imagem de origem em Icons/, largura máxima em pixels, formatos)
+ASSETS = {
+    'background': ('Paineira-Layout.png', 1280, ('webp', 'png')),
+    'background-2': ('Paineira_layout_2.png', 1280, ('webp', 'png')),
+    'logo': ('Paineira-Logo.png', 1024, ('png',)),
+    'logo-small': ('Paineira-Logo.png', 256, ('png',)),
+    'icon': ('Paineira-Layout.png', 128, ('png',)),
+    'favicon': ('Paineira-Logo.png', 64, ('png',)),
+}
+
+
+def _save(image, path, fmt):
+    # os desenhos têm poucas cores e bordas finas com transparência: uma paleta
+    # adaptativa sem perdas fica menor que o WebP com perdas (o canal alfa pesa)
+    reduced = image.quantize(PALETTE_COLORS, method=2 if image.mode == 'RGBA' else 0)
+    if fmt == 'webp':
+        reduced.convert(image.mode).save(path, 'WEBP', lossless=True, quality=100, method=6)
+    else:
+        reduced.save(path, 'PNG', optimize=True)
+
+
+def build_assets():
+    """Gera as variantes de ASSETS em static/ e grava o manifesto com o hash de cada arquivo."""
+    from PIL import Image
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    manifest = {}
+    for name, (source, width, formats) in ASSETS.items():
+        with Image.open(os.path.join(ICONS_DIR, source)) as image:
+            image.load()
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        manifest[name] = {}
+        for fmt in formats:
+            file_name = f'{name}.{fmt}'
+            path = os.path.join(STATIC_DIR, file_name)
+            _save(image, path, fmt)
+            with open(path, 'rb') as f:
+                manifest[name][fmt] = {'file': file_name, 'version': hashlib.sha256(f.read()).hexdigest()[:12]}
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    load_manifest.cache.clear()
+    return manifest
+
+
+@assets_cache.memoize
+def load_manifest():
+    with open(MANIFEST_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def asset_url(name, fmt='webp'):
+    """URL relativa, versionada pelo conteúdo, da variante `fmt` de `name` (para CSS e HTML)."""
+    entry = load_manifest()[name][fmt]
+    return f"{STATIC_URL}/{entry['file']}?v={entry['version']}"
+
+
+def asset_path(name, fmt='png'):
+    """Caminho local da variante (para st.logo, st.image e page_icon)."""
+    return os.path.join(STATIC_DIR, load_manifest()[name][fmt]['file'])
+
+
+def _css_url(name, fmt):
+    """url(...) da variante para CSS; só aceita nomes de ASSETS e URLs do manifesto sem caracteres especiais."""
+    if name not in ASSETS:
+        raise ValueError(f'unknown asset {name!r}')
+    url = asset_url(name, fmt)
+    if not SAFE_URL.fullmatch(url):
+        raise ValueError(f'unsafe URL {url!r} for asset {name!r}; rebuild the manifest with python -m xrdtools.assets')
+    return f'url("{url}")'
+
+
+def background_css(name):
+    """Valor de background-image (uma única declaração): image-set com o WebP e o PNG para navegadores sem WebP."""
+    return (f'image-set({_css_url(name, "webp")} type("image/webp"), '
+            f'{_css_url(name, "png")} type("image/png"))')
+
+if __name__ == '__main__':
+    for name, formats in build_assets().items():
+        for fmt, entry in formats.items():
+            size = os.path.getsize(os.path.join(STATIC_DIR, entry['file']))
+            print(f"{entry['file']:<20} {size/1024:>8.1f} kB")
@@ -0,0 +1,229 @@
+"""Atlas pré-calculado de atenuação dos materiais mais usados na linha (padrões e diluentes).
+
+Para cada material de MATERIALS o atlas guarda a curva de µ/ρ (cm²/g) na
+mesma grade de energias dos gráficos da calculadora (ENERGY_START a
+ENERGY_STOP, passo ENERGY_STEP, em eV), num único arquivo float32 lido por
+memory-map (xrdtools/data/atlas.npy), e um índice JSON versionado
+(xrdtools/data/atlas.json) com fórmula, apelidos e densidades.
+
+µR é linear no diâmetro do capilar e na fração de empacotamento, então as
+tabelas de µR por capilar são a curva de µ/ρ vezes um escalar, calculadas
+na hora (uma multiplicação de ENERGY_POINTS valores) em vez de guardadas
+uma vez por diâmetro. Uma consulta (`lookup`) é uma interpolação numa
+linha do arquivo, em microssegundos.
+
+A densidade padrão é a mesma estimativa da calculadora (1 Å³ por átomo),
+de modo que `lookup` reproduz `calculate`; a densidade de referência do
+material (cristal ou xraydb) também fica no índice.
+
+Para regenerar e verificar o atlas (depois de mudar MATERIALS, a tabela de
+µ/ρ ou ATLAS_VERSION):
+    python -m xrdtools.atlas
+"""
+import os
+import re
+import json
+import difflib
+import functools
+import numpy as np
+from xrdtools.attenuation import batch_attenuation, capillary_distance, calculate
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+ATLAS_FILE = os.path.join(DATA_DIR, 'atlas.npy')
+INDEX_FILE = os.path.join(DATA_DIR, 'atlas.json')
+ATLAS_VERSION = 1
+ENERGY_START = 5000.0
+ENERGY_STOP = 30000.0
+ENERGY_STEP = 10.0
+ENERGY_POINTS = int(round((ENERGY_STOP - ENERGY_START) / ENERGY_STEP)) + 1
+TOLERANCE = 1e-3
+
+# (nome, fórmula, densidade de referência em g/cm³, apelidos)
+MATERIALS = [
+    ('LaB6', 'LaB6', 4.71, ('lanthanum hexaboride', 'NIST 660', 'SRM 660c')),
+    ('Si', 'Si', 2.329, ('silicon', 'NIST 640', 'SRM 640f')),
+    ('CeO2', 'CeO2', 7.215, ('ceria', 'cerium oxide', 'NIST 674b')),
+    ('Al2O3', 'Al2O3', 3.987, ('corundum', 'alumina', 'NIST 676a', 'SRM 1976')),
+    ('Silica', 'SiO2', 2.2, ('fused silica', 'amorphous silica', 'diluent')),
+    ('Quartz', 'SiO2', 2.648, ('alpha quartz',)),
+    ('Graphite carbon', 'C', 2.23, ('graphite', 'carbon', 'diluent')),
+    ('Diamond', 'C', 3.515, ()),
+    ('Y2O3', 'Y2O3', 5.01, ('yttria', 'yttrium oxide')),
+    ('ZnO', 'ZnO', 5.61, ('zinc oxide', 'zincite', 'NIST 674')),
+    ('TiO2 rutile', 'TiO2', 4.25, ('rutile', 'titania')),
+    ('TiO2 anatase', 'TiO2', 3.89, ('anatase',)),
+    ('Cr2O3', 'Cr2O3', 5.22, ('chromia', 'eskolaite', 'NIST 674')),
+    ('NaCl', 'NaCl', 2.165, ('halite', 'sodium chloride')),
+    ('KCl', 'KCl', 1.984, ('sylvite', 'potassium chloride')),
+    ('CaF2', 'CaF2', 3.18, ('fluorite', 'calcium fluoride')),
+    ('LiF', 'LiF', 2.635, ('lithium fluoride',)),
+    ('MgO', 'MgO', 3.58, ('periclase', 'magnesia')),
+    ('CaCO3', 'CaCO3', 2.71, ('calcite',)),
+    ('Fe2O3', 'Fe2O3', 5.24, ('hematite',)),
+    ('Ni', 'Ni', 8.908, ('nickel',)),
+    ('Cu', 'Cu', 8.96, ('copper',)),
+    ('Kapton', 'C22H10N2O5', 1.42, ('polyimide', 'capillary wall')),
+]
+
+
+def energy_grid():
+    """Energias (eV) das curvas do atlas."""
+    return ENERGY_START + ENERGY_STEP*np.arange(ENERGY_POINTS)
+
+
+def _normalize(text):
+    return re.sub(r'[\s·.\-_()\[\]]', '', text).lower()
+
+
+@functools.lru_cache(maxsize=1)
+def load_atlas():
+    """(índice, µ/ρ memory-mapped de forma (n_materiais, ENERGY_POINTS)); ValueError se o atlas for de outra versão."""
+    with open(INDEX_FILE, encoding='utf-8') as f:
+        index = json.load(f)
+    if index['version'] != ATLAS_VERSION:
+        raise ValueError(f"the attenuation atlas is version {index['version']}, expected {ATLAS_VERSION}; "
+                         'rebuild it with python -m xrdtools.atlas')
+    table = np.load(ATLAS_FILE, mmap_mode='r')
+    by_name = {entry['name']: entry for entry in index['materials']}
+    keys = [(_normalize(key), entry['name']) for entry in index['materials']
+            for key in (entry['name'], entry['formula'], *entry['aliases'])]
+    return index, table, by_name, keys
+
+
+def material(name):
+    """Entrada do índice (nome, fórmula, apelidos, densidades, linha) de um material do atlas."""
+    by_name = load_atlas()[2]
+    if name not in by_name:
+        raise ValueError(f'{name!r} is not in the attenuation atlas')
+    return by_name[name]
+
+
+def materials():
+    return [entry['name'] for entry in load_atlas()[0]['materials']]
+
+
+def search(query, limit=8):
+    """Materiais cujo nome, fórmula ou apelido parecem com `query`, do mais parecido ao menos.
+
+    Ignora maiúsculas, espaços e pontuação; nome/fórmula/apelido igual vale 1,
+    começo igual 0,9, contido 0,8, e os demais a semelhança do difflib (acima de 0,6).
+    Retorna uma lista de (nome, pontuação); o resultado de cada consulta fica
+    em cache, porque cada reexecução da página repete a mesma busca.
+    """
+    return list(_search(_normalize(query), limit))
+
+
+@functools.lru_cache(maxsize=256)
+def _search(query, limit):
+    if not query:
+        return tuple((name, 0.0) for name in materials()[:limit])
+    scores = {}
+    for key, name in load_atlas()[3]:
+        if key == query:
+            score = 1.0
+        elif key.startswith(query):
+            score = 0.9
+        elif query in key:
+            score = 0.8
+        else:
+            matcher = difflib.SequenceMatcher(None, query, key)
+            score = matcher.ratio() if matcher.quick_ratio() > 0.6 else 0.0
+        if score > 0.6 and score > scores.get(name, 0.0):
+            scores[name] = score
+    return tuple(sorted(scores.items(), key=lambda item: -item[1])[:limit])
+
+
+def _density(entry, reference_density):
+    return entry['reference_density'] if reference_density else entry['density']
+
+
+def mu_rho_curve(name):
+    """Curva de µ/ρ (cm²/g) do material na grade de energy_grid (somente leitura)."""
+    return load_atlas()[1][material(name)['row']]
+
+
+def mu_r_curve(name, capillary, packing_fraction=1.0, reference_density=False):
+    """µR na grade de energy_grid para um capilar (diâmetro em mm ou rótulo do catálogo)."""
+    entry = material(name)
+    scale = _density(entry, reference_density) * packing_fraction * capillary_distance(capillary) / 2
+    return mu_rho_curve(name) * scale
+
+
+def lookup(name, energy, capillary, packing_fraction=1.0, reference_density=False):
+    """Densidades, µ/ρ, µR e transmissão (%) de um material do atlas numa energia (eV) e capilar.
+
+    Mesmos valores de `calculate` (sem diluição), interpolando a curva do
+    atlas; energias fora da grade levantam ValueError.
+    """
+    if not ENERGY_START <= energy <= ENERGY_STOP:
+        raise ValueError(f'the atlas covers {ENERGY_START/1000:g} to {ENERGY_STOP/1000:g} keV')
+    entry = material(name)
+    position = (energy - ENERGY_START) / ENERGY_STEP
+    i = min(int(position), ENERGY_POINTS - 2)
+    t = position - i
+    row = load_atlas()[1][entry['row']]
+    mu_rho = float(row[i]*(1 - t) + row[i + 1]*t)
+    density = _density(entry, reference_density)
+    packing_density = density * packing_fraction
+    distance = capillary_distance(capillary)
+    mu_r = mu_rho * packing_density * distance / 2
+    return {
+        'name': name,
+        'formula': entry['formula'],
+        'density': density,
+        'packing_density': packing_density,
+        'mu_rho': mu_rho,
+        'mu_R': mu_r,
+        'transmission': 100*np.exp(-2*mu_r),
+        'energy': energy,
+    }
+
+
+def build_atlas():
+    """Calcula as curvas de µ/ρ de MATERIALS (pela tabela de µ/ρ) e grava o arquivo e o índice."""
+    import xraydb
+    formulas = [formula for _, formula, _, _ in MATERIALS]
+    result = batch_attenuation(formulas, energy_grid(), [1.0])
+    os.makedirs(DATA_DIR, exist_ok=True)
+    np.save(ATLAS_FILE, result['mu_rho'].astype(np.float32))
+    index = {
+        'version': ATLAS_VERSION,
+        'xraydb': xraydb.__version__,
+        'energy': {'start': ENERGY_START, 'stop': ENERGY_STOP, 'step': ENERGY_STEP, 'unit': 'eV'},
+        'materials': [
+            {'name': name, 'formula': formula, 'aliases': list(aliases), 'row': row,
+             'density': float(result['density'][row]), 'reference_density': reference_density}
+            for row, (name, formula, reference_density, aliases) in enumerate(MATERIALS)
+        ],
+    }
+    with open(INDEX_FILE, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1, ensure_ascii=False)
+    load_atlas.cache_clear()
+    _search.cache_clear()
+
+
+def check_atlas(n_points=2000, seed=0):
+    """Maior erro relativo de µR de `lookup` contra `calculate` em energias aleatórias, longe das bordas."""
+    from xrdtools.mu_table import absorption_edges
+    from xrdtools.formula import parse_formula
+    rng = np.random.default_rng(seed)
+    worst = 0.0
+    for name in materials():
+        formula = material(name)['formula']
+        edges = absorption_edges(list(parse_formula(formula)), ENERGY_START, ENERGY_STOP)
+        energies = rng.uniform(ENERGY_START, ENERGY_STOP, n_points // len(MATERIALS))
+        energies = energies[np.all(np.abs(energies[:, None] - edges) > 2*ENERGY_STEP, axis=1)]
+        for energy in energies:
+            reference = calculate(formula, energy/1000, 'Energy (keV)', 1.0, 1.0)[4]
+            worst = max(worst, abs(lookup(name, energy, 1.0)['mu_R'] / reference - 1))
+    return worst
+
+
+if __name__ == '__main__':
+    build_atlas()
+    worst = check_atlas()
+    size = os.path.getsize(ATLAS_FILE) + os.path.getsize(INDEX_FILE)
+    print(f'{len(MATERIALS)} materiais, {size/1024:.0f} kB; maior erro relativo contra calculate: {worst:.2e} '
+          f'(tolerância {TOLERANCE:.0e})')
+    if worst > TOLERANCE:
+        raise SystemExit(1)
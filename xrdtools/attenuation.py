@@ -0,0 +1,210 @@
+import math
+import numpy as np
+from xrdtools.mu_table import atomic_mass, mu_elam, mu_elam_matrix, mu_elam_rows, material_mu, material_composition, absorption_edges, load_table
+from xrdtools.formula import parse_formula as get_elements, composition_vector
+from xrdtools.cache import attenuation_cache
+from xrdtools.constants import h, c, m_u
+
+mu = m_u * (1e3)
+
+
+def capillary_distance(capillary_diameter):
+    """Caminho do feixe (cm) a partir do diâmetro do capilar (mm ou texto do catálogo).
+
+    Para rótulos do catálogo o caminho é o diâmetro interno (o da amostra),
+    o mesmo de `container.capillary_transmission`: um capilar de quartzo
+    vendido pelo diâmetro externo tem a amostra numa coluna mais fina.
+    """
+    if isinstance(capillary_diameter, str):
+        # importado aqui: xrdtools.container depende deste módulo
+        from xrdtools.container import capillary_geometry
+        try:
+            return capillary_geometry(capillary_diameter)[0]*0.1
+        except ValueError:
+            capillary_diameter = capillary_diameter.split(sep=' ')[0]
+    return float(capillary_diameter)*0.1
+
+
+@attenuation_cache.memoize
+def calculate(chemical_formula, energy_or_wavelength, type_energy, capillary_diameter, packing_fraction, dilution=False, pct=0, diluent='graphite carbon'):
+    elements = get_elements(chemical_formula)
+    if type_energy == 'Energy (keV)':
+        energy = float(energy_or_wavelength) * 1000
+    else:
+        wavelength = float(energy_or_wavelength)
+        energy = (h*c)/(wavelength*(1e-10))
+    distance = capillary_distance(capillary_diameter)
+
+    total_mass = sum([elements[element] * atomic_mass(element) for element in elements])
+
+    total_volume = sum([elements[element] * (1e-23) for element in elements])
+
+    density = (total_mass * mu) / total_volume
+    packing_density = density * packing_fraction
+
+    m_u_t = sum(
+        ((elements[element] * atomic_mass(element)) / total_mass) * mu_elam(element, energy)
+        for element in elements
+    ) * packing_density
+    if dilution:
+        # o diluente ocupa pct % do volume do pó e o empacotamento vale para a
+        # mistura toda (caso de duas fases de xrdtools/mixture.py)
+        diluent_mu = material_mu(diluent, energy) * packing_fraction
+        m_u_t = (1-pct/100)*m_u_t + (pct/100)*diluent_mu
+
+    transmission = math.exp(-distance * m_u_t) * 100
+    mu_R = m_u_t * (distance / 2)
+
+    return density, packing_density, transmission, energy, mu_R, distance, total_mass
+
+
+@attenuation_cache.memoize
+def element_curves(chemical_formula, energy_start=5000, energy_stop=30000, energy_step=10):
+    """Faixa de energia (eV), frações mássicas e µ/ρ de cada elemento usados nos gráficos."""
+    elements = get_elements(chemical_formula)
+    energy_range = np.arange(energy_start, energy_stop, energy_step)
+    masses = np.array([elements[element] * atomic_mass(element) for element in elements])
+    mu_values = mu_elam_matrix(list(elements), energy_range)
+    for array in (energy_range, masses, mu_values):
+        array.flags.writeable = False
+    return energy_range, masses / masses.sum(), mu_values
+
+
+def composition_matrix(chemical_formulas):
+    """Monta a matriz de frações mássicas (fórmulas x elementos) e as densidades estimadas.
+
+    Retorna também as linhas da tabela de µ/ρ correspondentes às colunas.
+    """
+    vectors = [composition_vector(formula) for formula in chemical_formulas]
+    lengths = [len(index) for index, _ in vectors]
+    rows, columns = np.unique(np.concatenate([index for index, _ in vectors]), return_inverse=True)
+    counts = np.zeros((len(vectors), len(rows)))
+    counts[np.repeat(np.arange(len(vectors)), lengths), columns] = np.concatenate([count for _, count in vectors])
+
+    masses = counts * load_table()[2][rows]
+    total_mass = masses.sum(axis=1)
+    total_volume = counts.sum(axis=1) * (1e-23)
+    density = (total_mass * mu) / total_volume
+    return rows, masses / total_mass[:, None], density
+
+
+def batch_attenuation(chemical_formulas, energies, capillary_diameters, packing_fraction=1.0, pct=0, diluent=None):
+    """Calcula densidade, µR e transmissão para todas as combinações fórmula x energia (eV) x capilar.
+
+    Retorna um dicionário de arrays; 'mu_R' e 'transmission' têm forma
+    (n_fórmulas, n_energias, n_capilares) e 'linear_mu' (1/cm, já com
+    empacotamento e diluição) tem forma (n_fórmulas, n_energias). O diluente
+    ocupa pct % do volume do pó, empacotado junto com a amostra. O µ/ρ de
+    cada elemento é avaliado uma única vez sobre o conjunto de energias pedidas.
+    """
+    energies = np.atleast_1d(np.asarray(energies, dtype=float))
+    distance = np.array([capillary_distance(d) for d in np.atleast_1d(capillary_diameters)])
+    packing_fraction = np.broadcast_to(np.asarray(packing_fraction, dtype=float), (len(chemical_formulas),))
+
+    rows, mass_fraction, density = composition_matrix(chemical_formulas)
+    packing_density = density * packing_fraction
+
+    unique_energies, inverse = np.unique(energies, return_inverse=True)
+    mu_rho = (mass_fraction @ mu_elam_rows(rows, unique_energies))[:, inverse]
+
+    m_u_t = mu_rho * packing_density[:, None]
+    if diluent:
+        diluent_mu = material_mu(diluent, unique_energies)[inverse] * packing_fraction[:, None]
+        m_u_t = (1-pct/100)*m_u_t + (pct/100)*diluent_mu
+
+    path = m_u_t[:, :, None] * distance
+    return {
+        'density': density,
+        'packing_density': packing_density,
+        'mu_rho': mu_rho,
+        'linear_mu': m_u_t,
+        'mu_R': path / 2,
+        'transmission': np.exp(-path) * 100,
+        'energy': energies,
+        'distance': distance,
+    }
+
+
+def _band_crossings(log_energy, log_mu_r, level):
+    """Energias onde log µR cruza `level`, resolvendo a reta log-log de cada intervalo da grade."""
+    above = log_mu_r > level
+    i = np.nonzero(above[:-1] != above[1:])[0]
+    t = (level - log_mu_r[i]) / (log_mu_r[i + 1] - log_mu_r[i])
+    return np.exp(log_energy[i] + t*(log_energy[i + 1] - log_energy[i]))
+
+
+def _subtract_intervals(windows, holes):
+    """Remove de cada janela (início, fim) os intervalos proibidos."""
+    for hole_start, hole_end in holes:
+        kept = []
+        for start, end in windows:
+            if hole_end <= start or hole_start >= end:
+                kept.append((start, end))
+                continue
+            if start < hole_start:
+                kept.append((start, hole_start))
+            if hole_end < end:
+                kept.append((hole_end, end))
+        windows = kept
+    return windows
+
+
+def scan_energy_windows(chemical_formulas, capillary_diameter, packing_fraction, mu_r_min=1.0, mu_r_max=5.0,
+                        energy_min=5000, energy_max=30000, edge_margin=200, pct=0, diluent=None):
+    """Faixas de energia (eV) em que µR fica entre mu_r_min e mu_r_max, longe das bordas de absorção.
+
+    µR é avaliado de uma vez, para todas as fórmulas, nos pontos da tabela de
+    µ/ρ dentro da faixa; como a tabela é linear em log-log entre pontos, os
+    cruzamentos com os limites da banda são calculados exatamente em cada
+    intervalo. Entre duas bordas µR só decresce com a energia, então cada
+    trecho entre bordas tem no máximo uma janela. Energias a menos de
+    `edge_margin` eV de uma borda dos elementos da amostra (ou do diluente)
+    são descartadas.
+
+    Retorna, para cada fórmula, um dicionário com 'windows' (lista de
+    (início, fim) em eV), 'best_energy' e 'best_mu_R', o ponto permitido
+    com µR mais próximo da média geométrica da banda.
+    """
+    if isinstance(chemical_formulas, str):
+        chemical_formulas = [chemical_formulas]
+    log_grid = load_table()[0]
+    grid = np.exp(log_grid[(log_grid > np.log(energy_min)) & (log_grid < np.log(energy_max))])
+    energies = np.concatenate([[energy_min], grid, [energy_max]])
+    log_energy = np.log(energies)
+    result = batch_attenuation(chemical_formulas, energies, [capillary_diameter], packing_fraction, pct, diluent)
+    log_mu_r = np.log(result['mu_R'][:, :, 0])
+    target = 0.5*(np.log(mu_r_min) + np.log(mu_r_max))
+
+    diluent_elements = list(material_composition(diluent)[0]) if diluent and pct else []
+    scans = []
+    for formula, curve in zip(chemical_formulas, log_mu_r):
+        edges = absorption_edges(list(get_elements(formula)) + diluent_elements, energy_min, energy_max)
+        crossings = np.concatenate([
+            _band_crossings(log_energy, curve, np.log(mu_r_min)),
+            _band_crossings(log_energy, curve, np.log(mu_r_max)),
+            edges,
+        ])
+        bounds = np.unique(np.concatenate([[energy_min, energy_max], crossings]))
+        # cada trecho entre limites está todo dentro ou todo fora da banda
+        middle = np.interp(0.5*np.log(bounds[:-1]*bounds[1:]), log_energy, curve)
+        inside = (middle >= np.log(mu_r_min)) & (middle <= np.log(mu_r_max))
+        merged = []
+        for start, end, ok in zip(bounds[:-1], bounds[1:], inside):
+            if not ok:
+                continue
+            if merged and merged[-1][1] == start:
+                merged[-1] = (merged[-1][0], float(end))
+            else:
+                merged.append((float(start), float(end)))
+        windows = _subtract_intervals(merged, [(float(edge) - edge_margin, float(edge) + edge_margin) for edge in edges])
+
+        allowed = np.zeros(len(energies), dtype=bool)
+        for start, end in windows:
+            allowed |= (energies >= start) & (energies <= end)
+        if allowed.any():
+            best = np.nonzero(allowed)[0][np.argmin(np.abs(curve[allowed] - target))]
+            best_energy, best_mu_r = float(energies[best]), float(np.exp(curve[best]))
+        else:
+            best_energy = best_mu_r = None
+        scans.append({'windows': windows, 'best_energy': best_energy, 'best_mu_R': best_mu_r})
+    return scans
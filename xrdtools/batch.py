@@ -0,0 +1,237 @@
+"""Conversão em lote de muitos difratogramas (séries em temperatura/tempo).
+
+Uso sem interface (a partir da raiz do repositório):
+    python -m xrdtools.batch --energy 25.5 --new-energy 20 -o convertidos.zip padroes/*.xy serie.zip
+"""
+import io
+import os
+import sys
+import zipfile
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from xrdtools.conversions import calculate_wavelength
+from xrdtools.patterns import convert_pattern
+
+PATTERN_EXTENSIONS = ('.txt', '.csv', '.xy', '.xye', '.dat')
+# padrões por tarefa do pool: limita o intervalo entre avisos de progresso (e a demora de um cancelamento)
+MAX_CHUNKSIZE = 4
+# os pools são criados também nas threads da fila de trabalhos (xrdtools/jobs.py), dentro do servidor
+# do Streamlit: um fork ali copiaria travas seguradas por outras threads, então os processos de
+# trabalho partem do forkserver (ou de spawn, onde não há forkserver)
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def iter_inputs(sources):
+    """Gera (nome, conteúdo) para cada difratograma; arquivos .zip são expandidos.
+
+    `sources` pode conter caminhos ou pares (nome, bytes), como os arquivos
+    enviados pelo Streamlit. Para caminhos, o conteúdo devolvido é o próprio
+    caminho, que o processo de trabalho abre sozinho.
+    """
+    for source in sources:
+        if isinstance(source, (str, os.PathLike)):
+            name, data = os.path.basename(source), source
+        else:
+            name, data = source
+        if name.lower().endswith('.zip'):
+            archive = data if not isinstance(data, bytes) else io.BytesIO(data)
+            with zipfile.ZipFile(archive) as zf:
+                for member in sorted(zf.namelist()):
+                    if member.lower().endswith(PATTERN_EXTENSIONS) and not member.startswith('__MACOSX'):
+                        yield member, zf.read(member)
+        else:
+            yield name, data
+
+
+def _process_pool(max_workers):
+    context = multiprocessing.get_context(POOL_START_METHOD)
+    if POOL_START_METHOD == 'forkserver':
+        # o forkserver importa numpy/pandas uma vez e cada processo de trabalho já nasce com eles
+        context.set_forkserver_preload(['xrdtools.patterns'])
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+
+
+def convert_one(item, energy, new_energy):
+    """Converte um único difratograma; executado nos processos de trabalho."""
+    name, data = item
+    if isinstance(data, bytes):
+        return (name,) + convert_pattern(data, energy, new_energy, calculate_wavelength(energy))
+    with open(data, 'rb') as f:
+        return (name,) + convert_pattern(f, energy, new_energy, calculate_wavelength(energy))
+
+
+def convert_many(sources, energy, new_energy, max_workers=None, progress=None):
+    """Converte todos os difratogramas em paralelo, mantendo a ordem de entrada.
+
+    Retorna uma lista de (nome, two_theta, intensity, new_2theta, Q).
+    `progress(concluídos, total)` é chamado após cada difratograma; se ele
+    levantar uma exceção (cancelamento), os padrões ainda não iniciados são
+    descartados.
+    """
+    items = list(iter_inputs(sources))
+    total = len(items)
+    results = []
+    if total <= 1 or max_workers == 1:
+        for item in items:
+            results.append(convert_one(item, energy, new_energy))
+            if progress:
+                progress(len(results), total)
+        return results
+
+    chunksize = min(MAX_CHUNKSIZE, max(1, total // (4 * (max_workers or os.cpu_count() or 1))))
+    with _process_pool(max_workers) as pool:
+        try:
+            for result in pool.map(convert_one, items, [energy]*total, [new_energy]*total, chunksize=chunksize):
+                results.append(result)
+                if progress:
+                    progress(len(results), total)
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return results
+
+
+def stack_results(results):
+    """Empilha os resultados em arrays (n_padrões, n_pontos), completando com NaN."""
+    n_points = max(len(result[1]) for result in results)
+    stacked = {'names': np.array([result[0] for result in results])}
+    for column, key in enumerate(('two_theta', 'intensity', 'new_2theta', 'Q'), start=1):
+        array = np.full((len(results), n_points), np.nan)
+        for row, result in enumerate(results):
+            array[row, :len(result[column])] = result[column]
+        stacked[key] = array
+    return stacked
+
+
+def series_matrix(results, axis='Q', normalize=False):
+    """Eixo comum e matriz (n_padrões, n_pontos) de intensidades para comparar uma série.
+
+    axis é 'Q', 'two_theta' ou 'new_2theta'. Quando todos os padrões têm o
+    mesmo eixo (o caso usual de uma série do mesmo detector), a matriz é só
+    o empilhamento das intensidades; senão cada padrão é interpolado no
+    trecho comum, com o número mediano de pontos. Com normalize, cada linha
+    é dividida pelo seu máximo.
+    """
+    column = {'two_theta': 1, 'new_2theta': 3, 'Q': 4}[axis]
+    axes = [np.asarray(result[column], dtype=float) for result in results]
+    intensities = [np.asarray(result[2], dtype=float) for result in results]
+    first = axes[0]
+    if all(len(x) == len(first) and np.allclose(x, first, equal_nan=True) for x in axes):
+        x = first
+        matrix = np.vstack(intensities)
+    else:
+        lows = [np.nanmin(x) for x in axes]
+        highs = [np.nanmax(x) for x in axes]
+        if max(lows) >= min(highs):
+            raise ValueError('the patterns do not share a common range')
+        x = np.linspace(max(lows), min(highs), int(np.median([len(x) for x in axes])))
+        matrix = np.empty((len(results), len(x)))
+        for row, (x_row, y_row) in enumerate(zip(axes, intensities)):
+            finite = np.isfinite(x_row)
+            order = np.argsort(x_row[finite], kind='stable')
+            matrix[row] = np.interp(x, x_row[finite][order], y_row[finite][order])
+    order = np.argsort(x, kind='stable') if np.any(np.diff(x) < 0) else slice(None)
+    x, matrix = x[order], matrix[:, order]
+    finite = np.isfinite(x)
+    x, matrix = x[finite], matrix[:, finite]
+    if normalize:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            matrix = matrix / np.nanmax(matrix, axis=1, keepdims=True)
+    return x, matrix
+
+
+def unique_stems(names):
+    """Prefixo dos arquivos de saída de cada padrão, sem repetições.
+
+    Em geral é o nome sem extensão; nomes que dariam o mesmo prefixo
+    (p.csv e p.xy) mantêm a extensão (p_csv, p_xy), e o que ainda se repetir
+    (o mesmo nome vindo de pastas diferentes) ganha um índice (p_xy_2).
+    """
+    stems = [os.path.splitext(name)[0] for name in names]
+    repeated = {stem for stem in stems if stems.count(stem) > 1}
+    stems = [name.replace('.', '_') if stem in repeated else stem for name, stem in zip(names, stems)]
+    seen = {}
+    unique = []
+    for stem in stems:
+        seen[stem] = seen.get(stem, 0) + 1
+        unique.append(stem if seen[stem] == 1 else f'{stem}_{seen[stem]}')
+    return unique
+
+
+def pattern_csvs(result, new_energy, stem=None):
+    """Nomes e conteúdos dos CSVs (novo difratograma e Q) de um padrão convertido.
+
+    `stem` é o prefixo dos nomes (de `unique_stems`); sem ele, o nome do padrão sem extensão.
+    """
+    name, two_theta, intensity, new_2theta, Q = result
+    stem = stem or os.path.splitext(name)[0]
+    return [
+        (f'{stem}_{new_energy:.4f}keV.csv',
+         pd.DataFrame({'2theta (degree)': new_2theta, 'Intensity': intensity}).to_csv(index=False)),
+        (f'{stem}_Scattering_Vector.csv',
+         pd.DataFrame({'Scattering Vector (Å⁻¹)': Q, 'Intensity': intensity}).to_csv(index=False)),
+    ]
+
+
+def write_zip(results, fileobj, new_energy, max_workers=None, progress=None):
+    """Grava um CSV do novo difratograma e um de Q para cada padrão num único .zip.
+
+    Padrões com o mesmo nome (ou o mesmo nome sem extensão) recebem prefixos
+    distintos (`unique_stems`), então nenhum arquivo sobrescreve outro.
+
+    A formatação dos CSVs, que domina o tempo, é feita no pool de processos.
+    `progress(gravados, total)` é chamado após cada padrão, como em `convert_many`.
+    """
+    total = len(results)
+    stems = unique_stems([result[0] for result in results])
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        if total <= 1 or max_workers == 1:
+            files = (pattern_csvs(result, new_energy, stem) for result, stem in zip(results, stems))
+            for done, csvs in enumerate(files, start=1):
+                for name, text in csvs:
+                    zf.writestr(name, text)
+                if progress:
+                    progress(done, total)
+            return
+        with _process_pool(max_workers) as pool:
+            try:
+                for done, csvs in enumerate(pool.map(pattern_csvs, results, [new_energy]*total, stems), start=1):
+                    for name, text in csvs:
+                        zf.writestr(name, text)
+                    if progress:
+                        progress(done, total)
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+
+def write_npz(results, fileobj):
+    """Grava todos os padrões empilhados num único .npz comprimido."""
+    np.savez_compressed(fileobj, **stack_results(results))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert many XRD patterns to a new energy.')
+    parser.add_argument('inputs', nargs='+', help='pattern files and/or .zip archives')
+    parser.add_argument('--energy', type=float, required=True, help='original energy (keV)')
+    parser.add_argument('--new-energy', type=float, required=True, help='new energy (keV)')
+    parser.add_argument('-o', '--output', required=True, help='output .zip (one CSV per pattern) or .npz (stacked arrays)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes')
+    args = parser.parse_args(argv)
+
+    def report(done, total):
+        print(f'\rconverted {done}/{total}', end='', file=sys.stderr)
+
+    results = convert_many(args.inputs, args.energy, args.new_energy, args.jobs, report)
+    print(file=sys.stderr)
+    if args.output.lower().endswith('.npz'):
+        write_npz(results, args.output)
+    else:
+        write_zip(results, args.output, args.new_energy, args.jobs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Caches LRU compartilhados pelo processo inteiro (todas as sessões do Streamlit).
+
+Cada cache tem um número máximo de entradas e contadores de acertos/erros.
+Os valores guardados são compartilhados entre sessões: quem os lê não deve
+modificá-los.
+"""
+import functools
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Cache chave -> valor com descarte do item usado há mais tempo."""
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def memoize(self, func):
+        """Decorador: guarda o resultado de `func` pela chave (nome, args, kwargs)."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                self.put(key, value)
+            return value
+        wrapper.cache = self
+        return wrapper
+
+
+assets_cache = LRUCache('assets', maxsize=16)
+formula_cache = LRUCache('formulas', maxsize=4096)
+attenuation_cache = LRUCache('attenuation', maxsize=256)
+pattern_cache = LRUCache('patterns', maxsize=16)
+conversion_cache = LRUCache('conversions', maxsize=64)
+reflection_cache = LRUCache('reflections', maxsize=32)
+
+CACHES = {cache.name: cache for cache in (assets_cache, formula_cache, attenuation_cache, pattern_cache, conversion_cache,
+                                          reflection_cache)}
+
+
+def cache_stats():
+    """Estatísticas de todos os caches registrados."""
+    return [cache.stats() for cache in CACHES.values()]
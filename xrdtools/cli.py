@@ -0,0 +1,215 @@
+"""Linha de comando das ferramentas de XRD, sem Streamlit.
+
+Uso (a partir da raiz do repositório):
+    python -m xrdtools attenuation LaB6 CeO2 --energy 20 25.5 --diameter 0.3 0.5 --packing 0.6
+    python -m xrdtools convert padrao.xy --energy 25.5 --new-energy 20 > convertido.csv
+    python -m xrdtools dq 10 12.5 --wavelength 0.4862
+    python -m xrdtools atlas ceria --energy 20 25.5 --diameter 0.5 --packing 0.6
+
+Os valores posicionais podem vir da entrada padrão ('-' ou nenhum), uma
+fórmula/ângulo por linha (para ângulos, vale a primeira coluna e linhas
+não numéricas, como cabeçalhos, são ignoradas, então um difratograma ou um
+CSV pode ser redirecionado direto). A saída é CSV na saída padrão
+ou no arquivo de -o.
+
+Só argparse/csv são importados aqui; cada subcomando importa o que usa, de
+modo que `dq` não carrega pandas e nenhum deles carrega Streamlit ou Plotly.
+"""
+import sys
+import csv
+import argparse
+import contextlib
+
+
+def _read_stdin(first_column=False):
+    """Valores da entrada padrão, um por linha; com `first_column`, o número da primeira coluna.
+
+    Como em `patterns.read_values`, linhas cuja primeira coluna não é um
+    número (cabeçalhos de CSV) são ignoradas.
+    """
+    values = []
+    for line in sys.stdin:
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        if not first_column:
+            values.append(line)
+            continue
+        try:
+            values.append(float(line.replace(',', ' ').split()[0]))
+        except ValueError:
+            pass
+    return values
+
+
+def _positional(values, first_column=False):
+    if not values or values == ['-']:
+        return _read_stdin(first_column)
+    return values
+
+
+def _open_output(path):
+    if path in (None, '-'):
+        return contextlib.nullcontext(sys.stdout)
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def _energy_ev(args):
+    """Energias (eV) a partir de --energy (keV) ou --wavelength (Å)."""
+    from xrdtools.conversions import calculate_energy
+    if args.energy is not None:
+        return [energy * 1000 for energy in args.energy]
+    return [calculate_energy(wavelength) * 1000 for wavelength in args.wavelength]
+
+
+def run_attenuation(args):
+    from xrdtools.attenuation import batch_attenuation
+    formulas = _positional(args.formulas)
+    energies = _energy_ev(args)
+    diluent = args.diluent if args.dilution else None
+    result = batch_attenuation(formulas, energies, args.diameter, args.packing, args.dilution, diluent)
+    with _open_output(args.output) as out:
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(['formula', 'energy (keV)', 'capillary diameter (mm)', 'density (g/cm3)',
+                         'packing density (g/cm3)', 'mu/rho (cm2/g)', 'muR', 'transmission (%)'])
+        for i, formula in enumerate(formulas):
+            for j, energy in enumerate(result['energy']):
+                for k, diameter in enumerate(args.diameter):
+                    writer.writerow([formula, f'{energy/1000:.6g}', diameter,
+                                     f'{result["density"][i]:.6g}', f'{result["packing_density"][i]:.6g}',
+                                     f'{result["mu_rho"][i, j]:.6g}', f'{result["mu_R"][i, j, k]:.6g}',
+                                     f'{result["transmission"][i, j, k]:.6g}'])
+
+
+def run_convert(args):
+    from xrdtools.conversions import calculate_wavelength
+    inputs = args.inputs or ['-']
+    if len(inputs) > 1 or inputs[0].lower().endswith('.zip'):
+        from xrdtools import batch
+        if args.output in (None, '-'):
+            raise SystemExit('convert: several inputs need -o with a .zip or .npz output')
+        batch_args = ['--energy', str(args.energy), '--new-energy', str(args.new_energy), '-o', args.output]
+        if args.jobs:
+            batch_args += ['-j', str(args.jobs)]
+        return batch.main(batch_args + inputs)
+
+    import pandas as pd
+    from xrdtools.patterns import convert_pattern
+    wavelength = calculate_wavelength(args.energy)
+    if inputs[0] == '-':
+        result = convert_pattern(sys.stdin.buffer, args.energy, args.new_energy, wavelength)
+    else:
+        with open(inputs[0], 'rb') as f:
+            result = convert_pattern(f, args.energy, args.new_energy, wavelength)
+    two_theta, intensity, new_2theta, Q = result
+    with _open_output(args.output) as out:
+        pd.DataFrame({
+            '2theta (degree)': two_theta,
+            f'2theta at {args.new_energy:.4f} keV (degree)': new_2theta,
+            'Scattering Vector (Å⁻¹)': Q,
+            'Intensity': intensity,
+        }).to_csv(out, index=False, lineterminator='\n')
+
+
+def run_dq(args):
+    import numpy as np
+    from xrdtools.conversions import calculate_wavelength, scattering_vector, calculate_d
+    two_theta = np.array(_positional(args.two_theta, first_column=True), dtype=float)
+    if args.energy is not None:
+        wavelength = calculate_wavelength(args.energy[0])
+    else:
+        wavelength = args.wavelength[0]
+    Q = scattering_vector(wavelength, two_theta)
+    with np.errstate(divide='ignore'):
+        d = calculate_d(wavelength, two_theta)
+    with _open_output(args.output) as out:
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(['2theta (degree)', 'Q (1/Å)', 'd (Å)'])
+        for row in zip(two_theta, Q, d):
+            writer.writerow([f'{value:.6f}' for value in row])
+
+
+def run_atlas(args):
+    from xrdtools.atlas import search, material, lookup
+    names = [name for name, _ in search(args.query or '', limit=args.limit)]
+    if not names:
+        raise ValueError(f'no material of the atlas matches {args.query!r}')
+    with _open_output(args.output) as out:
+        writer = csv.writer(out, lineterminator='\n')
+        if args.energy is None:
+            writer.writerow(['name', 'formula', 'aliases', 'estimated density (g/cm3)', 'reference density (g/cm3)'])
+            for name in names:
+                entry = material(name)
+                writer.writerow([name, entry['formula'], '; '.join(entry['aliases']),
+                                 f"{entry['density']:.6g}", f"{entry['reference_density']:.6g}"])
+            return
+        writer.writerow(['name', 'formula', 'energy (keV)', 'capillary diameter (mm)', 'density (g/cm3)',
+                         'packing density (g/cm3)', 'mu/rho (cm2/g)', 'muR', 'transmission (%)'])
+        for name in names:
+            for energy in args.energy:
+                for diameter in args.diameter:
+                    row = lookup(name, energy*1000, diameter, args.packing, args.reference_density)
+                    writer.writerow([name, row['formula'], f'{energy:.6g}', diameter, f"{row['density']:.6g}",
+                                     f"{row['packing_density']:.6g}", f"{row['mu_rho']:.6g}", f"{row['mu_R']:.6g}",
+                                     f"{row['transmission']:.6g}"])
+
+
+def _add_beam(parser, many):
+    group = parser.add_mutually_exclusive_group(required=True)
+    nargs = '+' if many else 1
+    group.add_argument('--energy', type=float, nargs=nargs, help='energy (keV)')
+    group.add_argument('--wavelength', type=float, nargs=nargs, help='wavelength (Å)')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='xrdtools', description='X-ray diffraction tools of the Paineira beamline.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    attenuation = commands.add_parser('attenuation', help='density, µR and transmission of samples in capillaries')
+    attenuation.add_argument('formulas', nargs='*', help="chemical formulas (default or '-': one per line from stdin)")
+    _add_beam(attenuation, many=True)
+    attenuation.add_argument('--diameter', type=float, nargs='+', required=True, help='capillary diameter (mm)')
+    attenuation.add_argument('--packing', type=float, default=1.0, help='packing fraction (default 1)')
+    attenuation.add_argument('--dilution', type=float, default=0, help='diluent volume percentage (default 0)')
+    attenuation.add_argument('--diluent', default='graphite carbon', help='xraydb material used as diluent')
+    attenuation.add_argument('-o', '--output', help='output CSV (default stdout)')
+    attenuation.set_defaults(func=run_attenuation)
+
+    convert = commands.add_parser('convert', help='convert XRD patterns to a new energy and to Q')
+    convert.add_argument('inputs', nargs='*', help="pattern file (default or '-': stdin); several files or .zip need -o")
+    convert.add_argument('--energy', type=float, required=True, help='original energy (keV)')
+    convert.add_argument('--new-energy', type=float, required=True, help='new energy (keV)')
+    convert.add_argument('-o', '--output', help='output CSV (default stdout), or .zip/.npz for several inputs')
+    convert.add_argument('-j', '--jobs', type=int, default=None, help='worker processes for several inputs')
+    convert.set_defaults(func=run_convert)
+
+    dq = commands.add_parser('dq', help='Q and d-spacing from 2θ')
+    dq.add_argument('two_theta', nargs='*', help="2θ values in degrees (default or '-': first column of stdin)")
+    _add_beam(dq, many=False)
+    dq.add_argument('-o', '--output', help='output CSV (default stdout)')
+    dq.set_defaults(func=run_dq)
+
+    atlas = commands.add_parser('atlas', help='precomputed attenuation of common standards and diluents')
+    atlas.add_argument('query', nargs='?', help='name, formula or alias to search (default: list every material)')
+    atlas.add_argument('--energy', type=float, nargs='+', help='energy (keV); without it, only list the matches')
+    atlas.add_argument('--diameter', type=float, nargs='+', default=[0.5], help='capillary diameter (mm, default 0.5)')
+    atlas.add_argument('--packing', type=float, default=1.0, help='packing fraction (default 1)')
+    atlas.add_argument('--reference-density', action='store_true', help='use the reference instead of the estimated density')
+    atlas.add_argument('--limit', type=int, default=100, help='maximum number of matches (default 100)')
+    atlas.add_argument('-o', '--output', help='output CSV (default stdout)')
+    atlas.set_defaults(func=run_atlas)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.func(args)
+    except BrokenPipeError:
+        pass
+    except (ValueError, OSError) as error:
+        raise SystemExit(f'{args.command}: {error}')
+
+
+if __name__ == '__main__':
+    main()
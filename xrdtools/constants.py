@@ -0,0 +1,12 @@
+"""Constantes físicas (CODATA 2018, os mesmos valores de `scipy.constants` 1.14).
+
+Ficam num módulo próprio para que a conversão e o cálculo de atenuação não
+precisem importar o scipy, que sozinho dobra o tempo de importação.
+"""
+
+# constante de Planck em eV/Hz
+h = 4.135667696e-15
+# velocidade da luz (m/s)
+c = 299792458.0
+# unidade de massa atômica (kg)
+m_u = 1.6605390666e-27
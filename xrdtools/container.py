@@ -0,0 +1,155 @@
+"""Capilar como recipiente: amostra cilíndrica dentro de uma parede de quartzo ou Kapton.
+
+Para um feixe perpendicular ao eixo do capilar, o raio que passa à
+distância y do eixo atravessa na amostra a corda 2·sqrt(r² - y²) e na
+parede 2·sqrt(R² - y²) menos essa corda (r e R: raios interno e externo).
+A transmissão total é a média de exp(-µ_amostra·L_amostra - µ_parede·L_parede)
+sobre o perfil do feixe em |y| <= R, em vez do caminho único 2r.
+
+A média é feita por quadratura de Gauss-Legendre em duas regiões (|y| < r
+e r < |y| < R), com y = r·sin φ e y = R·sin φ, o que absorve a derivada
+infinita das cordas nas bordas; com QUADRATURE_NODES nós por região o erro
+fica abaixo de 1e-8. Os nós e as cordas dependem só da geometria e são
+calculados uma vez por capilar; a transmissão de todas as fórmulas,
+energias e capilares sai de um único einsum.
+"""
+import re
+import functools
+import numpy as np
+from xrdtools.attenuation import batch_attenuation
+from xrdtools.mu_table import material_mu
+
+QUADRATURE_NODES = 32
+# material do xraydb de cada parede
+WALL_MATERIALS = {'Kapton': 'kapton', 'Quartzo': 'silica'}
+# paredes nominais dos capilares vendidos só pelo diâmetro (mm): os de Kapton
+# (tubos de poliimida) são especificados pelo diâmetro interno, com parede de
+# 0,002"; os de quartzo, pelo externo, com parede de 0,01 mm
+NOMINAL_WALL = {'Kapton': 0.0508, 'Quartzo': 0.01}
+
+# rótulo -> (diâmetro interno, diâmetro externo, parede), em mm
+CAPILLARIES = {
+    '1.00 mm - Kapton': (1.00, 1.1016, 'Kapton'),
+    '0.30 mm - Kapton': (0.30, 0.4016, 'Kapton'),
+    '0.50 mm - Kapton': (0.50, 0.6016, 'Kapton'),
+    '0.70 mm - Kapton': (0.70, 0.8016, 'Kapton'),
+    '1.12 mm - Kapton': (1.12, 1.2216, 'Kapton'),
+    '1.37 mm - Kapton': (1.37, 1.4716, 'Kapton'),
+    '1.57 mm - Kapton': (1.57, 1.6716, 'Kapton'),
+    '0.20 mm - Quartzo': (0.18, 0.20, 'Quartzo'),
+    '0.30 mm - Quartzo': (0.28, 0.30, 'Quartzo'),
+    '0.50 mm - Quartzo': (0.48, 0.50, 'Quartzo'),
+    '0.70 mm - Quartzo': (0.68, 0.70, 'Quartzo'),
+    '1.00 mm - Quartzo': (0.98, 1.00, 'Quartzo'),
+    '1.20 mm - Quartzo': (1.18, 1.20, 'Quartzo'),
+    '1.50 mm - Quartzo': (1.48, 1.50, 'Quartzo'),
+    '0.80 mm (ID) X 0.92 mm (OD) - Quartzo': (0.80, 0.92, 'Quartzo'),
+    '0.80 mm (ID) X 1.00 mm (OD) - Quartzo': (0.80, 1.00, 'Quartzo'),
+    '0.86 mm (ID) X 0.92 mm (OD) - Quartzo': (0.86, 0.92, 'Quartzo'),
+    '0.90 mm (ID) X 1.00 mm (OD) - Quartzo': (0.90, 1.00, 'Quartzo'),
+    '1.00 mm (ID) X 1.12 mm (OD) - Quartzo': (1.00, 1.12, 'Quartzo'),
+    '1.00 mm (ID) X 1.20 mm (OD) - Quartzo': (1.00, 1.20, 'Quartzo'),
+    '1.06 mm (ID) X 1.12 mm (OD) - Quartzo': (1.06, 1.12, 'Quartzo'),
+    '1.10 mm (ID) X 1.20 mm (OD) - Quartzo': (1.10, 1.20, 'Quartzo'),
+    '1.50 mm (ID) X 1.80 mm (OD) - Quartzo': (1.50, 1.80, 'Quartzo'),
+    '2.00 mm (ID) X 2.40 mm (OD) - Quartzo': (2.00, 2.40, 'Quartzo'),
+}
+LABEL = re.compile(r'^\s*([\d.]+)\s*mm(?:\s*\(ID\)\s*X\s*([\d.]+)\s*mm\s*\(OD\))?\s*-\s*(\w+)\s*$')
+
+
+def capillary_geometry(capillary):
+    """(diâmetro interno, diâmetro externo, material da parede do xraydb ou None), em mm.
+
+    Aceita um rótulo do catálogo (ou no mesmo formato), uma tupla
+    (interno, externo, parede) ou só um diâmetro, tratado como amostra sem parede.
+    """
+    if isinstance(capillary, str):
+        if capillary in CAPILLARIES:
+            inner, outer, wall = CAPILLARIES[capillary]
+        else:
+            match = LABEL.match(capillary)
+            if match is None:
+                raise ValueError(f'unrecognised capillary {capillary!r}')
+            inner, outer, wall = float(match.group(1)), match.group(2), match.group(3)
+            if wall not in NOMINAL_WALL:
+                raise ValueError(f'unknown capillary material {wall!r}')
+            if outer is not None:
+                outer = float(outer)
+            elif wall == 'Kapton':
+                outer = inner + 2*NOMINAL_WALL[wall]
+            else:
+                inner, outer = inner - 2*NOMINAL_WALL[wall], inner
+    elif np.ndim(capillary) == 0:
+        inner = outer = float(capillary)
+        wall = None
+    else:
+        inner, outer, wall = capillary
+    if not 0 < inner <= outer:
+        raise ValueError(f'invalid capillary diameters: inner {inner} mm, outer {outer} mm')
+    return float(inner), float(outer), WALL_MATERIALS.get(wall, wall)
+
+
+def _gauss_legendre(start, stop, n_nodes):
+    nodes, weights = np.polynomial.legendre.leggauss(n_nodes)
+    half = 0.5*(stop - start)
+    return start + half*(nodes + 1), half*weights
+
+
+@functools.lru_cache(maxsize=256)
+def chord_quadrature(inner_mm, outer_mm, beam_fwhm_mm=None, n_nodes=QUADRATURE_NODES):
+    """Pesos (somando 1) e cordas na amostra e na parede (cm) para a média sobre o perfil do feixe.
+
+    Sem beam_fwhm_mm o feixe é uniforme e mais largo que o capilar; com ele,
+    gaussiano e centrado no eixo, e a média é sobre a parte que cruza o capilar.
+    """
+    r, R = 0.05*inner_mm, 0.05*outer_mm
+    phi, w_phi = _gauss_legendre(0.0, np.pi/2, n_nodes)
+    y_inner, w_inner = r*np.sin(phi), r*np.cos(phi)*w_phi
+    phi, w_phi = _gauss_legendre(np.arcsin(r/R), np.pi/2, n_nodes)
+    y_outer, w_outer = R*np.sin(phi), R*np.cos(phi)*w_phi
+    y = np.concatenate([y_inner, y_outer])
+    weights = np.concatenate([w_inner, w_outer])
+    if beam_fwhm_mm:
+        sigma = 0.1*beam_fwhm_mm / (2*np.sqrt(2*np.log(2)))
+        weights = weights*np.exp(-0.5*(y/sigma)**2)
+    weights = weights / weights.sum()
+    sample = 2*np.sqrt(np.clip(r*r - y*y, 0, None))
+    wall = 2*np.sqrt(np.clip(R*R - y*y, 0, None)) - sample
+    for array in (weights, sample, wall):
+        array.flags.writeable = False
+    return weights, sample, wall
+
+
+def capillary_transmission(chemical_formulas, energies, capillaries, packing_fraction=1.0, pct=0, diluent=None,
+                           beam_fwhm=None):
+    """Transmissão (%) de amostra + parede, média sobre o perfil do feixe, para fórmula x energia (eV) x capilar.
+
+    Retorna o dicionário de `batch_attenuation` (com µR e 'transmission' do
+    caminho único pelo diâmetro interno) acrescido de:
+    'total_transmission' (amostra e parede), 'sample_transmission' (sem
+    parede) e 'wall_transmission' (capilar vazio), todos com forma
+    (n_fórmulas, n_energias, n_capilares), e 'geometry'.
+    """
+    geometry = [capillary_geometry(capillary) for capillary in capillaries]
+    result = batch_attenuation(chemical_formulas, energies, [inner for inner, _, _ in geometry],
+                               packing_fraction, pct, diluent)
+    mu_sample = result['linear_mu']
+    energies = result['energy']
+
+    walls = {wall for _, _, wall in geometry if wall}
+    wall_mu = {wall: material_mu(wall, energies) for wall in walls}
+    mu_wall = np.array([wall_mu[wall] if wall else np.zeros(len(energies)) for _, _, wall in geometry])
+
+    quadrature = [chord_quadrature(inner, outer, beam_fwhm) for inner, outer, _ in geometry]
+    weights = np.array([w for w, _, _ in quadrature])
+    sample = np.array([s for _, s, _ in quadrature])
+    wall = np.array([w for _, _, w in quadrature])
+
+    # transmissões de cada raio: amostra (fórmulas, energias, capilares, nós) e parede (energias, capilares, nós)
+    sample_ray = np.exp(-mu_sample[:, :, None, None] * sample)
+    wall_ray = np.exp(-mu_wall.T[:, :, None] * wall)
+    result['total_transmission'] = 100*np.einsum('fecn,ecn,cn->fec', sample_ray, wall_ray, weights, optimize=True)
+    result['sample_transmission'] = 100*np.einsum('fecn,cn->fec', sample_ray, weights)
+    result['wall_transmission'] = 100*np.einsum('ecn,cn->ec', wall_ray, weights)[None]
+    result['geometry'] = geometry
+    return result
@@ -0,0 +1,66 @@
+import numpy as np
+from xrdtools.constants import h, c
+
+
+def calculate_wavelength(energy):
+    """Calcula o comprimento de onda (Å) a partir da energia (keV)."""
+    return h * c / (energy * 1e3) * 1e10
+
+def calculate_energy(wavelength):
+    """Calcula a energia (keV) a partir do comprimento de onda (Å)."""
+    return h * c / (wavelength * 1e-10) * 1e-3
+
+def calculate_new_2theta(two_theta, original_energy, new_energy):
+    """Calcula o novo ângulo 2θ para uma nova energia."""
+    return 2 * np.rad2deg(np.arcsin((original_energy / new_energy) * np.sin(np.deg2rad(two_theta / 2))))
+
+def scattering_vector(wavelength, two_theta):
+    """Calcula o vetor de espalhamento Q."""
+    return (4 * np.pi / wavelength) * np.sin(np.deg2rad(two_theta / 2))
+
+def calculate_d(wavelength, two_theta):
+    """Calcula o espaçamento inter-planar (Å); em 2θ = 0 (Q = 0) o resultado é infinito, sem aviso."""
+    with np.errstate(divide='ignore'):
+        return (wavelength / (2 * np.sin(np.deg2rad(two_theta / 2))))
+
+def d_from_q(Q):
+    """Espaçamento d (Å) a partir de Q (Å⁻¹); Q = 0 dá d infinito."""
+    with np.errstate(divide='ignore'):
+        return 2 * np.pi / np.asarray(Q, dtype=float)
+
+def two_theta_from_d(wavelength, d):
+    """Ângulo 2θ (graus) de Bragg para o espaçamento d; NaN quando λ > 2d (reflexão inacessível)."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 2 * np.rad2deg(np.arcsin(wavelength / (2 * np.asarray(d, dtype=float))))
+
+def two_theta_from_q(wavelength, Q):
+    """Ângulo 2θ (graus) a partir de Q (Å⁻¹); NaN quando Qλ/4π > 1."""
+    with np.errstate(invalid='ignore'):
+        return 2 * np.rad2deg(np.arcsin(np.asarray(Q, dtype=float) * wavelength / (4 * np.pi)))
+
+QUANTITIES = ('2theta', 'd', 'Q')
+
+def convert_reflections(values, quantity, wavelengths, source_wavelength=None):
+    """Converte uma lista de valores de 2θ (graus), d (Å) ou Q (Å⁻¹) numa única chamada vetorizada.
+
+    Retorna (d, Q, two_theta), com d e Q de forma (n,) e two_theta de forma
+    (len(wavelengths), n), um 2θ por comprimento de onda. Para
+    quantity='2theta', os valores são os medidos em source_wavelength (por
+    padrão, o primeiro comprimento de onda).
+    """
+    values = np.asarray(values, dtype=float)
+    wavelengths = np.atleast_1d(np.asarray(wavelengths, dtype=float))
+    if quantity == '2theta':
+        source_wavelength = wavelengths[0] if source_wavelength is None else source_wavelength
+        d = calculate_d(source_wavelength, values)
+        Q = scattering_vector(source_wavelength, values)
+    elif quantity == 'd':
+        d = values
+        Q = d_from_q(values)
+    elif quantity == 'Q':
+        d = d_from_q(values)
+        Q = values
+    else:
+        raise ValueError(f'unknown quantity {quantity!r}; use one of {QUANTITIES}')
+    two_theta = two_theta_from_d(wavelengths[:, None], d)
+    return d, Q, two_theta
@@ -0,0 +1,112 @@
+"""Redução de pontos dos difratogramas antes de montar os gráficos Plotly.
+
+Os gráficos só precisam de alguns milhares de pontos por curva; as
+exportações continuam usando os dados completos.
+"""
+import numpy as np
+
+MAX_POINTS = 4000
+
+
+def _finite_sorted(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    if not keep.all():
+        x, y = x[keep], y[keep]
+    if len(x) > 1 and np.any(np.diff(x) < 0):
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+    return x, y
+
+
+def minmax_indices(x, y, n_buckets):
+    """Índices do mínimo e do máximo de y em cada uma de n_buckets faixas de mesma largura em x.
+
+    x deve estar ordenado. Equivale a desenhar cada coluna de pixels com a
+    menor e a maior intensidade que ela contém, o que preserva os picos.
+    """
+    n = len(x)
+    edges = np.linspace(x[0], x[-1], n_buckets + 1)
+    starts = np.unique(np.searchsorted(x, edges[:-1]))
+    starts = starts[starts < n]
+    counts = np.diff(np.append(starts, n))
+    index = np.arange(n)
+    y_min = np.repeat(np.minimum.reduceat(y, starts), counts)
+    y_max = np.repeat(np.maximum.reduceat(y, starts), counts)
+    first_min = np.minimum.reduceat(np.where(y == y_min, index, n), starts)
+    first_max = np.minimum.reduceat(np.where(y == y_max, index, n), starts)
+    return np.unique(np.concatenate([first_min, first_max, [0, n - 1]]))
+
+
+def lttb_indices(x, y, n_out):
+    """Índices escolhidos pelo Largest-Triangle-Three-Buckets (Steinarsson, 2013)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = bounds[i], bounds[i + 1]
+        next_stop = bounds[i + 2] if i + 2 < len(bounds) else n
+        next_start = stop if i + 2 < len(bounds) else n - 1
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def decimate(x, y, max_points=MAX_POINTS, x_range=None, method='minmax'):
+    """Retorna (x, y) com no máximo ~max_points pontos dentro de x_range.
+
+    Pontos não finitos (ex.: 2θ impossível na nova energia) são descartados.
+    Com x_range, só a janela visível (mais um ponto de cada lado) é reduzida,
+    de modo que um zoom recupera os detalhes.
+    """
+    x, y = _finite_sorted(x, y)
+    if x_range is not None and len(x):
+        lo = max(np.searchsorted(x, x_range[0]) - 1, 0)
+        hi = np.searchsorted(x, x_range[1], side='right') + 1
+        x, y = x[lo:hi], y[lo:hi]
+    if len(x) <= max_points:
+        return x, y
+    if method == 'lttb':
+        index = lttb_indices(x, y, max_points)
+    else:
+        index = minmax_indices(x, y, max_points // 2)
+    return x[index], y[index]
+
+
+def minmax_rows(x, curves, max_points=MAX_POINTS):
+    """minmax de várias curvas que dividem o mesmo eixo x (ordenado), numa única operação 2D.
+
+    Retorna (x reduzido, curvas reduzidas), ambos de forma (n_curvas,
+    n_pontos): como em `minmax`, cada faixa vira dois pontos, o mínimo e o
+    máximo de cada curva (NaN ignorados) nas posições x onde eles de fato
+    estão, na ordem em que aparecem. Uma faixa só com NaN fica com o x do seu
+    começo. Serve para sobreposições e mapas de calor em que todas as curvas
+    usam o mesmo eixo.
+    """
+    x = np.asarray(x, dtype=float)
+    curves = np.atleast_2d(np.asarray(curves, dtype=float))
+    n = curves.shape[1]
+    if n <= max_points:
+        return np.broadcast_to(x, curves.shape), curves
+    starts = np.unique(np.searchsorted(x, np.linspace(x[0], x[-1], max_points // 2 + 1)[:-1]))
+    starts = starts[starts < n]
+    counts = np.diff(np.append(starts, n))
+    index = np.arange(n)
+    with np.errstate(invalid='ignore'):
+        low = np.repeat(np.fmin.reduceat(curves, starts, axis=1), counts, axis=1)
+        high = np.repeat(np.fmax.reduceat(curves, starts, axis=1), counts, axis=1)
+    # primeira posição do mínimo e do máximo de cada faixa (n onde a faixa só tem NaN)
+    first_min = np.minimum.reduceat(np.where(curves == low, index, n), starts, axis=1)
+    first_max = np.minimum.reduceat(np.where(curves == high, index, n), starts, axis=1)
+    empty = first_min == n
+    first_min[empty] = first_max[empty] = np.broadcast_to(starts, first_min.shape)[empty]
+    picked = np.stack([np.minimum(first_min, first_max), np.maximum(first_min, first_max)], axis=2).reshape(len(curves), -1)
+    return x[picked], np.take_along_axis(curves, picked, axis=1)
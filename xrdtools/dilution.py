@@ -0,0 +1,104 @@
+"""Solver inverso: capilar e diluição recomendados para deixar µR numa banda.
+
+Dados fórmula, energia e fração de empacotamento, avalia de uma vez todos
+os capilares do catálogo, sem diluente e com cada diluente de DILUENTS em
+DILUTION_STEPS porcentagens de volume: uma só chamada de
+`mixture_attenuation` com uma mistura por linha (fórmula + um diluente),
+com o mesmo modelo e o mesmo caminho (o diâmetro do rótulo) de `calculate`.
+
+Das opções com µR dentro da banda ficam as de Pareto para dois objetivos:
+mais amostra no feixe (massa de amostra por mm de capilar, o que dá sinal)
+e menos diluente (menos espalhamento do diluente e preparo mais simples).
+Uma opção sai do conjunto se outra tem ao menos tanta amostra com no
+máximo tanto diluente, sendo melhor em um dos dois.
+"""
+import numpy as np
+from xrdtools.attenuation import capillary_distance
+from xrdtools.container import CAPILLARIES
+from xrdtools.mixture import mixture_attenuation
+
+# rótulo da página -> material do xraydb
+DILUENTS = {'Carbon': 'graphite carbon', 'Silica': 'silica'}
+# porcentagens de volume de diluente avaliadas (100 % não deixaria amostra)
+DILUTION_STEPS = np.arange(1, 100)
+
+
+def dilution_grid(chemical_formula, energy, packing_fraction, capillaries=None, diluents=None, steps=DILUTION_STEPS):
+    """µR e transmissão (%) de cada (diluição, capilar) na energia (eV), numa única avaliação vetorizada.
+
+    As linhas são: sem diluente e, para cada diluente, as porcentagens de
+    `steps`; as colunas, os capilares. Retorna um dicionário com 'mu_R',
+    'transmission' e 'sample_mass' (mg de amostra por mm de capilar), todos
+    de forma (n_linhas, n_capilares), e os rótulos 'capillary', 'diluent'
+    (None na linha sem diluente) e 'pct' de cada linha/coluna.
+    """
+    capillaries = list(CAPILLARIES) if capillaries is None else list(capillaries)
+    diluents = DILUENTS if diluents is None else diluents
+    steps = np.asarray(steps, dtype=float)
+    phases = [chemical_formula, *diluents.values()]
+
+    fractions = np.zeros((1 + len(diluents)*len(steps), len(phases)))
+    fractions[0, 0] = 1
+    row_diluent, row_pct = [None], [0.0]
+    for i, name in enumerate(diluents):
+        rows = slice(1 + i*len(steps), 1 + (i + 1)*len(steps))
+        fractions[rows, 0] = 1 - steps/100
+        fractions[rows, 1 + i] = steps/100
+        row_diluent += [name]*len(steps)
+        row_pct += list(steps)
+
+    result = mixture_attenuation(phases, fractions, [energy], capillaries, packing_fraction, basis='volume')
+    distance = result['distance']
+    sample_density = result['phase_density'][0]
+    sample_volume = result['volume_fraction'][:, 0]
+    # g/cm de amostra = ρ·p·v·πr² (r em cm); x 100 para mg/mm
+    sample_mass = 100*sample_density*packing_fraction*sample_volume[:, None]*np.pi*(distance/2)**2
+    return {
+        'mu_R': result['mu_R'][:, 0, :],
+        'transmission': result['transmission'][:, 0, :],
+        'sample_mass': sample_mass,
+        'capillary': capillaries,
+        'diluent': row_diluent,
+        'pct': np.array(row_pct),
+        'energy': float(energy),
+    }
+
+
+def pareto_options(grid, mu_r_min=1.0, mu_r_max=5.0):
+    """Opções de Pareto (mais amostra, menos diluente) com µR na banda, da menos à mais diluída.
+
+    Cada opção é um dicionário com capilar, diâmetro (mm), diluente, pct,
+    µR, transmissão e massa de amostra; em empate, fica a de µR mais
+    próximo da média geométrica da banda.
+    """
+    inside = (grid['mu_R'] >= mu_r_min) & (grid['mu_R'] <= mu_r_max)
+    rows, columns = np.nonzero(inside)
+    if not len(rows):
+        return []
+    pct = grid['pct'][rows]
+    mass = grid['sample_mass'][rows, columns]
+    center = np.abs(np.log(grid['mu_R'][rows, columns]) - 0.5*(np.log(mu_r_min) + np.log(mu_r_max)))
+    order = np.lexsort((center, -mass, pct))
+    options = []
+    best_mass = -np.inf
+    for k in order:
+        if mass[k] <= best_mass:
+            continue
+        best_mass = mass[k]
+        row, column = rows[k], columns[k]
+        options.append({
+            'capillary': grid['capillary'][column],
+            'diameter': round(10*capillary_distance(grid['capillary'][column]), 6),
+            'diluent': grid['diluent'][row],
+            'pct': float(grid['pct'][row]),
+            'mu_R': float(grid['mu_R'][row, column]),
+            'transmission': float(grid['transmission'][row, column]),
+            'sample_mass': float(mass[k]),
+        })
+    return options
+
+
+def recommend(chemical_formula, energy, packing_fraction, mu_r_min=1.0, mu_r_max=5.0, capillaries=None, diluents=None):
+    """Conjunto de Pareto de capilar e diluição com µR entre mu_r_min e mu_r_max na energia (eV)."""
+    grid = dilution_grid(chemical_formula, energy, packing_fraction, capillaries, diluents)
+    return pareto_options(grid, mu_r_min, mu_r_max), grid
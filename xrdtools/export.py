@@ -0,0 +1,50 @@
+"""Exportação dos difratogramas convertidos em texto ou binário.
+
+Os arquivos são gerados só no momento do download, a partir dos arrays,
+sem guardar cópias serializadas na sessão.
+"""
+import io
+import numpy as np
+import pandas as pd
+
+# nome exibido -> (extensão, tipo MIME)
+EXPORT_FORMATS = {
+    'CSV (.csv)': ('csv', 'text/csv'),
+    'XYE text (.xye)': ('xye', 'text/plain'),
+    'NumPy array (.npy)': ('npy', 'application/octet-stream'),
+    'Compressed NumPy (.npz)': ('npz', 'application/octet-stream'),
+}
+
+
+def export_pattern(x, intensity, fmt, x_label='2theta (degree)', float32=False, error=None):
+    """Serializa (x, intensidade) no formato `fmt` ('csv', 'xye', 'npy' ou 'npz') e retorna bytes.
+
+    No .xye a terceira coluna é `error` ou, sem ele, a incerteza de Poisson
+    sqrt(|I|); nos demais formatos `error` só entra quando é dado (ex.: após
+    a reamostragem). Com float32 os binários ocupam metade e os textos usam
+    8 algarismos.
+    """
+    dtype = np.float32 if float32 else np.float64
+    x = np.asarray(x, dtype=dtype)
+    intensity = np.asarray(intensity, dtype=dtype)
+    columns = {x_label: x, 'Intensity': intensity}
+    if error is not None:
+        columns['Error'] = np.asarray(error, dtype=dtype)
+    if fmt == 'csv':
+        float_format = '%.8g' if float32 else None
+        return pd.DataFrame(columns).to_csv(index=False, float_format=float_format).encode()
+    buffer = io.BytesIO()
+    if fmt == 'xye':
+        xye_error = columns['Error'] if error is not None else np.sqrt(np.abs(intensity))
+        np.savetxt(buffer, np.column_stack([x, intensity, xye_error]),
+                   fmt='%.8g' if float32 else '%.17g', header=f'{x_label} Intensity Error', encoding='utf-8')
+    elif fmt == 'npy':
+        np.save(buffer, np.column_stack(list(columns.values())))
+    elif fmt == 'npz':
+        arrays = {'x': x, 'intensity': intensity}
+        if error is not None:
+            arrays['error'] = columns['Error']
+        np.savez_compressed(buffer, **arrays, x_label=np.array(x_label))
+    else:
+        raise ValueError(f'unknown export format {fmt!r}')
+    return buffer.getvalue()
@@ -0,0 +1,99 @@
+"""Área iluminada e transbordamento do feixe (spill-over) em geometria de reflexão.
+
+Um feixe de altura h (no plano de espalhamento) e largura w incide com
+ângulo ω na amostra plana, de comprimento L (ao longo do feixe) e largura W,
+centrada no eixo do goniômetro. O feixe se espalha na superfície num
+comprimento h/sin ω; a fração do feixe que atinge a amostra é
+
+    uniforme:   min(1, L·sin ω / h) · min(1, W / w)
+    gaussiano:  erf(L·sin ω / (2√2 σ_h)) · erf(W / (2√2 σ_w)),  σ = FWHM / 2,355
+
+(no perfil gaussiano h e w são as larguras a meia altura). Numa amostra
+espessa em θ/2θ o volume difratante não depende do ângulo quando todo o
+feixe cai na amostra, então a correção de spill-over divide a intensidade
+por essa fração. Em θ/2θ ω = 2θ/2; em incidência fixa, ω é constante.
+
+Todas as funções recebem arrays de 2θ e calculam a varredura inteira de uma vez.
+"""
+import numpy as np
+
+BEAM_PROFILES = ('uniform', 'gaussian')
+FWHM_TO_SIGMA = 1 / (2*np.sqrt(2*np.log(2)))
+# frações menores que esta não são corrigidas (a intensidade vira NaN)
+MIN_FRACTION = 1e-3
+
+
+def _erf(x):
+    """erf vetorizada (Abramowitz e Stegun 7.1.26, erro absoluto < 1,5e-7), sem importar o scipy."""
+    x = np.asarray(x, dtype=float)
+    t = 1 / (1 + 0.3275911*np.abs(x))
+    poly = t*(0.254829592 + t*(-0.284496736 + t*(1.421413741 + t*(-1.453152027 + t*1.061405429))))
+    return np.sign(x) * (1 - poly*np.exp(-x*x))
+
+
+def incidence_angle(two_theta, omega=None):
+    """ω (graus) de cada ponto: 2θ/2 numa varredura θ/2θ, ou o ω fixo."""
+    two_theta = np.asarray(two_theta, dtype=float)
+    if omega is None:
+        return two_theta / 2
+    return np.full(two_theta.shape, float(omega))
+
+
+def beam_fraction(two_theta, beam_height, beam_width, sample_length, sample_width, omega=None, profile='uniform'):
+    """Fração (0 a 1) do feixe que atinge a amostra em cada ponto da varredura."""
+    if profile not in BEAM_PROFILES:
+        raise ValueError(f'unknown beam profile {profile!r}; use one of {BEAM_PROFILES}')
+    if min(beam_height, beam_width, sample_length, sample_width) <= 0:
+        raise ValueError('beam and sample dimensions must be positive')
+    sin_omega = np.sin(np.deg2rad(incidence_angle(two_theta, omega)))
+    # altura do feixe interceptada pela amostra, medida perpendicularmente ao feixe
+    projected = sample_length*np.clip(sin_omega, 0, None)
+    if profile == 'uniform':
+        return np.minimum(1, projected / beam_height) * min(1.0, sample_width / beam_width)
+    along = _erf(projected / (2*np.sqrt(2)*beam_height*FWHM_TO_SIGMA))
+    across = float(_erf(sample_width / (2*np.sqrt(2)*beam_width*FWHM_TO_SIGMA)))
+    return along*across
+
+
+def footprint(two_theta, beam_height, beam_width, sample_length, sample_width, omega=None, profile='uniform'):
+    """Comprimento e área iluminados e fração do feixe na amostra para cada 2θ da varredura.
+
+    Retorna um dicionário de arrays com a forma de two_theta: 'omega' (graus),
+    'length' (h/sin ω, mm, na superfície sem limite de amostra),
+    'illuminated_length' (mm), 'illuminated_area' (mm²) e 'fraction'; e
+    'full_beam_omega', o menor ω (graus) com todo o feixe na amostra (no
+    gaussiano, com 99% da altura e da largura do feixe nela); NaN se a
+    amostra for mais curta ou mais estreita que o feixe, quando nenhum ω
+    põe o feixe inteiro na amostra.
+    """
+    omega_values = incidence_angle(two_theta, omega)
+    sin_omega = np.sin(np.deg2rad(omega_values))
+    with np.errstate(divide='ignore'):
+        length = np.where(sin_omega > 0, beam_height / sin_omega, np.inf)
+    illuminated_length = np.minimum(length, sample_length)
+    illuminated_area = illuminated_length * min(beam_width, sample_width)
+    fraction = beam_fraction(two_theta, beam_height, beam_width, sample_length, sample_width, omega, profile)
+    # 2,576σ contém 99% do gaussiano; a altura (e a largura) correspondente é 2,576·2σ
+    scale = 1.0 if profile == 'uniform' else 2*2.576*FWHM_TO_SIGMA
+    needed_height, needed_width = scale*beam_height, scale*beam_width
+    if needed_height <= sample_length and needed_width <= sample_width:
+        full_beam_omega = np.degrees(np.arcsin(needed_height / sample_length))
+    else:
+        full_beam_omega = np.nan
+    return {
+        'omega': omega_values,
+        'length': length,
+        'illuminated_length': illuminated_length,
+        'illuminated_area': illuminated_area,
+        'fraction': fraction,
+        'full_beam_omega': full_beam_omega,
+    }
+
+
+def correct_spillover(two_theta, intensity, beam_height, beam_width, sample_length, sample_width, omega=None,
+                      profile='uniform'):
+    """Intensidade dividida pela fração do feixe na amostra; NaN onde a fração é menor que MIN_FRACTION."""
+    fraction = beam_fraction(two_theta, beam_height, beam_width, sample_length, sample_width, omega, profile)
+    intensity = np.asarray(intensity, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(fraction >= MIN_FRACTION, intensity / fraction, np.nan)
@@ -0,0 +1,114 @@
+"""Leitura de fórmulas químicas.
+
+Aceita grupos aninhados com (), [] ou {}, hidratos separados por '·', '•'
+ou '*' (com coeficiente opcional, ex.: CuSO4·5H2O), ocupações fracionárias
+(YBa2Cu3O6.5, Ca0.5Sr0.5TiO3) e elementos repetidos, que são somados
+(FeOFe -> Fe2O). O '.' é sempre parte de um número, nunca separador de
+hidrato. Quantidades zero valem (CuSO4·0H2O é CuSO4): elementos que somam
+zero saem do resultado.
+"""
+import re
+import numpy as np
+from xrdtools.cache import formula_cache
+from xrdtools.mu_table import element_index
+
+NUMBER = r'(?:\d+(?:\.\d*)?|\.\d+)'
+# caminho rápido: fórmula sem grupos nem hidratos
+FLAT_FORMULA = re.compile(rf'(?:[A-Z][a-z]?{NUMBER}?)+')
+FLAT_TOKEN = re.compile(rf'([A-Z][a-z]?)({NUMBER})?')
+TOKEN = re.compile(rf'\s*(?:([A-Z][a-z]?)|({NUMBER})|([(\[{{])|([)\]}}])|([·•*]))')
+CLOSING = {'(': ')', '[': ']', '{': '}'}
+
+
+def _add(total, counts, factor=1.0):
+    for element, count in counts.items():
+        total[element] = total.get(element, 0.0) + count*factor
+
+
+def _tokenize(formula):
+    tokens = []
+    position = 0
+    formula = formula.strip()
+    while position < len(formula):
+        match = TOKEN.match(formula, position)
+        if match is None or match.end() == position:
+            raise ValueError(f'invalid character {formula[position]!r} at position {position} of {formula!r}')
+        kind = match.lastindex
+        tokens.append((kind, match.group(kind), match.start(kind)))
+        position = match.end()
+    return tokens
+
+
+def _parse(tokens, formula):
+    """Analisador de pilha: retorna o dicionário elemento -> quantidade."""
+    total = {}
+    stack = [({}, None, 0)]
+    coefficient = None
+    i = 0
+
+    def count_after(j):
+        if j < len(tokens) and tokens[j][0] == 2:
+            return float(tokens[j][1]), j + 1
+        return 1.0, j
+
+    while i < len(tokens):
+        kind, text, position = tokens[i]
+        if kind == 1:
+            count, i = count_after(i + 1)
+            _add(stack[-1][0], {text: count})
+        elif kind == 3:
+            stack.append(({}, text, position))
+            i += 1
+        elif kind == 4:
+            if len(stack) == 1 or CLOSING[stack[-1][1]] != text:
+                raise ValueError(f'unbalanced {text!r} at position {position} of {formula!r}')
+            group = stack.pop()[0]
+            count, i = count_after(i + 1)
+            _add(stack[-1][0], group, count)
+        elif kind == 5:
+            if len(stack) > 1:
+                raise ValueError(f'hydrate separator inside a group at position {position} of {formula!r}')
+            _add(total, stack[0][0], 1.0 if coefficient is None else coefficient)
+            stack = [({}, None, position)]
+            coefficient, i = count_after(i + 1)
+        else:
+            raise ValueError(f'unexpected number at position {position} of {formula!r}')
+
+    if len(stack) > 1:
+        _, opening, start = stack[-1]
+        raise ValueError(f'unclosed {opening!r} at position {start} of {formula!r}')
+    if not stack[0][0] and coefficient is not None:
+        raise ValueError(f'nothing after the hydrate separator in {formula!r}')
+    _add(total, stack[0][0], 1.0 if coefficient is None else coefficient)
+    return total
+
+
+@formula_cache.memoize
+def parse_formula(formula):
+    """Dicionário elemento -> quantidade (somando repetições), na ordem em que aparecem.
+
+    Levanta ValueError para fórmulas mal formadas, vazias (ou só com
+    quantidades zero) ou com elementos desconhecidos.
+    """
+    if FLAT_FORMULA.fullmatch(formula):
+        elements = {}
+        for element, count in FLAT_TOKEN.findall(formula):
+            elements[element] = elements.get(element, 0.0) + (float(count) if count else 1.0)
+    else:
+        elements = _parse(_tokenize(formula), formula)
+    element_index(list(elements))
+    elements = {element: count for element, count in elements.items() if count}
+    if not elements:
+        raise ValueError(f'empty chemical formula {formula!r}')
+    return elements
+
+
+@formula_cache.memoize
+def composition_vector(formula):
+    """(índices na tabela de µ/ρ, quantidades) da fórmula, prontos para o cálculo de atenuação."""
+    elements = parse_formula(formula)
+    index = element_index(list(elements))
+    counts = np.fromiter(elements.values(), dtype=float, count=len(elements))
+    index.flags.writeable = False
+    counts.flags.writeable = False
+    return index, counts
@@ -0,0 +1,211 @@
+"""Fila de trabalhos em segundo plano, para conversões pesadas não travarem a execução da página.
+
+Uma única fila por processo (`job_queue`), compartilhada por todas as
+sessões do Streamlit: MAX_WORKERS threads de trabalho tiram os trabalhos de
+uma fila local limitada a MAX_QUEUED espera; com a fila cheia, `submit`
+levanta JobQueueFull em vez de acumular trabalho sem limite. Cada trabalho
+tem um id, estado (QUEUED, RUNNING, DONE, FAILED, CANCELLED), progresso e
+resultado; a página guarda só os ids no session_state (`session_jobs`) e
+acompanha o estado num fragmento que se reexecuta sozinho, sem bloquear o
+resto da página.
+
+O cancelamento é cooperativo: a função do trabalho recebe o próprio Job
+como primeiro argumento e chama `job.report(feitos, total)`, que levanta
+JobCancelled se o cancelamento foi pedido; um trabalho ainda na fila é
+descartado sem rodar. Resultados não recolhidos expiram RESULT_TTL
+segundos depois de o trabalho terminar.
+
+As funções rodam fora da thread do script: não podem chamar st.*, e o que
+devolvem não deve ser modificado por quem lê.
+"""
+import os
+import time
+import uuid
+import queue
+import threading
+
+MAX_WORKERS = int(os.environ.get('XRDTOOLS_JOB_WORKERS', 2))
+MAX_QUEUED = 16
+RESULT_TTL = 15*60
+SESSION_KEY = 'jobs'
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Levantada por `Job.report` quando o cancelamento do trabalho foi pedido."""
+
+
+class JobQueueFull(RuntimeError):
+    """A fila de espera está cheia."""
+
+
+class Job:
+    """Um trabalho da fila: função, estado, progresso e resultado."""
+
+    def __init__(self, func, args, kwargs, name=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name or func.__name__
+        self.status = QUEUED
+        self.done = 0
+        self.total = 0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._func, self._args, self._kwargs = func, args, kwargs
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+
+    def report(self, done, total, message=None):
+        """Atualiza o progresso (e a etapa, em `message`); levanta JobCancelled se o trabalho foi cancelado."""
+        self.done, self.total = done, total
+        if message is not None:
+            self.message = message
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def cancel(self):
+        """Pede o cancelamento; na fila, o trabalho é cancelado na hora."""
+        with self._lock:
+            self._cancel.set()
+            if self.status == QUEUED:
+                self._finish(CANCELLED)
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def progress(self):
+        """Fração concluída (0 a 1), ou None se o trabalho não informa o total."""
+        if self.status == DONE:
+            return 1.0
+        return self.done / self.total if self.total else None
+
+    @property
+    def seconds(self):
+        """Tempo de execução até agora (ou total, se terminou)."""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def wait(self, timeout=None):
+        """Espera o trabalho terminar por até `timeout` segundos; retorna se terminou."""
+        return self._finished.wait(timeout)
+
+    def run(self):
+        with self._lock:
+            if self._cancel.is_set():
+                self._finish(CANCELLED)
+                return
+            self.status = RUNNING
+            self.started = time.time()
+        try:
+            self.result = self._func(self, *self._args, **self._kwargs)
+        except JobCancelled:
+            self._finish(CANCELLED)
+        except Exception as error:
+            self.error = error
+            self._finish(FAILED)
+        else:
+            self._finish(DONE)
+        finally:
+            self._func = self._args = self._kwargs = None
+
+    def _finish(self, status):
+        if self._finished.is_set():
+            return
+        self.status = status
+        self.finished = time.time()
+        self._finished.set()
+
+
+class JobQueue:
+    """Threads de trabalho com fila local limitada; os trabalhos ficam acessíveis pelo id até expirarem."""
+
+    def __init__(self, max_workers=MAX_WORKERS, max_queued=MAX_QUEUED, ttl=RESULT_TTL):
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, name=None, **kwargs):
+        """Põe `func(job, *args, **kwargs)` na fila e retorna o Job; JobQueueFull se a fila estiver cheia."""
+        job = Job(func, args, kwargs, name)
+        self._start_workers()
+        self._expire()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            raise JobQueueFull('the server is busy with other conversions; try again in a moment') from None
+        with self._lock:
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        """O Job de `job_id`, ou None se não existe ou já expirou."""
+        self._expire()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def discard(self, job_id):
+        """Esquece o trabalho (cancelando-o se não terminou), liberando o resultado."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None and job.status not in FINISHED:
+            job.cancel()
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {status: 0 for status in (QUEUED, RUNNING, *FINISHED)}
+        for job in jobs:
+            counts[job.status] += 1
+        return {'workers': len(self._workers), 'waiting': self._queue.qsize(), **counts}
+
+    def _start_workers(self):
+        with self._lock:
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, name=f'xrdtools-job-{len(self._workers)}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                job.run()
+            finally:
+                self._queue.task_done()
+
+    def _expire(self):
+        limit = time.time() - self.ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job.finished is not None and job.finished < limit]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+job_queue = JobQueue()
+
+
+def session_jobs(session_state):
+    """Trabalhos da sessão (nome -> dicionário com o 'id' e o contexto do pedido), guardados no session_state."""
+    jobs = session_state.get(SESSION_KEY)
+    if jobs is None:
+        jobs = {}
+        session_state[SESSION_KEY] = jobs
+    return jobs
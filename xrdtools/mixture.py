@@ -0,0 +1,168 @@
+"""Misturas de várias fases (amostra, diluentes, padrão interno) por fração mássica ou volumétrica.
+
+Cada fase é uma fórmula química ou um material do xraydb ('silica',
+'graphite carbon', ...) com a sua densidade em g/cm³; sem densidade vale a
+do material do xraydb ou, para fórmulas, a estimativa da calculadora
+(1 Å³ por átomo). Para frações mássicas w_i e densidades ρ_i, o pó sem
+vazios tem
+
+    (µ/ρ)_mix = Σ w_i (µ/ρ)_i,   ρ_mix = 1 / Σ (w_i / ρ_i),   v_i = w_i ρ_mix / ρ_i
+
+e, num capilar com fração de empacotamento p (do pó inteiro, diluentes
+incluídos), µ = p ρ_mix (µ/ρ)_mix = p Σ v_i ρ_i (µ/ρ)_i.
+
+As curvas µ/ρ(E) das fases saem de um só produto (fases x elementos) @
+(elementos x energias) e as de todas as misturas pedidas, uma por linha de
+`fractions`, de um segundo produto (misturas x fases) @ (fases x energias).
+Procurar uma proporção (`solve_fraction`) é avaliar uma grade de frações
+inteira de uma vez, não chamar `calculate` ponto a ponto.
+"""
+import numpy as np
+from xrdtools.attenuation import capillary_distance, composition_matrix, get_elements
+from xrdtools.mu_table import mu_elam_rows
+
+FRACTION_BASES = ('mass', 'volume')
+FRACTION_STEPS = 1001
+
+
+def resolve_phase(name, density=None):
+    """(fórmula, densidade ou None) de uma fase dada por fórmula ou por nome de material do xraydb."""
+    try:
+        get_elements(name)
+        return name, density
+    except ValueError:
+        import xraydb as xr
+        material = xr.get_material(name)
+        if material is None:
+            raise ValueError(f'{name!r} is neither a chemical formula nor an xraydb material') from None
+        formula, material_density = material
+        return formula, material_density if density is None else density
+
+
+def phase_curves(phases, energies, densities=None):
+    """µ/ρ (cm²/g) de cada fase nas energias (eV), com forma (n_fases, n_energias), e as densidades.
+
+    `densities` tem um valor por fase; None (ou NaN) usa a densidade do
+    material do xraydb ou a estimada pela fórmula.
+    """
+    if densities is None:
+        densities = [None] * len(phases)
+    resolved = [resolve_phase(phase, None if density is None or np.isnan(density) else density)
+                for phase, density in zip(phases, densities)]
+    formulas = [formula for formula, _ in resolved]
+    rows, mass_fraction, estimated = composition_matrix(formulas)
+    density = np.array([estimated[i] if given is None else float(given) for i, (_, given) in enumerate(resolved)])
+    if np.any(density <= 0):
+        raise ValueError('phase densities must be positive')
+    energies = np.atleast_1d(np.asarray(energies, dtype=float))
+    unique_energies, inverse = np.unique(energies, return_inverse=True)
+    mu_rho = (mass_fraction @ mu_elam_rows(rows, unique_energies))[:, inverse]
+    return {'formula': formulas, 'density': density, 'mu_rho': mu_rho, 'energy': energies}
+
+
+def mass_fractions(fractions, densities, basis='mass'):
+    """Frações mássicas normalizadas a partir de frações (ou proporções) mássicas ou volumétricas.
+
+    `fractions` tem as fases no último eixo; cada linha é uma mistura.
+    """
+    if basis not in FRACTION_BASES:
+        raise ValueError(f'unknown fraction basis {basis!r}; use one of {FRACTION_BASES}')
+    fractions = np.asarray(fractions, dtype=float)
+    if np.any(fractions < 0):
+        raise ValueError('phase fractions must not be negative')
+    weights = fractions * densities if basis == 'volume' else fractions
+    total = weights.sum(axis=-1, keepdims=True)
+    if np.any(total <= 0):
+        raise ValueError('every mixture needs a phase with a positive fraction')
+    return weights / total
+
+
+def volume_fractions(mass_fraction, densities):
+    volumes = mass_fraction / densities
+    return volumes / volumes.sum(axis=-1, keepdims=True)
+
+
+def mixture_density(mass_fraction, densities):
+    """Densidade (g/cm³) do pó sem vazios: 1 / Σ (w_i / ρ_i)."""
+    return 1 / (mass_fraction / densities).sum(axis=-1)
+
+
+def mixture_attenuation(phases, fractions, energies, capillary_diameters, packing_fraction=1.0, densities=None,
+                        basis='mass', curves=None):
+    """Densidade, µ/ρ, µR e transmissão de misturas para todas as combinações mistura x energia (eV) x capilar.
+
+    `fractions` é uma mistura (um valor por fase) ou uma matriz (misturas x
+    fases). Retorna um dicionário de arrays no formato de
+    `batch_attenuation`: 'mu_R' e 'transmission' têm forma (n_misturas,
+    n_energias, n_capilares), 'mu_rho' e 'linear_mu' (n_misturas,
+    n_energias); 'mass_fraction' e 'volume_fraction' têm a forma de
+    `fractions`. Para reavaliar as mesmas fases, passe em `curves` o
+    resultado de `phase_curves`.
+    """
+    if curves is None:
+        curves = phase_curves(phases, energies, densities)
+    fractions = np.atleast_2d(np.asarray(fractions, dtype=float))
+    if fractions.shape[1] != len(curves['density']):
+        raise ValueError(f'expected {len(curves["density"])} fractions per mixture, got {fractions.shape[1]}')
+    distance = np.array([capillary_distance(d) for d in np.atleast_1d(capillary_diameters)])
+
+    mass_fraction = mass_fractions(fractions, curves['density'], basis)
+    density = mixture_density(mass_fraction, curves['density'])
+    packing_density = density * packing_fraction
+    mu_rho = mass_fraction @ curves['mu_rho']
+    m_u_t = mu_rho * packing_density[:, None]
+
+    path = m_u_t[:, :, None] * distance
+    return {
+        'mass_fraction': mass_fraction,
+        'volume_fraction': volume_fractions(mass_fraction, curves['density']),
+        'phase_density': curves['density'],
+        'density': density,
+        'packing_density': packing_density,
+        'mu_rho': mu_rho,
+        'linear_mu': m_u_t,
+        'mu_R': path / 2,
+        'transmission': np.exp(-path) * 100,
+        'energy': curves['energy'],
+        'distance': distance,
+    }
+
+
+def solve_fraction(phases, fractions, vary, target_mu_r, energies, capillary_diameter, packing_fraction=1.0,
+                   densities=None, basis='volume', steps=FRACTION_STEPS):
+    """Fração da fase `vary` que leva µR ao alvo em cada energia (eV), mantendo as proporções das demais.
+
+    A fração de `vary` percorre uma grade de `steps` valores de 0 a 1 (na
+    base `basis`), avaliada inteira numa só chamada de `mixture_attenuation`;
+    o cruzamento com o alvo é interpolado linearmente entre os pontos da
+    grade (µR é monótono na fração). Onde o alvo não é atingido, fica o
+    extremo da grade com µR mais próximo e 'reached' é False.
+
+    Retorna um dicionário com 'fraction', 'mu_R' e 'reached' (um valor por
+    energia), 'grid' e 'curve' (µR de forma (steps, n_energias)).
+    """
+    fractions = np.asarray(fractions, dtype=float)
+    others = fractions.copy()
+    others[vary] = 0
+    if others.sum() <= 0:
+        raise ValueError('the phases that are not varied need a positive fraction')
+    others /= others.sum()
+    grid = np.linspace(0, 1, steps)
+    candidates = (1 - grid)[:, None]*others
+    candidates[:, vary] += grid
+    curve = mixture_attenuation(phases, candidates, energies, [capillary_diameter], packing_fraction, densities,
+                                basis)['mu_R'][:, :, 0]
+
+    above = curve >= target_mu_r
+    crossing = above[:-1] != above[1:]
+    found = crossing.any(axis=0)
+    columns = np.arange(curve.shape[1])
+    i = np.argmax(crossing, axis=0)
+    low, high = curve[i, columns], curve[i + 1, columns]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.clip(np.where(high != low, (target_mu_r - low) / (high - low), 0), 0, 1)
+    # sem cruzamento: o extremo da grade mais próximo do alvo
+    nearest = np.where(np.abs(curve[0] - target_mu_r) <= np.abs(curve[-1] - target_mu_r), 0, steps - 1)
+    fraction = np.where(found, grid[i] + t*(grid[1] - grid[0]), grid[nearest])
+    mu_r = np.where(found, target_mu_r, curve[nearest, columns])
+    return {'fraction': fraction, 'mu_R': mu_r, 'reached': found | np.isclose(mu_r, target_mu_r), 'grid': grid, 'curve': curve}
@@ -0,0 +1,182 @@
+"""Tabela pré-calculada de µ/ρ (Elam) por elemento.
+
+A tabela guarda log(µ/ρ) de cada elemento numa grade densa de energias
+(log-espaçada, mais um par de pontos de cada lado de cada nó e borda de
+absorção das tabelas de Elam), de modo que a interpolação linear em
+log-log reproduz `xraydb.mu_elam` com erro relativo abaixo de TOLERANCE (0,1%)
+fora de uma janela de ±EDGE_STEP em torno de cada borda.
+Energias fora da grade caem de volta no xraydb.
+
+Para regenerar e verificar os arquivos em xrdtools/data:
+    python -m xrdtools.mu_table
+"""
+import os
+import json
+import functools
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+ENERGY_MIN = 1000.0
+ENERGY_MAX = 100000.0
+POINTS_PER_DECADE = 200
+EDGE_STEP = 1e-6
+MAX_Z = 98
+TOLERANCE = 1e-3
+
+
+@functools.lru_cache(maxsize=1)
+def load_table():
+    """Carrega a tabela (memory-mapped) e retorna (energias, log µ/ρ, massas atômicas, índice dos símbolos)."""
+    energy = np.load(os.path.join(DATA_DIR, 'mu_energy.npy'), mmap_mode='r')
+    log_mu = np.load(os.path.join(DATA_DIR, 'mu_log.npy'), mmap_mode='r')
+    mass = np.load(os.path.join(DATA_DIR, 'atomic_mass.npy'))
+    symbols = np.load(os.path.join(DATA_DIR, 'symbols.npy'))
+    index = {str(symbol): i for i, symbol in enumerate(symbols)}
+    return np.log(energy), log_mu, mass, index
+
+
+def element_index(elements):
+    """Posição de cada elemento na tabela; levanta ValueError para símbolos desconhecidos."""
+    index = load_table()[3]
+    try:
+        return np.array([index[element] for element in elements], dtype=int)
+    except KeyError as e:
+        raise ValueError(f'unknown element {e}') from None
+
+
+def atomic_mass(element):
+    """Massa atômica (u) lida da tabela."""
+    return float(load_table()[2][element_index([element])[0]])
+
+
+def mu_elam_rows(rows, energies):
+    """µ/ρ (cm²/g) das linhas `rows` da tabela em várias energias (eV), forma (n_linhas, n_energias)."""
+    log_energy, log_mu, _, index = load_table()
+    energies = np.atleast_1d(np.asarray(energies, dtype=float))
+    x = np.log(energies)
+
+    inside = (x >= log_energy[0]) & (x <= log_energy[-1])
+    upper = np.clip(np.searchsorted(log_energy, x), 1, len(log_energy) - 1)
+    lower = upper - 1
+    weight = (x - log_energy[lower]) / (log_energy[upper] - log_energy[lower])
+    table = log_mu[rows]
+    out = np.exp(table[:, lower]*(1 - weight) + table[:, upper]*weight)
+
+    if not inside.all():
+        import xraydb as xr
+        symbols = list(index)
+        for i, row in enumerate(rows):
+            out[i, ~inside] = xr.mu_elam(symbols[row], energies[~inside])
+    return out
+
+
+def mu_elam_matrix(elements, energies):
+    """µ/ρ (cm²/g) de vários elementos em várias energias (eV), forma (n_elementos, n_energias)."""
+    return mu_elam_rows(element_index(elements), energies)
+
+
+def mu_elam(element, energies):
+    """Substituto de `xraydb.mu_elam` (total) baseado na tabela."""
+    out = mu_elam_matrix([element], energies)[0]
+    return float(out[0]) if np.ndim(energies) == 0 else out
+
+
+def absorption_edges(elements, energy_min=ENERGY_MIN, energy_max=ENERGY_MAX):
+    """Energias (eV) das bordas de absorção dos elementos dentro da faixa, a partir dos saltos da tabela."""
+    log_energy, log_mu, _, _ = load_table()
+    rows = element_index(elements)
+    pairs = np.nonzero(np.diff(log_energy) < 4*EDGE_STEP)[0]
+    jumps = log_mu[rows][:, pairs + 1] - log_mu[rows][:, pairs] > np.log(1.01)
+    edges = np.exp(0.5*(log_energy[pairs] + log_energy[pairs + 1]))[jumps.any(axis=0)]
+    return edges[(edges >= energy_min) & (edges <= energy_max)]
+
+
+@functools.lru_cache(maxsize=64)
+def material_composition(name, density=None):
+    """Frações mássicas e densidade de um material do xraydb (ou de uma fórmula com densidade)."""
+    import xraydb as xr
+    material = xr.get_material(name)
+    if material is not None:
+        formula, material_density = material
+        density = material_density if density is None else density
+    else:
+        formula = name
+    if density is None:
+        raise ValueError(f'unknown material {name!r}: a density is required')
+    composition = xr.chemparse(formula)
+    elements = list(composition)
+    masses = np.array([composition[element] * atomic_mass(element) for element in elements])
+    return tuple(elements), masses / masses.sum(), density
+
+
+def material_mu(name, energies, density=None):
+    """Substituto de `xraydb.material_mu` (1/cm) baseado na tabela."""
+    elements, mass_fraction, density = material_composition(name, density)
+    out = density * (mass_fraction @ mu_elam_matrix(list(elements), energies))
+    return float(out[0]) if np.ndim(energies) == 0 else out
+
+
+def energy_grid():
+    """Grade de energias (eV): log-espaçada + pares de pontos em torno de cada nó/borda das tabelas de Elam."""
+    import xraydb as xr
+    db = xr.get_xraydb()
+    n_points = int(POINTS_PER_DECADE * np.log10(ENERGY_MAX / ENERGY_MIN)) + 1
+    grid = np.logspace(np.log10(ENERGY_MIN), np.log10(ENERGY_MAX), n_points)
+    knots = []
+    for z in range(1, MAX_Z + 1):
+        symbol = xr.atomic_symbol(z)
+        for tablename in ('photoabsorption', 'scattering'):
+            row = db.get_cache(tablename, column='element', value=symbol)[0]
+            knots.append(np.exp(np.array(json.loads(row.log_energy))))
+    # as bordas aparecem como energias repetidas; em qualquer nó a spline do
+    # xraydb muda de inclinação (ou salta), então amostramos dos dois lados
+    knots = np.unique(np.concatenate(knots))
+    knots = knots[(knots > ENERGY_MIN) & (knots < ENERGY_MAX)]
+    nearest = np.clip(np.searchsorted(knots, grid), 1, len(knots) - 1)
+    distance = np.minimum(np.abs(grid / knots[nearest - 1] - 1), np.abs(grid / knots[nearest] - 1))
+    grid = grid[distance > 2*EDGE_STEP]
+    return np.unique(np.concatenate([grid, knots*(1 - EDGE_STEP), knots*(1 + EDGE_STEP)]))
+
+
+def build_table():
+    """Gera os arquivos .npy da tabela a partir do xraydb."""
+    import xraydb as xr
+    energy = energy_grid()
+    symbols = [xr.atomic_symbol(z) for z in range(1, MAX_Z + 1)]
+    log_mu = np.array([np.log(xr.mu_elam(symbol, energy)) for symbol in symbols], dtype=np.float32)
+    mass = np.array([xr.atomic_mass(symbol) for symbol in symbols])
+    os.makedirs(DATA_DIR, exist_ok=True)
+    np.save(os.path.join(DATA_DIR, 'mu_energy.npy'), energy)
+    np.save(os.path.join(DATA_DIR, 'mu_log.npy'), log_mu)
+    np.save(os.path.join(DATA_DIR, 'atomic_mass.npy'), mass)
+    np.save(os.path.join(DATA_DIR, 'symbols.npy'), np.array(symbols))
+    load_table.cache_clear()
+    material_composition.cache_clear()
+
+
+def check_table(n_energies=20000, seed=0):
+    """Compara a tabela com o xraydb em energias aleatórias; retorna o maior erro relativo.
+
+    Pontos a menos de 2*EDGE_STEP (relativo) de um nó ficam de fora: dentro
+    dessa janela a própria borda não é resolvida.
+    """
+    import xraydb as xr
+    energies = np.sort(np.random.default_rng(seed).uniform(ENERGY_MIN, ENERGY_MAX, n_energies))
+    grid = np.load(os.path.join(DATA_DIR, 'mu_energy.npy'))
+    pairs = np.nonzero(np.diff(grid) / grid[:-1] < 4*EDGE_STEP)[0]
+    window = np.zeros(energies.shape, dtype=bool)
+    for i in pairs:
+        window |= (energies > grid[i]) & (energies < grid[i + 1])
+    energies = energies[~window]
+    symbols = [str(symbol) for symbol in np.load(os.path.join(DATA_DIR, 'symbols.npy'))]
+    table = mu_elam_matrix(symbols, energies)
+    reference = np.array([xr.mu_elam(symbol, energies) for symbol in symbols])
+    return np.max(np.abs(table / reference - 1))
+
+
+if __name__ == '__main__':
+    build_table()
+    worst = check_table()
+    print(f'maior erro relativo contra xraydb: {worst:.2e} (tolerância {TOLERANCE:.0e})')
+    if worst > TOLERANCE:
+        raise SystemExit(1)
@@ -0,0 +1,189 @@
+"""Instrumentação opcional das etapas de cada execução das páginas.
+
+Cada sessão do Streamlit tem um Profiler (guardado no session_state) que
+mede, para cada etapa marcada com `profiler.stage(nome)`, o tempo de
+relógio e a memória alocada (tracemalloc): a variação líquida e o pico
+acima do início da etapa. As medidas são acumuladas por (página, etapa) e
+as últimas MAX_RUNS execuções ficam guardadas inteiras para exportação.
+
+A instrumentação só é ligada com ?profile=1 na URL ou com a variável de
+ambiente XRDTOOLS_PROFILE=1; desligada, `stage` não mede nada. O
+tracemalloc é global ao processo e deixa as alocações mais lentas, então,
+uma vez ligado, fica ligado até o processo terminar; com várias sessões
+medindo ao mesmo tempo, a memória de uma etapa inclui a das outras sessões.
+
+Exportação: JSON (to_json) ou texto no formato do Prometheus (to_prometheus),
+de uma sessão ou de todas as sessões vivas do processo (live_profilers);
+`debug_panel` fecha a execução e mostra as medidas e a exportação no fim
+de cada página.
+"""
+import os
+import json
+import time
+import uuid
+import weakref
+import threading
+import tracemalloc
+import contextlib
+from collections import deque
+
+PROFILE_ENV = 'XRDTOOLS_PROFILE'
+QUERY_PARAM = 'profile'
+SESSION_KEY = 'profiler'
+MAX_RUNS = 50
+
+_profilers = weakref.WeakValueDictionary()
+_lock = threading.Lock()
+
+
+class Profiler:
+    """Tempo e memória por etapa das execuções de uma sessão."""
+
+    def __init__(self, enabled=False):
+        self.session = uuid.uuid4().hex[:8]
+        self.enabled = False
+        self.page = None
+        self.stages = {}
+        self.runs = deque(maxlen=MAX_RUNS)
+        self._run = None
+        self._run_start = 0.0
+        self._stack = []
+        with _lock:
+            _profilers[self.session] = self
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def begin(self, page):
+        """Começa uma execução de `page`; a anterior, se não terminou (st.stop, st.rerun), é descartada."""
+        self.page = page
+        self._stack.clear()
+        self._run = {'page': page, 'start': time.time(), 'stages': []} if self.enabled else None
+        self._run_start = time.perf_counter()
+
+    def end(self):
+        """Fecha a execução atual, registrando o total como a etapa 'run'."""
+        if self._run is None:
+            return
+        seconds = time.perf_counter() - self._run_start
+        self._record('run', seconds, 0, 0)
+        self._run['seconds'] = seconds
+        self.runs.append(self._run)
+        self._run = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Mede o bloco como a etapa `name` da página atual; etapas podem ser aninhadas."""
+        if self._run is None:
+            yield
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        entry = [current, current]
+        self._stack.append(entry)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            after, peak = tracemalloc.get_traced_memory()
+            entry[1] = max(entry[1], peak)
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], entry[1])
+            self._record(name, seconds, after - entry[0], entry[1] - entry[0])
+
+    def _record(self, name, seconds, allocated, peak):
+        self._run['stages'].append({'stage': name, 'seconds': seconds, 'allocated_bytes': allocated, 'peak_bytes': peak})
+        stats = self.stages.setdefault((self.page, name), {
+            'calls': 0, 'total_seconds': 0.0, 'last_seconds': 0.0, 'max_seconds': 0.0,
+            'last_allocated_bytes': 0, 'max_peak_bytes': 0,
+        })
+        stats['calls'] += 1
+        stats['total_seconds'] += seconds
+        stats['last_seconds'] = seconds
+        stats['max_seconds'] = max(stats['max_seconds'], seconds)
+        stats['last_allocated_bytes'] = allocated
+        stats['max_peak_bytes'] = max(stats['max_peak_bytes'], peak)
+
+    def table(self):
+        """Uma linha por (página, etapa), para st.dataframe."""
+        return [{'page': page, 'stage': name, **stats,
+                 'mean_seconds': stats['total_seconds'] / stats['calls']}
+                for (page, name), stats in self.stages.items()]
+
+    def reset(self):
+        self.stages.clear()
+        self.runs.clear()
+
+    def snapshot(self):
+        return {'session': self.session, 'stages': self.table(), 'runs': list(self.runs)}
+
+
+def session_profiler(session_state, query_params=None):
+    """Profiler da sessão, criado na primeira execução; liga com ?profile=1 ou XRDTOOLS_PROFILE=1."""
+    profiler = session_state.get(SESSION_KEY)
+    if profiler is None:
+        profiler = Profiler()
+        session_state[SESSION_KEY] = profiler
+    if not profiler.enabled and (os.environ.get(PROFILE_ENV) == '1'
+                                 or (query_params is not None and query_params.get(QUERY_PARAM) == '1')):
+        profiler.enable()
+    return profiler
+
+
+def live_profilers():
+    """Profilers ligados das sessões ainda vivas no processo."""
+    with _lock:
+        return [profiler for profiler in _profilers.values() if profiler.enabled]
+
+
+def to_json(profilers):
+    return json.dumps([profiler.snapshot() for profiler in profilers], indent=1, ensure_ascii=False)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+METRICS = [
+    ('xrdtools_stage_calls_total', 'counter', 'calls', 'Number of times the stage ran.'),
+    ('xrdtools_stage_seconds_total', 'counter', 'total_seconds', 'Wall time spent in the stage.'),
+    ('xrdtools_stage_last_seconds', 'gauge', 'last_seconds', 'Wall time of the last run of the stage.'),
+    ('xrdtools_stage_max_seconds', 'gauge', 'max_seconds', 'Longest wall time of the stage.'),
+    ('xrdtools_stage_allocated_bytes', 'gauge', 'last_allocated_bytes', 'Net memory allocated by the last run of the stage.'),
+    ('xrdtools_stage_peak_bytes', 'gauge', 'max_peak_bytes', 'Largest memory peak above the start of the stage.'),
+]
+
+
+def to_prometheus(profilers):
+    """Métricas por sessão, página e etapa no formato de texto do Prometheus."""
+    lines = []
+    for metric, kind, field, description in METRICS:
+        lines += [f'# HELP {metric} {description}', f'# TYPE {metric} {kind}']
+        for profiler in profilers:
+            for (page, name), stats in profiler.stages.items():
+                labels = f'session="{_escape(profiler.session)}",page="{_escape(page)}",stage="{_escape(name)}"'
+                lines.append(f'{metric}{{{labels}}} {stats[field]:.9g}')
+    return '\n'.join(lines) + '\n'
+
+
+def debug_panel(profiler):
+    """Fecha a execução da página e, com a instrumentação ligada, mostra a tabela de etapas e os botões de exportação."""
+    import streamlit as st
+    profiler.end()
+    if not profiler.enabled:
+        return
+    with st.expander('Debug: stage timings and memory'):
+        st.dataframe(profiler.table(), use_container_width=True, hide_index=True)
+        profilers = live_profilers() if st.checkbox('Export all sessions of this process') else [profiler]
+        col1, col2 = st.columns(2)
+        col1.download_button('Download JSON', to_json(profilers), file_name='profile.json', mime='application/json')
+        col2.download_button('Download Prometheus text', to_prometheus(profilers), file_name='profile.prom',
+                             mime='text/plain')
@@ -0,0 +1,140 @@
+"""Lista de reflexões (hkl, d, Q, 2θ, multiplicidade) a partir da cela unitária.
+
+Os hkl são enumerados de uma vez com numpy: a caixa |h| <= a/d_min
+(idem k, l) é podada para meio espaço (as reflexões de Friedel, -h-k-l,
+têm o mesmo d e só dobram a multiplicidade), para as condições de
+centragem da rede e para d >= d_min, e 1/d² vem do tensor métrico recíproco.
+
+Reflexões de mesmo d são agrupadas numa linha, com a multiplicidade total;
+isso corresponde à simetria métrica da cela e também junta as sobreposições
+acidentais (ex.: 333 e 511 na cúbica), que caem no mesmo pico do pó.
+
+A tabela em d é guardada por cela em `reflection_cache`, gerada até um
+d_min arredondado para baixo; trocar só a energia ou a faixa de 2θ apenas
+filtra essa tabela.
+"""
+import numpy as np
+from xrdtools.cache import reflection_cache
+from xrdtools.conversions import calculate_wavelength, scattering_vector, two_theta_from_d
+
+# condições de reflexão da centragem da rede (h, k, l -> máscara das permitidas)
+CENTERING_RULES = {
+    'P': None,
+    'I': lambda h, k, l: (h + k + l) % 2 == 0,
+    'F': lambda h, k, l: ((h % 2) == (k % 2)) & ((k % 2) == (l % 2)),
+    'C': lambda h, k, l: (h + k) % 2 == 0,
+    'A': lambda h, k, l: (k + l) % 2 == 0,
+    'B': lambda h, k, l: (h + l) % 2 == 0,
+    'R': lambda h, k, l: (-h + k + l) % 3 == 0,
+}
+CENTERING_NAMES = {
+    'P': 'P (primitive)',
+    'I': 'I (body centred)',
+    'F': 'F (face centred)',
+    'C': 'C (C-face centred)',
+    'A': 'A (A-face centred)',
+    'B': 'B (B-face centred)',
+    'R': 'R (rhombohedral, hexagonal axes)',
+}
+MAX_HKL = 5_000_000
+D_TOLERANCE = 1e-9
+# passos (em log2) em que o d_min da tabela guardada é arredondado
+D_MIN_STEPS_PER_OCTAVE = 4
+
+
+def reciprocal_metric(a, b, c, alpha, beta, gamma):
+    """Tensor métrico recíproco G* (Å⁻²) da cela (Å, graus)."""
+    ca, cb, cg = np.cos(np.deg2rad([alpha, beta, gamma]))
+    metric = np.array([
+        [a*a, a*b*cg, a*c*cb],
+        [a*b*cg, b*b, b*c*ca],
+        [a*c*cb, b*c*ca, c*c],
+    ])
+    if np.linalg.det(metric) <= 0:
+        raise ValueError('the cell angles do not define a valid unit cell')
+    return np.linalg.inv(metric)
+
+
+def _hkl_box(cell, d_min):
+    a, b, c = cell[:3]
+    h_max, k_max, l_max = (int(length / d_min) for length in (a, b, c))
+    if (2*h_max + 1) * (2*k_max + 1) * (l_max + 1) > MAX_HKL:
+        raise ValueError(f'too many hkl to enumerate down to d = {d_min:.4g} Å; narrow the 2θ range')
+    h, k, l = np.meshgrid(np.arange(-h_max, h_max + 1), np.arange(-k_max, k_max + 1), np.arange(0, l_max + 1),
+                          indexing='ij')
+    h, k, l = h.ravel(), k.ravel(), l.ravel()
+    half = (l > 0) | ((l == 0) & ((k > 0) | ((k == 0) & (h > 0))))
+    return h[half], k[half], l[half]
+
+
+@reflection_cache.memoize
+def reflection_table(cell, centering='P', d_min=1.0):
+    """Reflexões distintas com d >= d_min, em ordem decrescente de d.
+
+    `cell` é a tupla (a, b, c, α, β, γ) em Å e graus. Retorna um dicionário
+    de arrays somente leitura: 'h', 'k', 'l' (representante de cada grupo,
+    preferindo índices não negativos), 'd', 'Q' e 'multiplicity'.
+    """
+    if centering not in CENTERING_RULES:
+        raise ValueError(f'unknown centering {centering!r}; use one of {"".join(CENTERING_RULES)}')
+    if min(cell[:3]) <= 0 or d_min <= 0:
+        raise ValueError('cell lengths and d_min must be positive')
+    g_star = reciprocal_metric(*cell)
+    h, k, l = _hkl_box(cell, d_min)
+    rule = CENTERING_RULES[centering]
+    if rule is not None:
+        allowed = rule(h, k, l)
+        h, k, l = h[allowed], k[allowed], l[allowed]
+    hkl = np.stack([h, k, l], axis=1).astype(float)
+    inv_d2 = np.einsum('ni,ij,nj->n', hkl, g_star, hkl)
+    keep = inv_d2 <= 1/d_min**2
+    h, k, l, inv_d2 = h[keep], k[keep], l[keep], inv_d2[keep]
+
+    order = np.argsort(inv_d2, kind='stable')
+    h, k, l, inv_d2 = h[order], k[order], l[order], inv_d2[order]
+    new_group = np.ones(len(inv_d2), dtype=bool)
+    new_group[1:] = np.diff(inv_d2) > D_TOLERANCE * inv_d2[1:]
+    group = np.cumsum(new_group) - 1
+    n_groups = group[-1] + 1 if len(group) else 0
+
+    non_negative = (h >= 0) & (k >= 0) & (l >= 0)
+    best = np.lexsort((-l, -k, -h, ~non_negative, group))
+    first = np.ones(len(best), dtype=bool)
+    first[1:] = group[best][1:] != group[best][:-1]
+    representative = best[first]
+
+    d = 1/np.sqrt(inv_d2[representative])
+    table = {
+        'h': h[representative],
+        'k': k[representative],
+        'l': l[representative],
+        'd': d,
+        'Q': 2*np.pi/d,
+        'multiplicity': 2*np.bincount(group, minlength=n_groups),
+    }
+    for array in table.values():
+        array.flags.writeable = False
+    return table
+
+
+def _cached_d_min(d_min):
+    """Arredonda d_min para baixo numa grade logarítmica, para reaproveitar a tabela entre energias próximas."""
+    return 2.0 ** (np.floor(np.log2(d_min) * D_MIN_STEPS_PER_OCTAVE) / D_MIN_STEPS_PER_OCTAVE)
+
+
+def reflections(cell, energy, two_theta_min=0.0, two_theta_max=60.0, centering='P'):
+    """Reflexões da cela visíveis entre two_theta_min e two_theta_max (graus) na energia (keV).
+
+    Retorna o dicionário de `reflection_table` acrescido de 'two_theta',
+    já filtrado para a faixa pedida.
+    """
+    cell = tuple(float(value) for value in cell)
+    wavelength = calculate_wavelength(energy)
+    d_min = wavelength / (2*np.sin(np.deg2rad(min(two_theta_max, 180.0) / 2)))
+    table = reflection_table(cell, centering, _cached_d_min(d_min))
+    two_theta = two_theta_from_d(wavelength, table['d'])
+    visible = (two_theta >= two_theta_min) & (two_theta <= two_theta_max)
+    out = {key: array[visible] for key, array in table.items()}
+    out['two_theta'] = two_theta[visible]
+    out['Q'] = scattering_vector(wavelength, out['two_theta'])
+    return out